@@ -1,99 +1,157 @@
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 import plotly.express as px
 import streamlit as st
-from wordcloud import WordCloud, STOPWORDS
+
+from app_utils.chart_cache import BR_STATES_GEOJSON_URL, plotly_chart
+from app_utils.cohorts import retention_matrix
+from app_utils.comparison import COMPARISON_NONE, compare_periods, metric_delta
+from app_utils.data_loader import PAGE_COLUMNS
+from app_utils.disk_cache import cached_aggregate
+from app_utils.filter_engine import global_filter_key
+from app_utils.geo_index import density_bins
 
 #################### Data Processing Code ####################
 # Ambil data dari session_state
-if "cust_df" not in st.session_state:
+if "dataset" not in st.session_state:
     st.error("Data belum dimuat! Silakan jalankan main.py terlebih dahulu.")
 else:
-    cust_df = st.session_state.cust_df
+    # Hanya kolom yang dipakai halaman ini yang dimuat
+    cust_df = st.session_state.dataset.frame(PAGE_COLUMNS["customer"])
 
 # Ambil filter dari session_state
 selected_date_range = st.session_state.get("selected_date_range", None)
-selected_city = st.session_state.get("selected_city", "All")
-selected_state = st.session_state.get("selected_state", "All")
+selected_cities = st.session_state.get("selected_cities", [])
+selected_states = st.session_state.get("selected_states", [])
+comparison_mode = st.session_state.get("comparison_mode", COMPARISON_NONE)
+filter_bitmaps = st.session_state.filter_bitmaps
 
 # Filter data berdasarkan rentang tanggal
 # Pastikan filter tanggal dalam bentuk datetime
 start_date = pd.to_datetime(selected_date_range[0])
 end_date = pd.to_datetime(selected_date_range[1])
 
-filtered_date = cust_df[
-    (cust_df["order_purchase_timestamp"] >= start_date) &
-    (cust_df["order_purchase_timestamp"] <= end_date)
-]
-
-filtered_city_state = filtered_date.copy()
-
-# Filter berdasarkan Customer City jika dipilih
-if selected_city != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_city"] == selected_city]
-
-# Filter berdasarkan Customer State jika dipilih
-if selected_state != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_state"] == selected_state]
-
-# Total Active Customers - Pelanggan yang melakukan lebih dari satu pembelian
-active_customers = filtered_city_state["customer_unique_id"].value_counts()
-total_active_customers = (active_customers > 1).sum()
-
-# Average Monetary Value - Rata-rata nilai pembelian per pelanggan
-avg_monetary_value = filtered_city_state.groupby("customer_unique_id")["payment_value"].sum().mean()
-
-# Customer Retention Rate Tingkat retensi pelanggan
-total_customers = filtered_city_state["customer_unique_id"].nunique()
-retained_customers = total_active_customers  # Karena mereka melakukan pembelian lebih dari 1 kali
-customer_retention_rate = (retained_customers / total_customers) * 100 if total_customers > 0 else 0
+# Filter diselesaikan lewat bitmap baris (OR antar nilai yang dipilih, AND antar dimensi)
+filtered_date = filter_bitmaps.select(cust_df, (start_date, end_date))
+filtered_city_state = filter_bitmaps.select(cust_df, (start_date, end_date),
+                                            customer_city=selected_cities, customer_state=selected_states)
+
+# Key cache chart: fingerprint dataset + filter global, data input chart tidak perlu di-hash setiap rerun
+filter_key = global_filter_key(start_date, end_date, selected_cities, selected_states)
+chart_key = (st.session_state.data_fingerprint, filter_key)
+
+# Tidak ada baris untuk filter global yang dipilih: KPI & chart tidak bisa dihitung
+if filtered_city_state.empty:
+    st.warning("Tidak ada data untuk filter yang dipilih. Ubah rentang tanggal, city, atau state di sidebar.")
+    st.stop()
+
+# Data terfilter untuk periode lain (dipakai oleh mode pembanding)
+def select_period(period_start, period_end):
+    return filter_bitmaps.select(cust_df, (period_start, period_end),
+                                 customer_city=selected_cities, customer_state=selected_states)
+
+# KPI halaman customer, dihitung untuk periode aktif & periode pembanding secara paralel
+def compute_customer_kpis(df, period_start, period_end):
+    # Total Active Customers - Pelanggan yang melakukan lebih dari satu pembelian
+    active_customers = df["customer_unique_id"].value_counts()
+    total_active_customers = (active_customers > 1).sum()
+
+    # Customer Retention Rate Tingkat retensi pelanggan
+    total_customers = df["customer_unique_id"].nunique()
+    retained_customers = total_active_customers  # Karena mereka melakukan pembelian lebih dari 1 kali
+    return {
+        "total_active_customers": int(total_active_customers),
+        # Average Monetary Value - Rata-rata nilai pembelian per pelanggan
+        "avg_monetary_value": df.groupby("customer_unique_id")["payment_value"].sum().mean(),
+        "customer_retention_rate": (retained_customers / total_customers) * 100 if total_customers > 0 else 0,
+    }
+
+customer_kpis, customer_kpis_prev = compare_periods("customer_kpis", compute_customer_kpis, filtered_city_state,
+                                                    select_period, start_date, end_date, selected_cities,
+                                                    selected_states, comparison_mode, st.session_state.data_fingerprint)
 
 # Konversi ke format string
-avg_monetary_value_str = f"R$ {avg_monetary_value:,.2f}"
-customer_retention_rate_str = f"{customer_retention_rate:.2f}%"
+avg_monetary_value_str = f"R$ {customer_kpis['avg_monetary_value']:,.2f}"
+customer_retention_rate_str = f"{customer_kpis['customer_retention_rate']:.2f}%"
 
 # Scatter Plot - RFM Score vs Revenue
-fig_scatter = px.scatter(filtered_city_state, x="RFM_Score", y="Monetary",
-                         color="Customer_segment",  # Warna berdasarkan segmentasi pelanggan
-                         labels={"RFM_Score": "RFM Score", "Monetary": "Revenue (R$)"},
-                         color_discrete_sequence=px.colors.qualitative.Prism,
-                         hover_data=["customer_unique_id"])
+rfm_points = filtered_city_state[["RFM_Score", "Monetary", "Customer_segment", "customer_unique_id"]]
+
+def build_scatter(rfm_points):
+    return px.scatter(rfm_points, x="RFM_Score", y="Monetary",
+                      color="Customer_segment",  # Warna berdasarkan segmentasi pelanggan
+                      labels={"RFM_Score": "RFM Score", "Monetary": "Revenue (R$)"},
+                      color_discrete_sequence=px.colors.qualitative.Prism,
+                      hover_data=["customer_unique_id"])
 
 # Pie Chart - Proporsi Segmentasi Pelanggan
 # Hitung proporsi segmentasi pelanggan
 customer_segment_counts = filtered_city_state["Customer_segment"].value_counts().reset_index()
 customer_segment_counts.columns = ["Customer_segment", "count"]
 
-fig_pie = px.pie(customer_segment_counts, names="Customer_segment", values="count",
-                 color_discrete_sequence=px.colors.qualitative.Prism)
+def build_pie(customer_segment_counts):
+    return px.pie(customer_segment_counts, names="Customer_segment", values="count",
+                  color_discrete_sequence=px.colors.qualitative.Prism)
 
 # Choropleth Map - Distribusi Pelanggan per State
-# Mengambil data GeoJSON untuk peta negara bagian Brasil
-br_geojson_url = "https://raw.githubusercontent.com/codeforamerica/click_that_hood/master/public/data/brazil-states.geojson"
 # Hitung jumlah pelanggan unik per State 
 customer_distribution = filtered_date.groupby("customer_state")["customer_unique_id"].nunique().reset_index()
 customer_distribution.columns = ["customer_state", "unique_customers"]
-fig_customers = px.choropleth(customer_distribution, geojson=br_geojson_url, 
-                                locations='customer_state', featureidkey="properties.sigla",
-                                color='unique_customers', hover_name='customer_state', 
-                                color_continuous_scale=px.colors.sequential.Viridis,
-                                labels={"unique_customers": "Jumlah Pelanggan"})
-fig_customers.update_geos(fitbounds="locations", visible=False)
-fig_customers.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+
+def build_customers(customer_distribution):
+    fig_customers = px.choropleth(customer_distribution, geojson=BR_STATES_GEOJSON_URL, 
+                                    locations='customer_state', featureidkey="properties.sigla",
+                                    color='unique_customers', hover_name='customer_state', 
+                                    color_continuous_scale=px.colors.sequential.Viridis,
+                                    labels={"unique_customers": "Jumlah Pelanggan"})
+    fig_customers.update_geos(fitbounds="locations", visible=False)
+    fig_customers.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+    return fig_customers
 
 # Choropleth Map - Average Revenue per State
 # Hitung total revenue per State
 revenue_distribution = filtered_date.groupby("customer_state")["payment_value"].mean().reset_index()
 revenue_distribution.columns = ["customer_state", "total_revenue"]
-fig_revenue = px.choropleth(revenue_distribution, geojson=br_geojson_url, 
-                                locations='customer_state', featureidkey="properties.sigla",
-                                color='total_revenue', hover_name='customer_state', 
-                                color_continuous_scale=px.colors.sequential.Viridis,
-                                labels={"total_revenue": "Total Revenue (R$)"})
-fig_revenue.update_geos(fitbounds="locations", visible=False)
-fig_revenue.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
 
+def build_revenue(revenue_distribution):
+    fig_revenue = px.choropleth(revenue_distribution, geojson=BR_STATES_GEOJSON_URL, 
+                                    locations='customer_state', featureidkey="properties.sigla",
+                                    color='total_revenue', hover_name='customer_state', 
+                                    color_continuous_scale=px.colors.sequential.Viridis,
+                                    labels={"total_revenue": "Total Revenue (R$)"})
+    fig_revenue.update_geos(fitbounds="locations", visible=False)
+    fig_revenue.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+    return fig_revenue
+
+
+# Hexbin Map - Kepadatan Pelanggan berdasarkan zip prefix (dibinning di server)
+geo_index = st.session_state.get("geo_index")
+if geo_index is not None:
+    customer_points = filtered_date.drop_duplicates("customer_unique_id")["customer_zip_code_prefix"]
+    customer_density = density_bins(geo_index, customer_points)
+
+def build_customer_density(customer_density):
+    fig_customer_density = px.scatter_geo(customer_density, lat="lat", lon="lng", size="count", color="count",
+                                        color_continuous_scale=px.colors.sequential.Viridis,
+                                        labels={"count": "Jumlah Pelanggan"})
+    fig_customer_density.update_geos(fitbounds="locations", scope="south america", showcountries=True)
+    fig_customer_density.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+    return fig_customer_density
+
+# Heatmap - Retensi Cohort Pelanggan (bulan transaksi pertama x bulan sejak transaksi pertama)
+# Bulan pertama dihitung dari riwayat penuh (hanya filter city/state), baru dibatasi ke rentang tanggal
+def compute_customer_cohorts():
+    history = filter_bitmaps.select(cust_df, None, customer_city=selected_cities, customer_state=selected_states)
+    return retention_matrix(history["customer_unique_id"], history["year_month"], start_date, end_date)
+
+customer_retention = cached_aggregate("customer_cohorts", st.session_state.data_fingerprint, filter_key,
+                                      compute_customer_cohorts)
+
+def build_customer_cohort(customer_retention):
+    fig_customer_cohort = px.imshow(customer_retention, text_auto=".0f", aspect="auto",
+                                    color_continuous_scale=px.colors.sequential.Viridis,
+                                    labels={"x": "Months Since First Purchase", "y": "Cohort", "color": "Retention (%)"})
+    fig_customer_cohort.update_layout(paper_bgcolor="rgba(0,0,0,0)")
+    return fig_customer_cohort
 
 #################### Streamlit UI Code ####################
 # Judul halaman home
@@ -103,13 +161,16 @@ st.subheader("🛒 Customers Analysis")
 # Membuat kolom untuk metrik
 col1a, col2a, col3a = st.columns(3)
 
-col1a.metric("Total Active Customers", f"👥 {total_active_customers:,}", 
+col1a.metric("Total Active Customers", f"👥 {customer_kpis['total_active_customers']:,}", 
+             delta=metric_delta(customer_kpis, customer_kpis_prev, "total_active_customers"),
              help="Jumlah pelanggan yang telah melakukan lebih dari satu pembelian.", border=True)
 
 col2a.metric("Average Monetary Value", f"💰 {avg_monetary_value_str}", 
+             delta=metric_delta(customer_kpis, customer_kpis_prev, "avg_monetary_value", "R$ {:+,.2f}"),
              help="Rata-rata nilai transaksi per pelanggan dalam periode tertentu.", border=True)
 
 col3a.metric("Customer Retention Rate", f"🔁 {customer_retention_rate_str}", 
+             delta=metric_delta(customer_kpis, customer_kpis_prev, "customer_retention_rate", "{:+.2f}%"),
              help="Persentase pelanggan yang kembali bertransaksi dibandingkan total pelanggan.", border=True)
 
 
@@ -117,18 +178,30 @@ col1b, col2b = st.columns(2)
 
 with col1b:
     st.subheader("Customer Segment Proportion")
-    st.plotly_chart(fig_pie, use_container_width=True)
+    plotly_chart("customer.pie", customer_segment_counts, build_pie, use_container_width=True, data_key=chart_key)
 
 with col2b:
     st.subheader("RFM Score vs Revenue")
-    st.plotly_chart(fig_scatter, use_container_width=True)
+    plotly_chart("customer.scatter", rfm_points, build_scatter, use_container_width=True, data_key=chart_key)
     
 col1c, col2c = st.columns(2)
 
 with col1c:
     st.subheader("Customer Distribution by State")
-    st.plotly_chart(fig_customers, use_container_width=True)
+    plotly_chart("customer.customers", customer_distribution, build_customers, use_container_width=True, data_key=chart_key)
 
 with col2c:
     st.subheader("Total Revenue by State")
-    st.plotly_chart(fig_revenue, use_container_width=True)
\ No newline at end of file
+    plotly_chart("customer.revenue", revenue_distribution, build_revenue, use_container_width=True, data_key=chart_key)
+
+st.subheader("Customer Density Map")
+if geo_index is not None:
+    plotly_chart("customer.customer_density", customer_density, build_customer_density, use_container_width=True, data_key=chart_key)
+else:
+    st.info("Dataset geolocation belum tersedia. Jalankan `PYTHONPATH=dashboard python -m app_utils.geo_index` untuk membuat data/zip_centroids.npz.")
+
+st.subheader("Monthly Customer Cohort Retention")
+if customer_retention.empty:
+    st.info("Tidak ada data untuk filter yang dipilih.")
+else:
+    plotly_chart("customer.customer_cohort", customer_retention, build_customer_cohort, use_container_width=True, data_key=chart_key)
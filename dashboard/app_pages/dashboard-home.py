@@ -1,76 +1,111 @@
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 import plotly.express as px
 import streamlit as st
-from wordcloud import WordCloud, STOPWORDS
+
+from app_utils.chart_cache import plotly_chart
+from app_utils.comparison import COMPARISON_NONE, compare_periods, metric_delta
+from app_utils.data_loader import PAGE_COLUMNS
+from app_utils.dimensions import valid_keys
+from app_utils.filter_engine import global_filter_key
+from app_utils.time_metrics import nan_mean
 
 
 #################### Data Processing Code ####################
 # Ambil data dari session_state
-if "cust_df" not in st.session_state:
+if "dataset" not in st.session_state:
     st.error("Data belum dimuat! Silakan jalankan main.py terlebih dahulu.")
 else:
-    cust_df = st.session_state.cust_df
+    # Hanya kolom yang dipakai halaman ini yang dimuat
+    cust_df = st.session_state.dataset.frame(PAGE_COLUMNS["home"])
 
 # Ambil filter dari session_state
 selected_date_range = st.session_state.get("selected_date_range", None)
-selected_city = st.session_state.get("selected_city", "All")
-selected_state = st.session_state.get("selected_state", "All")
+selected_cities = st.session_state.get("selected_cities", [])
+selected_states = st.session_state.get("selected_states", [])
+comparison_mode = st.session_state.get("comparison_mode", COMPARISON_NONE)
+filter_bitmaps = st.session_state.filter_bitmaps
 
 # Filter data berdasarkan rentang tanggal
 # Pastikan filter tanggal dalam bentuk datetime
 start_date = pd.to_datetime(selected_date_range[0])
 end_date = pd.to_datetime(selected_date_range[1])
 
-filtered_date = cust_df[
-    (cust_df["order_purchase_timestamp"] >= start_date) &
-    (cust_df["order_purchase_timestamp"] <= end_date)
-]
-
-filtered_city_state = filtered_date.copy()
-
-# Filter berdasarkan Customer City jika dipilih
-if selected_city != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_city"] == selected_city]
-
-# Filter berdasarkan Customer State jika dipilih
-if selected_state != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_state"] == selected_state]
-
-# Hitung rata-rata waktu pengiriman
-average_delivery_time = filtered_city_state["delivery_time"].mean()
+# Filter diselesaikan lewat bitmap baris (OR antar nilai yang dipilih, AND antar dimensi)
+filtered_date = filter_bitmaps.select(cust_df, (start_date, end_date))
+filtered_city_state = filter_bitmaps.select(cust_df, (start_date, end_date),
+                                            customer_city=selected_cities, customer_state=selected_states)
+
+# Key cache chart: fingerprint dataset + filter global, data input chart tidak perlu di-hash setiap rerun
+filter_key = global_filter_key(start_date, end_date, selected_cities, selected_states)
+chart_key = (st.session_state.data_fingerprint, filter_key)
+
+# Tidak ada baris untuk filter global yang dipilih: KPI & chart tidak bisa dihitung
+if filtered_city_state.empty:
+    st.warning("Tidak ada data untuk filter yang dipilih. Ubah rentang tanggal, city, atau state di sidebar.")
+    st.stop()
+
+# Data terfilter untuk periode lain (dipakai oleh mode pembanding)
+def select_period(period_start, period_end):
+    return filter_bitmaps.select(cust_df, (period_start, period_end),
+                                 customer_city=selected_cities, customer_state=selected_states)
+
+# KPI halaman home, dihitung untuk periode aktif & periode pembanding secara paralel
+def compute_home_kpis(df, period_start, period_end):
+    return {
+        "total_orders": df["order_id"].nunique(),
+        "total_customers": df["customer_unique_id"].nunique(),
+        "total_sellers": valid_keys(df["seller_key"]).nunique(),
+        "total_revenue": df["payment_value"].sum(),
+        # Hitung rata-rata waktu pengiriman
+        "average_delivery_time": nan_mean(df["delivery_time"]),
+    }
+
+home_kpis, home_kpis_prev = compare_periods("home_kpis", compute_home_kpis, filtered_city_state, select_period,
+                                            start_date, end_date, selected_cities, selected_states,
+                                            comparison_mode, st.session_state.data_fingerprint)
 
 # Line Chart - Tren Jumlah Pesanan per Bulan
 order_trend = filtered_city_state.groupby("year_month").size().reset_index(name="order_count")
-fig_tren = px.area(order_trend, x="year_month", y="order_count",
-                   labels={"year_month": "Bulan", "order_count": "order count"},
-                   markers=True, color_discrete_sequence=px.colors.qualitative.Prism)
-fig_tren.update_layout(xaxis_title=None)
+
+# Figure dibangun hanya jika payload chart untuk data ini belum ada di cache
+def build_tren(order_trend):
+    fig_tren = px.area(order_trend, x="year_month", y="order_count",
+                       labels={"year_month": "Bulan", "order_count": "order count"},
+                       markers=True, color_discrete_sequence=px.colors.qualitative.Prism)
+    fig_tren.update_layout(xaxis_title=None)
+    return fig_tren
 
 
 # Pie Chart - Distribusi Order Berdasarkan Status
 order_status_counts = filtered_city_state["order_status"].value_counts().reset_index()
 order_status_counts.columns = ["order_status", "count"]
-fig_pie = px.pie(order_status_counts, names="order_status", values="count", title=" ",
-                 color_discrete_sequence=px.colors.qualitative.Prism)
+
+def build_pie(order_status_counts):
+    return px.pie(order_status_counts, names="order_status", values="count", title=" ",
+                  color_discrete_sequence=px.colors.qualitative.Prism)
 
 # Bar Chart - Top 5 Kota dengan Pesanan Terbanyak
 top_cities = filtered_date["customer_city"].value_counts().nlargest(5).reset_index()
 top_cities.columns = ["customer_city", "order count"]
-fig_bar_city = px.bar(top_cities, x="order count", y="customer_city",
-                 color="customer_city", orientation="h",
-                 color_discrete_sequence=px.colors.qualitative.Prism)
-fig_bar_city.update_layout(yaxis_title=None, yaxis=dict(showticklabels=False))
+
+def build_bar_city(top_cities):
+    fig_bar_city = px.bar(top_cities, x="order count", y="customer_city",
+                     color="customer_city", orientation="h",
+                     color_discrete_sequence=px.colors.qualitative.Prism)
+    fig_bar_city.update_layout(yaxis_title=None, yaxis=dict(showticklabels=False))
+    return fig_bar_city
 
 
 # Bar Chart - Top 5 State dengan Pesanan Terbanyak
 top_states = filtered_date["customer_state"].value_counts().nlargest(5).reset_index()
 top_states.columns = ["customer_state", "order count"]
-fig_bar_state = px.bar(top_states, x="order count", y="customer_state",
-                 color="customer_state", orientation="h",
-                 color_discrete_sequence=px.colors.qualitative.Prism)
-fig_bar_state.update_layout(yaxis_title=None, yaxis=dict(showticklabels=False))
+
+def build_bar_state(top_states):
+    fig_bar_state = px.bar(top_states, x="order count", y="customer_state",
+                     color="customer_state", orientation="h",
+                     color_discrete_sequence=px.colors.qualitative.Prism)
+    fig_bar_state.update_layout(yaxis_title=None, yaxis=dict(showticklabels=False))
+    return fig_bar_state
 
 #################### Streamlit UI Code ####################
 # Judul halaman home
@@ -79,17 +114,22 @@ st.subheader("🏠 Home")
 
 # Membuat kolom untuk metrik
 col1a, col2a, col3a = st.columns(3)
-col1a.metric("Total Orders", f"📦 {filtered_city_state['order_id'].nunique()}", 
+col1a.metric("Total Orders", f"📦 {home_kpis['total_orders']}", 
+             delta=metric_delta(home_kpis, home_kpis_prev, "total_orders"),
              help="Total jumlah pesanan unik yang dilakukan oleh pelanggan.", border=True)
-col2a.metric("Total Customers", f"👥 {filtered_city_state['customer_unique_id'].nunique()}", 
+col2a.metric("Total Customers", f"👥 {home_kpis['total_customers']}", 
+             delta=metric_delta(home_kpis, home_kpis_prev, "total_customers"),
              help="Jumlah pelanggan unik yang melakukan setidaknya satu transaksi.", border=True)
-col3a.metric("Total Sellers", f"🏬 {filtered_city_state['seller_id'].nunique()}", 
+col3a.metric("Total Sellers", f"🏬 {home_kpis['total_sellers']}", 
+             delta=metric_delta(home_kpis, home_kpis_prev, "total_sellers"),
              help="Jumlah total penjual unik yang beroperasi di platform.", border=True)
 
 col1b, col2b = st.columns(2)
-col1b.metric("Total Revenue", f"💰 R$ {filtered_city_state['payment_value'].sum():,.0f}", 
+col1b.metric("Total Revenue", f"💰 R$ {home_kpis['total_revenue']:,.0f}", 
+             delta=metric_delta(home_kpis, home_kpis_prev, "total_revenue", "R$ {:+,.0f}"),
              help="Total pendapatan yang dihasilkan dari semua transaksi.", border=True)
-col2b.metric("Average Delivery Time", f"🚚 {average_delivery_time:,.0f} Days", 
+col2b.metric("Average Delivery Time", f"🚚 {home_kpis['average_delivery_time']:,.0f} Days", 
+             delta=metric_delta(home_kpis, home_kpis_prev, "average_delivery_time", "{:+,.1f} Days"), delta_color="inverse",
              help="Rata-rata waktu pengiriman dari pesanan dibuat hingga diterima pelanggan.", border=True)
 
 
@@ -98,18 +138,18 @@ col1c, col2c = st.columns([1, 2])
 
 with col1c:
     st.subheader("Order Status Distribution")
-    st.plotly_chart(fig_pie, use_container_width=True)
+    plotly_chart("home.pie", order_status_counts, build_pie, use_container_width=True, data_key=chart_key)
 
 with col2c:
     st.subheader("Order Volume Trend per Month")
-    st.plotly_chart(fig_tren)
+    plotly_chart("home.tren", order_trend, build_tren, data_key=chart_key)
 
 col1d, col2d = st.columns(2)
 
 with col1d:
     st.subheader("Top 5 Cities by Order Volume")
-    st.plotly_chart(fig_bar_city, use_container_width=True)
+    plotly_chart("home.bar_city", top_cities, build_bar_city, use_container_width=True, data_key=chart_key)
 
 with col2d:
     st.subheader("Top 5 States by Order Volume")
-    st.plotly_chart(fig_bar_state, use_container_width=True)
+    plotly_chart("home.bar_state", top_states, build_bar_state, use_container_width=True, data_key=chart_key)
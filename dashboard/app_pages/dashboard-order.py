@@ -1,123 +1,149 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import plotly.express as px
 import streamlit as st
-from wordcloud import WordCloud, STOPWORDS
+
+from app_utils.chart_cache import BR_STATES_GEOJSON_URL, plotly_chart
+from app_utils.comparison import COMPARISON_NONE, compare_periods, duration_delta, metric_delta
+from app_utils.data_loader import PAGE_COLUMNS
+from app_utils.filter_engine import global_filter_key
+from app_utils.quantile_sketch import filtered_quantiles, format_quantile
+from app_utils.time_metrics import duration_seconds, format_duration, group_stats, nan_mean
 
 #################### Data Processing Code ####################
 # Ambil data dari session_state
-if "cust_df" not in st.session_state:
+if "dataset" not in st.session_state:
     st.error("Data belum dimuat! Silakan jalankan main.py terlebih dahulu.")
 else:
-    cust_df = st.session_state.cust_df
+    # Hanya kolom yang dipakai halaman ini yang dimuat
+    cust_df = st.session_state.dataset.frame(PAGE_COLUMNS["order"])
 
 # Ambil filter dari session_state
 selected_date_range = st.session_state.get("selected_date_range", None)
-selected_city = st.session_state.get("selected_city", "All")
-selected_state = st.session_state.get("selected_state", "All")
+selected_cities = st.session_state.get("selected_cities", [])
+selected_states = st.session_state.get("selected_states", [])
+comparison_mode = st.session_state.get("comparison_mode", COMPARISON_NONE)
+filter_bitmaps = st.session_state.filter_bitmaps
+metric_sketches = st.session_state.metric_sketches
 
 # Filter data berdasarkan rentang tanggal
 # Pastikan filter tanggal dalam bentuk datetime
 start_date = pd.to_datetime(selected_date_range[0])
 end_date = pd.to_datetime(selected_date_range[1])
 
-filtered_date = cust_df[
-    (cust_df["order_purchase_timestamp"] >= start_date) &
-    (cust_df["order_purchase_timestamp"] <= end_date)
-]
-
-filtered_city_state = filtered_date.copy()
-
-# Filter berdasarkan Customer City jika dipilih
-if selected_city != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_city"] == selected_city]
-
-# Filter berdasarkan Customer State jika dipilih
-if selected_state != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_state"] == selected_state]
-
-# Hitung total pesanan terkirim & dibatalkan
-total_delivered = filtered_city_state[filtered_city_state["order_status"] == "delivered"].shape[0]
-total_canceled = filtered_city_state[filtered_city_state["order_status"] == "canceled"].shape[0]
-
-# Hitung rata-rata waktu pemrosesan
-filtered_city_state["processing_time"] = (filtered_city_state["order_approved_at"] - 
-                                          filtered_city_state["order_purchase_timestamp"]).dt.total_seconds()
-# Hitung rata-rata waktu pemrosesan dalam detik
-avg_processing_seconds = filtered_city_state["processing_time"].mean()
+# Filter diselesaikan lewat bitmap baris (OR antar nilai yang dipilih, AND antar dimensi)
+filtered_date = filter_bitmaps.select(cust_df, (start_date, end_date))
+filtered_city_state = filter_bitmaps.select(cust_df, (start_date, end_date),
+                                            customer_city=selected_cities, customer_state=selected_states)
+
+# Key cache chart: fingerprint dataset + filter global, data input chart tidak perlu di-hash setiap rerun
+filter_key = global_filter_key(start_date, end_date, selected_cities, selected_states)
+chart_key = (st.session_state.data_fingerprint, filter_key)
+
+# Tidak ada baris untuk filter global yang dipilih: KPI & chart tidak bisa dihitung
+if filtered_city_state.empty:
+    st.warning("Tidak ada data untuk filter yang dipilih. Ubah rentang tanggal, city, atau state di sidebar.")
+    st.stop()
+
+# Data terfilter untuk periode lain (dipakai oleh mode pembanding)
+def select_period(period_start, period_end):
+    return filter_bitmaps.select(cust_df, (period_start, period_end),
+                                 customer_city=selected_cities, customer_state=selected_states)
+
+# KPI halaman order, dihitung untuk periode aktif & periode pembanding secara paralel
+def compute_order_kpis(df, period_start, period_end):
+    # Selisih (delivered - estimated) dalam detik, NaN jika salah satu tanggal kosong
+    period_late_seconds = duration_seconds(df, "order_delivered_customer_date", "order_estimated_delivery_date")
+    # Persentil waktu pengiriman (p50/p90/p99) dari sketch per (bulan, state)
+    delivery_p50, delivery_p90, delivery_p99 = filtered_quantiles(
+        metric_sketches["delivery_time"], df["delivery_time"],
+        period_start, period_end, selected_cities, selected_states)
+    return {
+        # Hitung total pesanan terkirim & dibatalkan
+        "total_delivered": int((df["order_status"] == "delivered").sum()),
+        "total_canceled": int((df["order_status"] == "canceled").sum()),
+        "total_late": int((period_late_seconds > 0).sum()),
+        # Hitung rata-rata waktu pemrosesan dalam detik (approved - purchase)
+        "avg_processing_seconds": nan_mean(duration_seconds(df, "order_approved_at", "order_purchase_timestamp")),
+        # Hitung total detik keterlambatan rata-rata
+        "avg_late_seconds": nan_mean(period_late_seconds[period_late_seconds > 0]),
+        "delivery_p50": delivery_p50,
+        "delivery_p90": delivery_p90,
+        "delivery_p99": delivery_p99,
+    }
+
+order_kpis, order_kpis_prev = compare_periods("order_kpis", compute_order_kpis, filtered_city_state, select_period,
+                                              start_date, end_date, selected_cities, selected_states,
+                                              comparison_mode, st.session_state.data_fingerprint)
 # Konversi ke format X D X H X M
-if not np.isnan(avg_processing_seconds):  
-    days = int(avg_processing_seconds // 86400)  # 1 Hari = 86400 Detik
-    hours = int((avg_processing_seconds % 86400) // 3600)  # Sisa detik dikonversi ke jam
-    minutes = int((avg_processing_seconds % 3600) // 60)  # Sisa detik dikonversi ke menit
-    avg_processing_time_str = f"{days}D {hours}H {minutes}M"
-else:
-    avg_processing_time_str = "N/A"
+avg_processing_time_str = format_duration(order_kpis["avg_processing_seconds"])
+avg_late_time_str = format_duration(order_kpis["avg_late_seconds"])
 
 # Bar Chart → Distribusi Status Pesanan
 order_status_counts = filtered_city_state["order_status"].value_counts().reset_index()
 order_status_counts.columns = ["order_status", "count"]
-fig_bar = px.bar(order_status_counts, x="order_status", y="count", 
-                     color="order_status", color_discrete_sequence=px.colors.qualitative.Prism)
-fig_bar.update_layout(xaxis_title=None, xaxis=dict(showticklabels=False))
+
+def build_bar(order_status_counts):
+    fig_bar = px.bar(order_status_counts, x="order_status", y="count", 
+                         color="order_status", color_discrete_sequence=px.colors.qualitative.Prism)
+    fig_bar.update_layout(xaxis_title=None, xaxis=dict(showticklabels=False))
+    return fig_bar
 
 # Line Chart - Tren Rata-rata Waktu Pengiriman per Bulan
-avg_delivery_trend = filtered_city_state.groupby("year_month")["delivery_time"].mean().reset_index()
+avg_delivery_trend = (group_stats(filtered_city_state["year_month"], filtered_city_state["delivery_time"],
+                                  median=False)["mean"].reset_index())
 avg_delivery_trend.columns = ["year_month", "avg_delivery_time"]
-fig_line = px.area(avg_delivery_trend, x="year_month", y="avg_delivery_time", 
-                   markers=True, color_discrete_sequence=px.colors.qualitative.Prism)
-fig_line.update_layout(xaxis_title=None)
+
+def build_line(avg_delivery_trend):
+    fig_line = px.area(avg_delivery_trend, x="year_month", y="avg_delivery_time", 
+                       markers=True, color_discrete_sequence=px.colors.qualitative.Prism)
+    fig_line.update_layout(xaxis_title=None)
+    return fig_line
 
 # Tabel Interaktif - Pesanan yang melebihi estimasi pengiriman
-filtered_city_state["late_delivery"] = filtered_city_state["order_delivered_customer_date"] > filtered_city_state["order_estimated_delivery_date"]
-late_orders = filtered_city_state[filtered_city_state["late_delivery"]]
+# Selisih (delivered - estimated) dalam detik, NaN jika salah satu tanggal kosong
+late_seconds = duration_seconds(filtered_city_state, "order_delivered_customer_date", "order_estimated_delivery_date")
+late_mask = late_seconds > 0
 
-# Hitung jumlah hari keterlambatan
-late_orders["late_days"] = (late_orders["order_delivered_customer_date"] - 
-                            late_orders["order_estimated_delivery_date"]).dt.days
+# Hitung jumlah hari keterlambatan (hari penuh sebagai integer, sama seperti .dt.days)
+late_orders = filtered_city_state[late_mask].assign(
+    late_days=pd.array(np.floor(late_seconds[late_mask] / 86400), dtype="Int64"))
 
 # Pilih kolom yang relevan untuk tabel
 late_orders_display = late_orders[[
     "order_id", "customer_unique_id", "order_delivered_customer_date", 
     "order_estimated_delivery_date", "late_days", "delivery_time"
 ]]
-# Hitung total detik keterlambatan rata-rata
-avg_late_seconds = (late_orders["order_delivered_customer_date"] - late_orders["order_estimated_delivery_date"]).dt.total_seconds().mean()
-# Konversi ke Hari, Jam, Menit
-if not np.isnan(avg_late_seconds):  
-    days = int(avg_late_seconds // 86400)  # 1 Hari = 86400 Detik
-    hours = int((avg_late_seconds % 86400) // 3600)  # Sisa detik dikonversi ke jam
-    minutes = int((avg_late_seconds % 3600) // 60)  # Sisa detik dikonversi ke menit
-    avg_late_time_str = f"{days}D {hours}H {minutes}M"
-else:
-    avg_late_time_str = "N/A"
-
 
 # Choropleth Map - Distribusi Order per State
-# Mengambil data GeoJSON untuk peta negara bagian Brasil
-br_geojson_url = "https://raw.githubusercontent.com/codeforamerica/click_that_hood/master/public/data/brazil-states.geojson"
 # Menghitung rata-rata order per negara bagian
 order_by_state = filtered_date.groupby("customer_state")["order_id"].nunique().reset_index()
 order_by_state.columns = ["state", "order count"]
-fig_order_state = px.choropleth(order_by_state, geojson=br_geojson_url, 
-                                locations='state', featureidkey="properties.sigla",
-                                color='order count', hover_name='state', 
-                                color_continuous_scale=px.colors.sequential.Viridis,
-                                labels={"order_count": "Jumlah Order"})
-fig_order_state.update_geos(fitbounds="locations", visible=False)
-fig_order_state.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+
+def build_order_state(order_by_state):
+    fig_order_state = px.choropleth(order_by_state, geojson=BR_STATES_GEOJSON_URL, 
+                                    locations='state', featureidkey="properties.sigla",
+                                    color='order count', hover_name='state', 
+                                    color_continuous_scale=px.colors.sequential.Viridis,
+                                    labels={"order_count": "Jumlah Order"})
+    fig_order_state.update_geos(fitbounds="locations", visible=False)
+    fig_order_state.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+    return fig_order_state
 
 # Choropleth Map - Rata-rata Waktu Pengiriman per State
-avg_delivery_by_state = filtered_date.groupby("customer_state")["delivery_time"].mean().reset_index()
+avg_delivery_by_state = (group_stats(filtered_date["customer_state"], filtered_date["delivery_time"],
+                                     median=False)["mean"].reset_index())
 avg_delivery_by_state.columns = ["state", "avg delivery time"]
-fig_avg_delivery_state = px.choropleth(avg_delivery_by_state, geojson=br_geojson_url, 
-                                       locations='state', featureidkey="properties.sigla",
-                                       color='avg delivery time', hover_name='state', 
-                                       color_continuous_scale=px.colors.sequential.Viridis,
-                                       labels={"avg_delivery_time": "Hari"})
-fig_avg_delivery_state.update_geos(fitbounds="locations", visible=False)
-fig_avg_delivery_state.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+
+def build_avg_delivery_state(avg_delivery_by_state):
+    fig_avg_delivery_state = px.choropleth(avg_delivery_by_state, geojson=BR_STATES_GEOJSON_URL, 
+                                           locations='state', featureidkey="properties.sigla",
+                                           color='avg delivery time', hover_name='state', 
+                                           color_continuous_scale=px.colors.sequential.Viridis,
+                                           labels={"avg_delivery_time": "Hari"})
+    fig_avg_delivery_state.update_geos(fitbounds="locations", visible=False)
+    fig_avg_delivery_state.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+    return fig_avg_delivery_state
 
 
 #################### Streamlit UI Code ####################
@@ -127,40 +153,56 @@ st.subheader("📦 Orders Overview")
 
 # Membuat kolom untuk metrik
 col1a, col2a, col3a = st.columns(3)
-col1a.metric("Total Delivered Orders", f"✅ {total_delivered}", 
+col1a.metric("Total Delivered Orders", f"✅ {order_kpis['total_delivered']}", 
+             delta=metric_delta(order_kpis, order_kpis_prev, "total_delivered"),
              help="Jumlah total pesanan yang berhasil dikirim ke pelanggan.", border=True)
-col2a.metric("Total Canceled Orders", f"❌ {total_canceled}", 
+col2a.metric("Total Canceled Orders", f"❌ {order_kpis['total_canceled']}", 
+             delta=metric_delta(order_kpis, order_kpis_prev, "total_canceled"), delta_color="inverse",
              help="Jumlah total pesanan yang dibatalkan sebelum pengiriman.", border=True)
-col3a.metric("Total Late Orders", f"⚠️ {len(late_orders_display)}", 
+col3a.metric("Total Late Orders", f"⚠️ {order_kpis['total_late']}", 
+             delta=metric_delta(order_kpis, order_kpis_prev, "total_late"), delta_color="inverse",
              help="Jumlah total pesanan yang melebihi estimasi waktu pengiriman.", border=True)
 
 col1b, col2b = st.columns(2)
 col1b.metric("Average Processing Time", f"⏳ {avg_processing_time_str}", 
+             delta=duration_delta(order_kpis, order_kpis_prev, "avg_processing_seconds"), delta_color="inverse",
              help="Rata-rata waktu yang dibutuhkan dari pembayaran hingga pesanan disetujui.", border=True)
 col2b.metric("Average Late Time", f"⏳ {avg_late_time_str}", 
+             delta=duration_delta(order_kpis, order_kpis_prev, "avg_late_seconds"), delta_color="inverse",
              help="Rata-rata keterlambatan pesanan dibandingkan estimasi pengiriman.", border=True)
 
+col1p, col2p, col3p = st.columns(3)
+col1p.metric("Median Delivery Time (p50)", f"🚚 {format_quantile(order_kpis['delivery_p50'], '{:,.1f} Days')}", 
+             delta=metric_delta(order_kpis, order_kpis_prev, "delivery_p50", "{:+,.1f} Days"), delta_color="inverse",
+             help="Setengah pesanan diterima pelanggan dalam waktu ini atau lebih cepat.", border=True)
+col2p.metric("Delivery Time p90", f"🚚 {format_quantile(order_kpis['delivery_p90'], '{:,.1f} Days')}", 
+             delta=metric_delta(order_kpis, order_kpis_prev, "delivery_p90", "{:+,.1f} Days"), delta_color="inverse",
+             help="90% pesanan diterima pelanggan dalam waktu ini atau lebih cepat.", border=True)
+col3p.metric("Delivery Time p99", f"🚚 {format_quantile(order_kpis['delivery_p99'], '{:,.1f} Days')}", 
+             delta=metric_delta(order_kpis, order_kpis_prev, "delivery_p99", "{:+,.1f} Days"), delta_color="inverse",
+             help="99% pesanan diterima pelanggan dalam waktu ini atau lebih cepat.", border=True)
+
 
 # Buat dua kolom untuk menampilkan plot
 col1c, col2c = st.columns([1, 2])
 
 with col1c:
     st.subheader("Order Status Distribution")
-    st.plotly_chart(fig_bar, use_container_width=True)
+    plotly_chart("order.bar", order_status_counts, build_bar, use_container_width=True, data_key=chart_key)
 
 with col2c:
     st.subheader("Average Delivery Time Trend per Month")
-    st.plotly_chart(fig_line, use_container_width=True)
+    plotly_chart("order.line", avg_delivery_trend, build_line, use_container_width=True, data_key=chart_key)
 
 col1d, col2d= st.columns(2)
 
 with col1d:
     st.subheader("Total Number of Orders by State")
-    st.plotly_chart(fig_order_state, use_container_width=True)
+    plotly_chart("order.order_state", order_by_state, build_order_state, use_container_width=True, data_key=chart_key)
 
 with col2d:
     st.subheader("Average Delivery Time by State")
-    st.plotly_chart(fig_avg_delivery_state, use_container_width=True)
+    plotly_chart("order.avg_delivery_state", avg_delivery_by_state, build_avg_delivery_state, use_container_width=True, data_key=chart_key)
 
 st.subheader("Late Delivery Orders Table")
 st.dataframe(late_orders_display, use_container_width=True)
\ No newline at end of file
@@ -1,53 +1,84 @@
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 import plotly.express as px
 import streamlit as st
-from wordcloud import WordCloud, STOPWORDS
+
+from app_utils.chart_cache import BR_STATES_GEOJSON_URL, plotly_chart
+from app_utils.comparison import COMPARISON_NONE, compare_periods, metric_delta
+from app_utils.data_loader import PAGE_COLUMNS
+from app_utils.filter_engine import global_filter_key
+from app_utils.quantile_sketch import filtered_quantiles, format_quantile
 
 #################### Data Processing Code ####################
 # Ambil data dari session_state
-if "cust_df" not in st.session_state:
+if "dataset" not in st.session_state:
     st.error("Data belum dimuat! Silakan jalankan main.py terlebih dahulu.")
-    cust_df = st.session_state.cust_df
+    cust_df = st.session_state.dataset.frame(PAGE_COLUMNS["payment"])
 else:
-    cust_df = st.session_state.cust_df
+    # Hanya kolom yang dipakai halaman ini yang dimuat
+    cust_df = st.session_state.dataset.frame(PAGE_COLUMNS["payment"])
 
 # Ambil filter dari session_state
 selected_date_range = st.session_state.get("selected_date_range", None)
-selected_city = st.session_state.get("selected_city", "All")
-selected_state = st.session_state.get("selected_state", "All")
+selected_cities = st.session_state.get("selected_cities", [])
+selected_states = st.session_state.get("selected_states", [])
+comparison_mode = st.session_state.get("comparison_mode", COMPARISON_NONE)
+filter_bitmaps = st.session_state.filter_bitmaps
+metric_sketches = st.session_state.metric_sketches
 
 # Filter data berdasarkan rentang tanggal
 # Pastikan filter tanggal dalam bentuk datetime
 start_date = pd.to_datetime(selected_date_range[0])
 end_date = pd.to_datetime(selected_date_range[1])
 
-filtered_date = cust_df[
-    (cust_df["order_purchase_timestamp"] >= start_date) &
-    (cust_df["order_purchase_timestamp"] <= end_date)
-]
-
-filtered_city_state = filtered_date.copy()
-
-# Filter berdasarkan Customer City jika dipilih
-if selected_city != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_city"] == selected_city]
-
-# Filter berdasarkan Customer State jika dipilih
-if selected_state != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_state"] == selected_state]
-
-# Menghitung rata-rata total transaksi pembayaran
-avg_payment_transactions = filtered_city_state["payment_value"].mean()
+# Filter diselesaikan lewat bitmap baris (OR antar nilai yang dipilih, AND antar dimensi)
+filtered_date = filter_bitmaps.select(cust_df, (start_date, end_date))
+filtered_city_state = filter_bitmaps.select(cust_df, (start_date, end_date),
+                                            customer_city=selected_cities, customer_state=selected_states)
+
+# Key cache chart: fingerprint dataset + filter global, data input chart tidak perlu di-hash setiap rerun
+filter_key = global_filter_key(start_date, end_date, selected_cities, selected_states)
+chart_key = (st.session_state.data_fingerprint, filter_key)
+
+# Tidak ada baris untuk filter global yang dipilih: KPI & chart tidak bisa dihitung
+if filtered_city_state.empty:
+    st.warning("Tidak ada data untuk filter yang dipilih. Ubah rentang tanggal, city, atau state di sidebar.")
+    st.stop()
+
+# Data terfilter untuk periode lain (dipakai oleh mode pembanding)
+def select_period(period_start, period_end):
+    return filter_bitmaps.select(cust_df, (period_start, period_end),
+                                 customer_city=selected_cities, customer_state=selected_states)
+
+# KPI halaman payment, dihitung untuk periode aktif & periode pembanding secara paralel
+def compute_payment_kpis(df, period_start, period_end):
+    # Persentil nilai transaksi (ticket size) dari sketch per (bulan, state)
+    payment_p50, payment_p90, payment_p99 = filtered_quantiles(
+        metric_sketches["payment_value"], df["payment_value"],
+        period_start, period_end, selected_cities, selected_states)
+    return {
+        # Menghitung rata-rata total transaksi pembayaran
+        "avg_payment_transactions": df["payment_value"].mean(),
+        # Porsi transaksi per metode pembayaran (%), metode terbanyak = most used
+        "payment_type_share": (df["payment_type"].value_counts(normalize=True) * 100).to_dict(),
+        # Menghitung rata-rata cicilan per transaksi
+        "avg_installments_per_transaction": df["payment_installments"].mean(),
+        "payment_p50": payment_p50,
+        "payment_p90": payment_p90,
+        "payment_p99": payment_p99,
+    }
+
+payment_kpis, payment_kpis_prev = compare_periods("payment_kpis", compute_payment_kpis, filtered_city_state,
+                                                  select_period, start_date, end_date, selected_cities,
+                                                  selected_states, comparison_mode, st.session_state.data_fingerprint)
 
 # Menentukan metode pembayaran yang paling sering digunakan
-most_used_payment_method = (filtered_city_state["payment_type"]
-                            .value_counts()
-                            .idxmax()) 
-
-# Menghitung rata-rata cicilan per transaksi
-avg_installments_per_transaction = filtered_city_state["payment_installments"].mean()
+payment_type_share = payment_kpis["payment_type_share"]
+most_used_payment_method = max(payment_type_share, key=payment_type_share.get)
+# Delta metode terbanyak = perubahan porsinya dibanding periode pembanding
+most_used_share_delta = metric_delta(
+    {"share": payment_type_share[most_used_payment_method]},
+    {"share": payment_kpis_prev["payment_type_share"].get(most_used_payment_method, 0)} if payment_kpis_prev else None,
+    "share", "{:+.2f}% share")
 
 # Pie Chart - Distribusi Metode Pembayaran
 # Hitung distribusi metode pembayaran
@@ -55,10 +86,11 @@ payment_distribution = filtered_city_state["payment_type"].value_counts().reset_
 payment_distribution.columns = ["payment_type", "count"]
 
 # Buat Pie Chart
-fig_payment_pie = px.pie(payment_distribution, 
-                          names="payment_type", 
-                          values="count", 
-                          color_discrete_sequence=px.colors.qualitative.Prism)
+def build_payment_pie(payment_distribution):
+    return px.pie(payment_distribution, 
+                   names="payment_type", 
+                   values="count", 
+                   color_discrete_sequence=px.colors.qualitative.Prism)
 
 # Line Chart - Tren Revenue Bulanan
 # Hitung total revenue per bulan per metode pembayaran
@@ -66,20 +98,22 @@ monthly_revenue_trend = (filtered_city_state.groupby(["year_month", "payment_typ
                          .sum().reset_index())
 
 # Buat Line Chart dengan warna berbeda untuk setiap metode pembayaran
-fig_revenue_trend = px.line(monthly_revenue_trend, 
-                            x="year_month", 
-                            y="payment_value", 
-                            color="payment_type",
-                            markers=True,  
-                            labels={
-                                "year_month": "Month", 
-                                "payment_value": "Total Revenue (R$)",
-                                "payment_type": "Payment Method"
-                            },
-                            color_discrete_sequence=px.colors.qualitative.Prism)
-
-# Perbaiki tampilan
-fig_revenue_trend.update_layout(xaxis_title=None, yaxis_title="Revenue (R$)", xaxis_tickangle=-45)
+def build_revenue_trend(monthly_revenue_trend):
+    fig_revenue_trend = px.line(monthly_revenue_trend, 
+                                x="year_month", 
+                                y="payment_value", 
+                                color="payment_type",
+                                markers=True,  
+                                labels={
+                                    "year_month": "Month", 
+                                    "payment_value": "Total Revenue (R$)",
+                                    "payment_type": "Payment Method"
+                                },
+                                color_discrete_sequence=px.colors.qualitative.Prism)
+
+    # Perbaiki tampilan
+    fig_revenue_trend.update_layout(xaxis_title=None, yaxis_title="Revenue (R$)", xaxis_tickangle=-45)
+    return fig_revenue_trend
 
 #################### Streamlit UI Code ####################
 # Judul halaman home
@@ -89,29 +123,44 @@ st.subheader("💳 Payments & Revenue")
 # Membuat kolom untuk metrik
 col1a, col2a, col3a = st.columns(3)
 
-col1a.metric("Average Payment Transactions", f"💰 R$ {avg_payment_transactions:,.2f}", help="Rata-rata nilai transaksi pembayaran per order.", border=True)
-col2a.metric("Most Used Payment Method", f"💳 {most_used_payment_method}", help="Metode pembayaran yang paling sering digunakan oleh pelanggan.", border=True)
-col3a.metric("Average Installment per Transaction", f"📆 {avg_installments_per_transaction:.0f}", help="Rata-rata jumlah cicilan yang dipilih oleh pelanggan per transaksi.", border=True)
+col1a.metric("Average Payment Transactions", f"💰 R$ {payment_kpis['avg_payment_transactions']:,.2f}",
+             delta=metric_delta(payment_kpis, payment_kpis_prev, "avg_payment_transactions", "R$ {:+,.2f}"), help="Rata-rata nilai transaksi pembayaran per order.", border=True)
+col2a.metric("Most Used Payment Method", f"💳 {most_used_payment_method}",
+             delta=most_used_share_delta, help="Metode pembayaran yang paling sering digunakan oleh pelanggan.", border=True)
+col3a.metric("Average Installment per Transaction", f"📆 {payment_kpis['avg_installments_per_transaction']:.0f}",
+             delta=metric_delta(payment_kpis, payment_kpis_prev, "avg_installments_per_transaction", "{:+.2f}"), delta_color="off", help="Rata-rata jumlah cicilan yang dipilih oleh pelanggan per transaksi.", border=True)
+
+col1p, col2p, col3p = st.columns(3)
+col1p.metric("Median Ticket Size (p50)", f"🧾 {format_quantile(payment_kpis['payment_p50'], 'R$ {:,.2f}')}",
+             delta=metric_delta(payment_kpis, payment_kpis_prev, "payment_p50", "R$ {:+,.2f}"), help="Setengah transaksi bernilai sebesar ini atau lebih kecil.", border=True)
+col2p.metric("Ticket Size p90", f"🧾 {format_quantile(payment_kpis['payment_p90'], 'R$ {:,.2f}')}",
+             delta=metric_delta(payment_kpis, payment_kpis_prev, "payment_p90", "R$ {:+,.2f}"), help="90% transaksi bernilai sebesar ini atau lebih kecil.", border=True)
+col3p.metric("Ticket Size p99", f"🧾 {format_quantile(payment_kpis['payment_p99'], 'R$ {:,.2f}')}",
+             delta=metric_delta(payment_kpis, payment_kpis_prev, "payment_p99", "R$ {:+,.2f}"), help="99% transaksi bernilai sebesar ini atau lebih kecil.", border=True)
 
 # Membuat kolom untuk plot
 col1b, col2b = st.columns([1, 2])
 
 with col1b:
     st.subheader("Payment Method Distribution")
-    st.plotly_chart(fig_payment_pie)
+    plotly_chart("payment.payment_pie", payment_distribution, build_payment_pie, data_key=chart_key)
 
 with col2b:
     st.subheader("Monthly Revenue Trend by Payment Method")
-    st.plotly_chart(fig_revenue_trend)
+    plotly_chart("payment.revenue_trend", monthly_revenue_trend, build_revenue_trend, data_key=chart_key)
 
 st.subheader("Total Payment Value by State")
 
-# Filter multiselect metode pembayaran
+# Filter multiselect metode pembayaran (pilihan = metode yang ada pada rentang tanggal)
 payment_methods = filtered_date["payment_type"].dropna().unique()
 selected_payments = st.multiselect("Select Payment Methods:", payment_methods, default=payment_methods)
 
-# Filter dataset berdasarkan metode pembayaran yang dipilih
-filtered_payment_data = filtered_date[filtered_date["payment_type"].isin(selected_payments)]
+# Filter dataset berdasarkan metode pembayaran yang dipilih.
+# Pilihan kosong berarti tidak ada metode (peta kosong), bukan semua metode seperti list kosong di bitmap.
+if selected_payments:
+    filtered_payment_data = filter_bitmaps.select(cust_df, (start_date, end_date), payment_type=selected_payments)
+else:
+    filtered_payment_data = filtered_date.iloc[:0]
 
 # Hitung total payment value per customer_state
 payment_distribution = (filtered_payment_data.groupby("customer_state")["payment_value"]
@@ -119,20 +168,20 @@ payment_distribution = (filtered_payment_data.groupby("customer_state")["payment
 payment_distribution.columns = ["customer_state", "total_payment_value"]
 
 # Choropleth Map - Total Payment Value per Provinsi
-# Load GeoJSON untuk peta Brasil
-br_geojson_url = "https://raw.githubusercontent.com/codeforamerica/click_that_hood/master/public/data/brazil-states.geojson"
-fig_payment_map = px.choropleth(payment_distribution, 
-                                geojson=br_geojson_url, 
-                                locations='customer_state', 
-                                featureidkey="properties.sigla",
-                                color='total_payment_value', 
-                                hover_name='customer_state',
-                                color_continuous_scale=px.colors.sequential.Viridis,
-                                labels={"total_payment_value": "Total Payment Value (R$)"})
-
-# Sesuaikan tampilan peta
-fig_payment_map.update_geos(fitbounds="locations", visible=False)
-fig_payment_map.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
-
-st.plotly_chart(fig_payment_map)
+def build_payment_map(payment_distribution):
+    fig_payment_map = px.choropleth(payment_distribution, 
+                                    geojson=BR_STATES_GEOJSON_URL, 
+                                    locations='customer_state', 
+                                    featureidkey="properties.sigla",
+                                    color='total_payment_value', 
+                                    hover_name='customer_state',
+                                    color_continuous_scale=px.colors.sequential.Viridis,
+                                    labels={"total_payment_value": "Total Payment Value (R$)"})
+
+    # Sesuaikan tampilan peta
+    fig_payment_map.update_geos(fitbounds="locations", visible=False)
+    fig_payment_map.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+    return fig_payment_map
+
+plotly_chart("payment.payment_map", payment_distribution, build_payment_map, data_key=chart_key + (tuple(sorted(selected_payments)),))
 
@@ -1,112 +1,160 @@
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 import plotly.express as px
 import streamlit as st
-from wordcloud import WordCloud, STOPWORDS
+
+from app_utils.chart_cache import plotly_chart
+from app_utils.comparison import COMPARISON_NONE, category_delta, compare_periods
+from app_utils.data_loader import PAGE_COLUMNS
+from app_utils.dimensions import valid_keys
+from app_utils.filter_engine import global_filter_key
 
 #################### Data Processing Code ####################
 # Ambil data dari session_state
-if "cust_df" not in st.session_state:
+if "dataset" not in st.session_state:
     st.error("Data belum dimuat! Silakan jalankan main.py terlebih dahulu.")
-    cust_df = st.session_state.cust_df
+    cust_df = st.session_state.dataset.frame(PAGE_COLUMNS["product"])
 else:
-    cust_df = st.session_state.cust_df
+    # Hanya kolom yang dipakai halaman ini yang dimuat
+    cust_df = st.session_state.dataset.frame(PAGE_COLUMNS["product"])
 
 # Ambil filter dari session_state
 selected_date_range = st.session_state.get("selected_date_range", None)
-selected_city = st.session_state.get("selected_city", "All")
-selected_state = st.session_state.get("selected_state", "All")
+selected_cities = st.session_state.get("selected_cities", [])
+selected_states = st.session_state.get("selected_states", [])
+comparison_mode = st.session_state.get("comparison_mode", COMPARISON_NONE)
+filter_bitmaps = st.session_state.filter_bitmaps
+# Atribut produk (id, kategori, berat, dimensi) diambil dari tabel dimensi berdasarkan product_key
+products = st.session_state.dimensions["product"]
 
 # Filter data berdasarkan rentang tanggal
 # Pastikan filter tanggal dalam bentuk datetime
 start_date = pd.to_datetime(selected_date_range[0])
 end_date = pd.to_datetime(selected_date_range[1])
 
-filtered_date = cust_df[
-    (cust_df["order_purchase_timestamp"] >= start_date) &
-    (cust_df["order_purchase_timestamp"] <= end_date)
-]
-
-filtered_city_state = filtered_date.copy()
-
-# Filter berdasarkan Customer City jika dipilih
-if selected_city != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_city"] == selected_city]
-
-# Filter berdasarkan Customer State jika dipilih
-if selected_state != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_state"] == selected_state]
-
-# Hitung kategori produk paling laris berdasarkan jumlah order
-top_selling_category = (
-    filtered_city_state.groupby("product_category_name_english")["order_id"].count()
-    .reset_index().sort_values(by="order_id", ascending=False).iloc[0])
-top_selling_name = top_selling_category["product_category_name_english"]
-top_selling_value = top_selling_category["order_id"]
-
-# Hitung kategori dengan rating tertinggi (rata-rata rating tertinggi)
-top_rated_category = (
-    filtered_city_state.groupby("product_category_name_english")["review_score"].mean()
-    .reset_index().sort_values(by="review_score", ascending=False).iloc[0])
-top_rated_name = top_rated_category["product_category_name_english"]
-top_rated_value = f"{top_rated_category['review_score']:.1f}/5"
-
-# Hitung kategori dengan jumlah ulasan terbanyak
-most_reviewed_category = (
-    filtered_city_state.groupby("product_category_name_english")["review_id"].count()
-    .reset_index().sort_values(by="review_id", ascending=False).iloc[0])
-most_reviewed_name = most_reviewed_category["product_category_name_english"]
-most_reviewed_value = most_reviewed_category["review_id"]
+# Filter diselesaikan lewat bitmap baris (OR antar nilai yang dipilih, AND antar dimensi)
+filtered_date = filter_bitmaps.select(cust_df, (start_date, end_date))
+filtered_city_state = filter_bitmaps.select(cust_df, (start_date, end_date),
+                                            customer_city=selected_cities, customer_state=selected_states)
+
+# Key cache chart: fingerprint dataset + filter global, data input chart tidak perlu di-hash setiap rerun
+filter_key = global_filter_key(start_date, end_date, selected_cities, selected_states)
+chart_key = (st.session_state.data_fingerprint, filter_key)
+
+# Tidak ada baris untuk filter global yang dipilih: KPI & chart tidak bisa dihitung
+if filtered_city_state.empty:
+    st.warning("Tidak ada data untuk filter yang dipilih. Ubah rentang tanggal, city, atau state di sidebar.")
+    st.stop()
+
+# Data terfilter untuk periode lain (dipakai oleh mode pembanding)
+def select_period(period_start, period_end):
+    return filter_bitmaps.select(cust_df, (period_start, period_end),
+                                 customer_city=selected_cities, customer_state=selected_states)
+
+# Kategori dengan nilai terbesar sebagai (nama, nilai); None jika tidak ada kategori yang terisi
+# (mis. filter city yang barisnya tidak punya kategori produk)
+def top_category(values):
+    values = values.dropna()
+    if values.empty:
+        return None
+    return values.idxmax(), values.max()
+
+# Semua agregat produk dihitung dalam satu fungsi agar hasilnya bisa disimpan di disk cache
+# dan dihitung paralel untuk periode pembanding
+def compute_product_aggregates(df, period_start, period_end):
+    # Kategori hanya di-gather untuk baris pada periode ini
+    df = products.attach(df, "product_category_name_english")
+
+    # Nilai per kategori disimpan utuh: delta dihitung untuk kategori teratas periode ini,
+    # bukan kategori teratas periode pembanding yang bisa berbeda
+    category_sales = df.groupby("product_category_name_english")["order_id"].count()
+    category_rating = df.groupby("product_category_name_english")["review_score"].mean()
+    category_reviews = df.groupby("product_category_name_english")["review_id"].count()
+
+    # Hitung total penjualan per kategori produk, ambil 5 teratas
+    top_categories = (df.groupby("product_category_name_english")["order_item_id"].count().nlargest(5).index)
+
+    # Filter data hanya untuk 5 kategori teratas
+    monthly_sales_trend_top5 = (df[df["product_category_name_english"].isin(top_categories)]
+                                .groupby(["year_month", "product_category_name_english"])["order_item_id"].count().reset_index())
+
+    # Hitung total pendapatan per kategori produk
+    top_categories_revenue = (df.groupby("product_category_name_english")["payment_value"]
+                              .sum().reset_index().sort_values(by="payment_value", ascending=False).head(5))
+
+    # Hitung jumlah penjualan per produk
+    top_products_sales = (df.groupby(valid_keys(df["product_key"]))["order_item_id"]
+                          .count().reset_index()
+                          .sort_values(by="order_item_id", ascending=False)
+                          .head(5))  # Ambil Top 5 Produk
+    top_products_sales["product_id"] = products.gather(top_products_sales["product_key"], "product_id")
+
+    return {
+        # Kategori paling laris (jumlah order), rating rata-rata tertinggi, dan ulasan terbanyak
+        "top_selling_category": top_category(category_sales),
+        "category_sales": category_sales.to_dict(),
+        "top_rated_category": top_category(category_rating),
+        "category_rating": category_rating.to_dict(),
+        "most_reviewed_category": top_category(category_reviews),
+        "category_reviews": category_reviews.to_dict(),
+        "monthly_sales_trend_top5": monthly_sales_trend_top5,
+        "top_categories_revenue": top_categories_revenue,
+        "top_products_sales": top_products_sales,
+    }
+
+# Ambil agregat dari disk cache (key: fingerprint data + filter global), periode pembanding ikut dihitung paralel
+product_aggregates, product_aggregates_prev = compare_periods("product_aggregates", compute_product_aggregates,
+                                                              filtered_city_state, select_period, start_date, end_date,
+                                                              selected_cities, selected_states, comparison_mode,
+                                                              st.session_state.data_fingerprint)
+
+top_selling_name, top_selling_value = product_aggregates["top_selling_category"] or ("-", "-")
+top_rated_name, top_rated_score = product_aggregates["top_rated_category"] or ("-", None)
+top_rated_value = "-" if top_rated_score is None else f"{top_rated_score:.1f}/5"
+most_reviewed_name, most_reviewed_value = product_aggregates["most_reviewed_category"] or ("-", "-")
 
 # Line Chart - Tren jumlah produk yang terjual per bulan.
-# Hitung total penjualan per kategori produk
-top_categories = (filtered_city_state.groupby("product_category_name_english")["order_item_id"].count().nlargest(5).index)
-
-# Filter data hanya untuk 5 kategori teratas
-monthly_sales_trend_top5 = (filtered_city_state[filtered_city_state["product_category_name_english"].isin(top_categories)]
-                            .groupby(["year_month", "product_category_name_english"])["order_item_id"].count().reset_index())
+monthly_sales_trend_top5 = product_aggregates["monthly_sales_trend_top5"]
 
 # Buat Line Chart untuk 5 kategori teratas
-fig_sales_trend_top5 = px.line(monthly_sales_trend_top5, x="year_month", y="order_item_id", 
-                               color="product_category_name_english", markers=True,
-                               color_discrete_sequence=px.colors.qualitative.Prism,
-                               labels={
-                                   "year_month": "Month", 
-                                   "order_item_id": "Total Products Sold", 
-                                   "product_category_name": "Product Category"})
-
-fig_sales_trend_top5.update_layout(xaxis_title=None, yaxis_title="Total Products Sold", xaxis_tickangle=-45)
+def build_sales_trend_top5(monthly_sales_trend_top5):
+    fig_sales_trend_top5 = px.line(monthly_sales_trend_top5, x="year_month", y="order_item_id", 
+                                   color="product_category_name_english", markers=True,
+                                   color_discrete_sequence=px.colors.qualitative.Prism,
+                                   labels={
+                                       "year_month": "Month", 
+                                       "order_item_id": "Total Products Sold", 
+                                       "product_category_name": "Product Category"})
+
+    fig_sales_trend_top5.update_layout(xaxis_title=None, yaxis_title="Total Products Sold", xaxis_tickangle=-45)
+    return fig_sales_trend_top5
 
 # Bar Chart - Top 5 Kategori Produk dengan Pendapatan Tertinggi
-# Hitung total pendapatan per kategori produk
-top_categories_revenue = (filtered_city_state.groupby("product_category_name_english")["payment_value"]
-                          .sum().reset_index().sort_values(by="payment_value", ascending=False).head(5))
+top_categories_revenue = product_aggregates["top_categories_revenue"]
 
 # Buat Bar Chart
-fig_top_categories_revenue = px.bar(top_categories_revenue, x="payment_value", y="product_category_name_english",
-                                    orientation="h", labels={"payment_value": "Total Revenue (R$)", "product_category_name_english": "Product Category"},
-                                    color="product_category_name_english", color_discrete_sequence=px.colors.qualitative.Prism)
+def build_top_categories_revenue(top_categories_revenue):
+    fig_top_categories_revenue = px.bar(top_categories_revenue, x="payment_value", y="product_category_name_english",
+                                        orientation="h", labels={"payment_value": "Total Revenue (R$)", "product_category_name_english": "Product Category"},
+                                        color="product_category_name_english", color_discrete_sequence=px.colors.qualitative.Prism)
 
-# Perbaiki tampilan
-fig_top_categories_revenue.update_layout(yaxis=dict(categoryorder="total ascending"), showlegend=False)
+    # Perbaiki tampilan
+    fig_top_categories_revenue.update_layout(yaxis=dict(categoryorder="total ascending"), showlegend=False)
+    return fig_top_categories_revenue
 
 
 # Bar Chart - Top 5 Produk dengan Jumlah Penjualan Tertinggi
-# Hitung jumlah penjualan per produk
-top_products_sales = (filtered_city_state.groupby("product_id")["order_item_id"]
-                      .count().reset_index()
-                      .sort_values(by="order_item_id", ascending=False)
-                      .head(5))  # Ambil Top 5 Produk
+top_products_sales = product_aggregates["top_products_sales"]
 
 # Buat Bar Chart dengan product_id sebagai label
-fig_top_products_sales = px.bar(top_products_sales, x="order_item_id", y="product_id",
-                                orientation="h", color="product_id",
-                                labels={"order_item_id": "Total Sales", "product_id": "Product ID"},
-                                color_discrete_sequence=px.colors.qualitative.Prism)
+def build_top_products_sales(top_products_sales):
+    fig_top_products_sales = px.bar(top_products_sales, x="order_item_id", y="product_id",
+                                    orientation="h", color="product_id",
+                                    labels={"order_item_id": "Total Sales", "product_id": "Product ID"},
+                                    color_discrete_sequence=px.colors.qualitative.Prism)
 
-# Perbaiki tampilan agar urutan dari atas ke bawah
-fig_top_products_sales.update_layout(yaxis=dict(categoryorder="total ascending"), showlegend=False)
+    # Perbaiki tampilan agar urutan dari atas ke bawah
+    fig_top_products_sales.update_layout(yaxis=dict(categoryorder="total ascending"), showlegend=False)
+    return fig_top_products_sales
 
 #################### Streamlit UI Code ####################
 # Judul halaman home
@@ -114,19 +162,22 @@ st.title("Brazilian E-commerce Dashboard 📊")
 st.subheader("🛍️ Product Analysis")
 
 # Menampilkan metrik utama
-st.metric("Top Selling Category", f"🔥 {top_selling_name} ({top_selling_value} sales)", help="Kategori produk dengan jumlah order terbanyak.", border=True)
-st.metric("Top Rated Category", f"⭐ {top_rated_name} ({top_rated_value})", help="Kategori produk dengan rating rata-rata tertinggi.", border=True)
-st.metric("Most Reviewed Category", f"💬 {most_reviewed_name} ({most_reviewed_value} reviews)", help="Kategori produk dengan jumlah ulasan terbanyak.", border=True)
+st.metric("Top Selling Category", f"🔥 {top_selling_name} ({top_selling_value} sales)",
+          delta=category_delta(product_aggregates, product_aggregates_prev, "category_sales", top_selling_name, "{:+,.0f} sales"), help="Kategori produk dengan jumlah order terbanyak.", border=True)
+st.metric("Top Rated Category", f"⭐ {top_rated_name} ({top_rated_value})",
+          delta=category_delta(product_aggregates, product_aggregates_prev, "category_rating", top_rated_name, "{:+.1f}"), help="Kategori produk dengan rating rata-rata tertinggi.", border=True)
+st.metric("Most Reviewed Category", f"💬 {most_reviewed_name} ({most_reviewed_value} reviews)",
+          delta=category_delta(product_aggregates, product_aggregates_prev, "category_reviews", most_reviewed_name, "{:+,.0f} reviews"), help="Kategori produk dengan jumlah ulasan terbanyak.", border=True)
 
 st.subheader("Top 5 Product Categories Sales Trend per Month")
-st.plotly_chart(fig_sales_trend_top5, use_container_width=True)
+plotly_chart("product.sales_trend_top5", monthly_sales_trend_top5, build_sales_trend_top5, use_container_width=True, data_key=chart_key)
 
 col1a, col2a = st.columns(2)
 
 with col1a:
     st.subheader("Top 5 Product Categories by Revenue")
-    st.plotly_chart(fig_top_categories_revenue, use_container_width=True)
+    plotly_chart("product.top_categories_revenue", top_categories_revenue, build_top_categories_revenue, use_container_width=True, data_key=chart_key)
 
 with col2a:
     st.subheader("Top 5 Most Purchased Products Based on Sales Count")
-    st.plotly_chart(fig_top_products_sales, use_container_width=True)
+    plotly_chart("product.top_products_sales", top_products_sales, build_top_products_sales, use_container_width=True, data_key=chart_key)
@@ -1,48 +1,75 @@
 import pandas as pd
-import numpy as np
 import matplotlib.pyplot as plt
 import plotly.express as px
 import streamlit as st
 from wordcloud import WordCloud, STOPWORDS
 
+from app_utils.chart_cache import BR_STATES_GEOJSON_URL, plotly_chart
+from app_utils.comparison import COMPARISON_NONE, compare_periods, metric_delta
+from app_utils.data_loader import PAGE_COLUMNS
+from app_utils.disk_cache import default_cache
+from app_utils.filter_engine import global_filter_key
+from app_utils.text_index import build_review_index
+
 #################### Data Processing Code ####################
 # Ambil data dari session_state
-if "cust_df" not in st.session_state:
+if "dataset" not in st.session_state:
     st.error("Data belum dimuat! Silakan jalankan main.py terlebih dahulu.")
-    cust_df = st.session_state.cust_df
+    cust_df = st.session_state.dataset.frame(PAGE_COLUMNS["review"])
 else:
-    cust_df = st.session_state.cust_df
+    # Hanya kolom yang dipakai halaman ini yang dimuat
+    cust_df = st.session_state.dataset.frame(PAGE_COLUMNS["review"])
 
 # Ambil filter dari session_state
 selected_date_range = st.session_state.get("selected_date_range", None)
-selected_city = st.session_state.get("selected_city", "All")
-selected_state = st.session_state.get("selected_state", "All")
+selected_cities = st.session_state.get("selected_cities", [])
+selected_states = st.session_state.get("selected_states", [])
+comparison_mode = st.session_state.get("comparison_mode", COMPARISON_NONE)
+filter_bitmaps = st.session_state.filter_bitmaps
 
 # Filter data berdasarkan rentang tanggal
 # Pastikan filter tanggal dalam bentuk datetime
 start_date = pd.to_datetime(selected_date_range[0])
 end_date = pd.to_datetime(selected_date_range[1])
 
-filtered_date = cust_df[
-    (cust_df["order_purchase_timestamp"] >= start_date) &
-    (cust_df["order_purchase_timestamp"] <= end_date)
-]
+# Filter diselesaikan lewat bitmap baris (OR antar nilai yang dipilih, AND antar dimensi)
+filtered_date = filter_bitmaps.select(cust_df, (start_date, end_date))
+filtered_city_state = filter_bitmaps.select(cust_df, (start_date, end_date),
+                                            customer_city=selected_cities, customer_state=selected_states)
+
+# Key cache chart: fingerprint dataset + filter global, data input chart tidak perlu di-hash setiap rerun
+filter_key = global_filter_key(start_date, end_date, selected_cities, selected_states)
+chart_key = (st.session_state.data_fingerprint, filter_key)
 
-filtered_city_state = filtered_date.copy()
+# Tidak ada baris untuk filter global yang dipilih: KPI & chart tidak bisa dihitung
+if filtered_city_state.empty:
+    st.warning("Tidak ada data untuk filter yang dipilih. Ubah rentang tanggal, city, atau state di sidebar.")
+    st.stop()
 
-# Filter berdasarkan Customer City jika dipilih
-if selected_city != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_city"] == selected_city]
+# Data terfilter untuk periode lain (dipakai oleh mode pembanding)
+def select_period(period_start, period_end):
+    return filter_bitmaps.select(cust_df, (period_start, period_end),
+                                 customer_city=selected_cities, customer_state=selected_states)
 
-# Filter berdasarkan Customer State jika dipilih
-if selected_state != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_state"] == selected_state]
+# Inverted index komentar ulasan, dibangun sekali per proses (dan disimpan di disk cache)
+@st.cache_resource
+def load_review_index(fingerprint):
+    return default_cache().get_or_compute(("review_index", fingerprint), lambda: build_review_index(cust_df))
 
-# Menghitung skor ulasan rata-rata
-avg_review_score = filtered_city_state["review_score"].mean()
+# KPI halaman review, dihitung untuk periode aktif & periode pembanding secara paralel
+def compute_review_kpis(df, period_start, period_end):
+    return {
+        # Menghitung skor ulasan rata-rata
+        "avg_review_score": df["review_score"].mean(),
+        # Menghitung jumlah total ulasan
+        "total_reviews_count": int(df["review_score"].count()),
+        # Menghitung rata-rata skor sentimen komentar (-1 negatif s.d. 1 positif, dihitung saat load data)
+        "avg_sentiment_score": df["review_sentiment"].mean(),
+    }
 
-# Menghitung jumlah total ulasan
-total_reviews_count = filtered_city_state["review_score"].count()
+review_kpis, review_kpis_prev = compare_periods("review_kpis", compute_review_kpis, filtered_city_state, select_period,
+                                                start_date, end_date, selected_cities, selected_states,
+                                                comparison_mode, st.session_state.data_fingerprint)
 
 
 
@@ -53,10 +80,14 @@ st.title("Brazilian E-commerce Dashboard 📊")
 st.subheader("⭐ Reviews & Ratings")
 
 # Membuat kolom untuk metrik
-col1a, col2a = st.columns(2)
+col1a, col2a, col3a = st.columns(3)
 
-col1a.metric("Average Review Score", f"⭐ {avg_review_score:.2f}", help="Rata-rata skor ulasan yang diberikan pelanggan.", border=True)
-col2a.metric("Total Reviews Count", f"📝 {total_reviews_count:,}", help="Jumlah total ulasan yang diberikan pelanggan.", border=True)
+col1a.metric("Average Review Score", f"⭐ {review_kpis['avg_review_score']:.2f}",
+             delta=metric_delta(review_kpis, review_kpis_prev, "avg_review_score", "{:+.2f}"), help="Rata-rata skor ulasan yang diberikan pelanggan.", border=True)
+col2a.metric("Total Reviews Count", f"📝 {review_kpis['total_reviews_count']:,}",
+             delta=metric_delta(review_kpis, review_kpis_prev, "total_reviews_count"), help="Jumlah total ulasan yang diberikan pelanggan.", border=True)
+col3a.metric("Average Sentiment Score", f"💬 {review_kpis['avg_sentiment_score']:+.2f}",
+             delta=metric_delta(review_kpis, review_kpis_prev, "avg_sentiment_score", "{:+.2f}"), help="Rata-rata sentimen komentar ulasan (-1 = negatif, 1 = positif).", border=True)
 
 # Membuat filter multiselect segment customer
 customer_segments = filtered_city_state["Customer_segment"].unique()
@@ -64,22 +95,30 @@ selected_segments = st.multiselect("Select Customer Segments:", customer_segment
 
 # Pie Chart - Distribusi Rating Ulasan
 # Filter data berdasarkan customer segment yang dipilih
-filtered_segment_city = filtered_city_state[filtered_city_state["Customer_segment"].isin(selected_segments)]
-filtered_segment_date = filtered_date[filtered_date["Customer_segment"].isin(selected_segments)]
+filtered_segment_city = filter_bitmaps.select(cust_df, (start_date, end_date), customer_city=selected_cities,
+                                              customer_state=selected_states, Customer_segment=selected_segments)
+filtered_segment_date = filter_bitmaps.select(cust_df, (start_date, end_date), Customer_segment=selected_segments)
+
+# Pilihan kosong berarti tidak ada segment (bukan semua); chart & wordcloud butuh minimal satu baris
+if not selected_segments or filtered_segment_city.empty:
+    st.warning("Tidak ada ulasan untuk customer segment yang dipilih. Pilih minimal satu segment.")
+    st.stop()
 
 # Hitung distribusi rating ulasan
 review_distribution = filtered_segment_city["review_score"].value_counts().reset_index()
 review_distribution.columns = ["Review Score", "Count"]
 
 # Buat Pie Chart untuk distribusi rating ulasan
-fig_review_pie = px.pie(review_distribution, 
-                         names="Review Score", 
-                         values="Count", 
-                         color_discrete_sequence=px.colors.qualitative.Prism, 
-                         hole=0.4)
+def build_review_pie(review_distribution):
+    fig_review_pie = px.pie(review_distribution, 
+                             names="Review Score", 
+                             values="Count", 
+                             color_discrete_sequence=px.colors.qualitative.Prism, 
+                             hole=0.4)
 
-fig_review_pie.update_traces(textinfo="label+percent")
-fig_review_pie.update_layout(showlegend=False)
+    fig_review_pie.update_traces(textinfo="label+percent")
+    fig_review_pie.update_layout(showlegend=False)
+    return fig_review_pie
 
 # Wordcloud - Frekuensi kata yang muncul
 # Ambil hanya ulasan yang tidak kosong dan bukan "NoComment"
@@ -94,41 +133,109 @@ text = " ".join(filtered_reviews.astype(str))
 # Hapus stopwords umum (bisa disesuaikan)
 stopwords = set(STOPWORDS)
 
-# Buat Word Cloud
+# Buat Word Cloud (None jika tidak ada komentar sama sekali, WordCloud butuh minimal satu kata)
 wordcloud = WordCloud(width=800, height=500, 
                       mode="RGBA", background_color=None,
-                      stopwords=stopwords, colormap="viridis", max_words=100).generate(text)
+                      stopwords=stopwords, colormap="viridis", max_words=100).generate(text) if text.strip() else None
 
 
 # Choropleth Map - Rata-rata Skor Ulasan per State
-# Mengambil data GeoJSON untuk peta negara bagian Brasil
-br_geojson_url = "https://raw.githubusercontent.com/codeforamerica/click_that_hood/master/public/data/brazil-states.geojson"
 # Hitung rata-rata skor ulasan per provinsi dan customer segment
 avg_review_per_state = filtered_segment_date.groupby("customer_state")["review_score"].mean().reset_index()
 
 # Buat Choropleth Map untuk rata-rata skor ulasan per provinsi
-fig_review_map = px.choropleth(avg_review_per_state, geojson=br_geojson_url, 
-                                locations="customer_state", featureidkey="properties.sigla",
-                                color="review_score", hover_name="customer_state", 
-                                color_continuous_scale="Viridis", 
-                                labels={"review_score": "Average Review Score"})
-
-fig_review_map.update_geos(fitbounds="locations", visible=False)
-fig_review_map.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+def build_review_map(avg_review_per_state):
+    fig_review_map = px.choropleth(avg_review_per_state, geojson=BR_STATES_GEOJSON_URL, 
+                                    locations="customer_state", featureidkey="properties.sigla",
+                                    color="review_score", hover_name="customer_state", 
+                                    color_continuous_scale="Viridis", 
+                                    labels={"review_score": "Average Review Score"})
+
+    fig_review_map.update_geos(fitbounds="locations", visible=False)
+    fig_review_map.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+    return fig_review_map
+
+# Line Chart - Tren Rata-rata Sentimen Ulasan per Bulan
+sentiment_trend = filtered_segment_city.groupby("year_month")["review_sentiment"].mean().reset_index()
+
+def build_sentiment_trend(sentiment_trend):
+    fig_sentiment_trend = px.area(sentiment_trend, x="year_month", y="review_sentiment",
+                                  markers=True, color_discrete_sequence=px.colors.qualitative.Prism,
+                                  labels={"review_sentiment": "Average Sentiment"})
+    fig_sentiment_trend.update_layout(xaxis_title=None)
+    return fig_sentiment_trend
+
+# Choropleth Map - Rata-rata Sentimen Ulasan per State
+avg_sentiment_per_state = filtered_segment_date.groupby("customer_state")["review_sentiment"].mean().reset_index()
+
+def build_sentiment_map(avg_sentiment_per_state):
+    fig_sentiment_map = px.choropleth(avg_sentiment_per_state, geojson=BR_STATES_GEOJSON_URL,
+                                      locations="customer_state", featureidkey="properties.sigla",
+                                      color="review_sentiment", hover_name="customer_state",
+                                      color_continuous_scale="RdYlGn", range_color=(-1, 1),
+                                      labels={"review_sentiment": "Average Sentiment"})
+    fig_sentiment_map.update_geos(fitbounds="locations", visible=False)
+    fig_sentiment_map.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+    return fig_sentiment_map
 
 # Membuat kolom untuk plot
 col1b, col2b = st.columns([1, 2])
 
 with col1b:
     st.subheader("Distribution of Review Score")
-    st.plotly_chart(fig_review_pie, use_container_width=True)
+    plotly_chart("review.review_pie", review_distribution, build_review_pie, use_container_width=True, data_key=chart_key + (tuple(sorted(selected_segments)),))
 
 with col2b:
     st.subheader("Most Frequent Words in Customer Reviews")
-    fig, ax = plt.subplots(figsize=(10, 5))
-    ax.imshow(wordcloud, interpolation="bilinear")
-    ax.axis("off")
-    st.pyplot(fig)
+    if wordcloud is None:
+        st.info("Tidak ada komentar ulasan untuk filter yang dipilih.")
+    else:
+        fig, ax = plt.subplots(figsize=(10, 5))
+        ax.imshow(wordcloud, interpolation="bilinear")
+        ax.axis("off")
+        st.pyplot(fig)
     
 st.subheader("Average Review Score by State")
-st.plotly_chart(fig_review_map, use_container_width=True)
+plotly_chart("review.review_map", avg_review_per_state, build_review_map, use_container_width=True, data_key=chart_key + (tuple(sorted(selected_segments)),))
+
+col1c, col2c = st.columns(2)
+
+with col1c:
+    st.subheader("Review Sentiment Trend per Month")
+    plotly_chart("review.sentiment_trend", sentiment_trend, build_sentiment_trend, use_container_width=True, data_key=chart_key + (tuple(sorted(selected_segments)),))
+
+with col2c:
+    st.subheader("Average Review Sentiment by State")
+    plotly_chart("review.sentiment_map", avg_sentiment_per_state, build_sentiment_map, use_container_width=True, data_key=chart_key + (tuple(sorted(selected_segments)),))
+
+# Pencarian komentar ulasan berdasarkan kata kunci / frasa
+st.subheader("Search Customer Reviews")
+review_index = load_review_index(st.session_state.data_fingerprint)
+
+col1s, col2s = st.columns([2, 1])
+with col1s:
+    review_query = st.text_input("Search keyword or \"exact phrase\":", placeholder='mis. entrega "produto de qualidade"')
+with col2s:
+    selected_scores = st.multiselect("Select Review Scores:", [1, 2, 3, 4, 5], default=[1, 2, 3, 4, 5])
+
+if review_query:
+    review_mask = review_index.filter_mask(start_date, end_date, selected_cities, selected_states,
+                                           scores=selected_scores, segments=selected_segments)
+    page_size = 10
+    review_page = st.session_state.get("review_search_page", 1)
+    total_hits, review_hits = review_index.search(review_query, review_mask, page=review_page, page_size=page_size)
+    total_pages = max(1, -(-total_hits // page_size))
+    # Halaman lama bisa melebihi jumlah halaman hasil query baru
+    if review_page > total_pages:
+        review_page = total_pages
+        st.session_state.review_search_page = review_page
+        total_hits, review_hits = review_index.search(review_query, review_mask, page=review_page, page_size=page_size)
+
+    if total_hits == 0:
+        st.info("Tidak ada ulasan yang cocok dengan pencarian.")
+    else:
+        st.caption(f"{total_hits:,} ulasan ditemukan")
+        st.dataframe(review_hits[["review_score", "Customer_segment", "customer_state",
+                                  "order_purchase_timestamp", "review_comment_message", "score"]],
+                     use_container_width=True, hide_index=True)
+        st.number_input("Page", min_value=1, max_value=total_pages, step=1, key="review_search_page")
@@ -1,111 +1,169 @@
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
 import plotly.express as px
 import streamlit as st
-from wordcloud import WordCloud, STOPWORDS
+
+from app_utils.chart_cache import BR_STATES_GEOJSON_URL, plotly_chart
+from app_utils.cohorts import retention_matrix
+from app_utils.comparison import COMPARISON_NONE, compare_periods, duration_delta, metric_delta
+from app_utils.data_loader import PAGE_COLUMNS
+from app_utils.dimensions import valid_keys
+from app_utils.disk_cache import cached_aggregate
+from app_utils.filter_engine import global_filter_key
+from app_utils.geo_index import density_bins
+from app_utils.time_metrics import duration_seconds, format_duration, group_stats, nan_mean
 
 #################### Data Processing Code ####################
 # Ambil data dari session_state
-if "cust_df" not in st.session_state:
+if "dataset" not in st.session_state:
     st.error("Data belum dimuat! Silakan jalankan main.py terlebih dahulu.")
-    cust_df = st.session_state.cust_df
+    cust_df = st.session_state.dataset.frame(PAGE_COLUMNS["seller"])
 else:
-    cust_df = st.session_state.cust_df
+    # Hanya kolom yang dipakai halaman ini yang dimuat
+    cust_df = st.session_state.dataset.frame(PAGE_COLUMNS["seller"])
 
 # Ambil filter dari session_state
 selected_date_range = st.session_state.get("selected_date_range", None)
-selected_city = st.session_state.get("selected_city", "All")
-selected_state = st.session_state.get("selected_state", "All")
+selected_cities = st.session_state.get("selected_cities", [])
+selected_states = st.session_state.get("selected_states", [])
+comparison_mode = st.session_state.get("comparison_mode", COMPARISON_NONE)
+filter_bitmaps = st.session_state.filter_bitmaps
+# Atribut penjual (id, zip, city, state) diambil dari tabel dimensi berdasarkan seller_key
+sellers = st.session_state.dimensions["seller"]
 
 # Filter data berdasarkan rentang tanggal
 # Pastikan filter tanggal dalam bentuk datetime
 start_date = pd.to_datetime(selected_date_range[0])
 end_date = pd.to_datetime(selected_date_range[1])
 
-filtered_date = cust_df[
-    (cust_df["order_purchase_timestamp"] >= start_date) &
-    (cust_df["order_purchase_timestamp"] <= end_date)
-]
-
-filtered_city_state = filtered_date.copy()
-
-# Filter berdasarkan Customer City jika dipilih
-if selected_city != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_city"] == selected_city]
-
-# Filter berdasarkan Customer State jika dipilih
-if selected_state != "All":
-    filtered_city_state = filtered_city_state[filtered_city_state["customer_state"] == selected_state]
-
-# Menghitung Jumlah total penjual unik
-total_sellers = filtered_city_state["seller_id"].nunique()
-
-# Menghitung Rata-rata waktu pengiriman per penjual
-# Hitung waktu pengiriman per seller (dalam hari)
-filtered_city_state["seller_delivery_time"] = (
-    filtered_city_state["order_delivered_carrier_date"] - filtered_city_state["order_approved_at"]
-).dt.total_seconds() / 86400  # Konversi detik ke hari
-
-# Hitung rata-rata waktu pengiriman per penjual
-avg_seller_delivery_time = filtered_city_state.groupby("seller_id")["seller_delivery_time"].mean().mean()
+# Filter diselesaikan lewat bitmap baris (OR antar nilai yang dipilih, AND antar dimensi)
+filtered_date = filter_bitmaps.select(cust_df, (start_date, end_date))
+filtered_city_state = filter_bitmaps.select(cust_df, (start_date, end_date),
+                                            customer_city=selected_cities, customer_state=selected_states)
+
+# Key cache chart: fingerprint dataset + filter global, data input chart tidak perlu di-hash setiap rerun
+filter_key = global_filter_key(start_date, end_date, selected_cities, selected_states)
+chart_key = (st.session_state.data_fingerprint, filter_key)
+
+# Tidak ada baris untuk filter global yang dipilih: KPI & chart tidak bisa dihitung
+if filtered_city_state.empty:
+    st.warning("Tidak ada data untuk filter yang dipilih. Ubah rentang tanggal, city, atau state di sidebar.")
+    st.stop()
+
+# Data terfilter untuk periode lain (dipakai oleh mode pembanding)
+def select_period(period_start, period_end):
+    return filter_bitmaps.select(cust_df, (period_start, period_end),
+                                 customer_city=selected_cities, customer_state=selected_states)
+
+# KPI halaman seller, dihitung untuk periode aktif & periode pembanding secara paralel
+def compute_seller_kpis(df, period_start, period_end):
+    seller_keys = valid_keys(df["seller_key"])
+
+    # Menghitung Rata-rata waktu pengiriman per penjual
+    # Hitung waktu pengiriman per seller (carrier - approved) dalam detik
+    seller_delivery_seconds = duration_seconds(df, "order_delivered_carrier_date", "order_approved_at")
+    # Hitung rata-rata waktu pengiriman per penjual, lalu rata-rata antar penjual
+    seller_delivery_stats = group_stats(seller_keys, seller_delivery_seconds, median=False)
+
+    # Menghitung Seller Retention Rate
+    max_year_month = df["year_month"].max()
+
+    # Hitung seller retention rate berdasarkan max_year_month
+    active_sellers = seller_keys[df["year_month"] >= max_year_month].nunique()
+    initial_sellers = seller_keys[df["year_month"] < max_year_month].nunique()
+    return {
+        # Menghitung Jumlah total penjual unik
+        "total_sellers": seller_keys.nunique(),
+        "avg_seller_delivery_time": nan_mean(seller_delivery_stats["mean"]),
+        "seller_retention_rate": (active_sellers / initial_sellers) * 100 if initial_sellers > 0 else 0,
+    }
+
+seller_kpis, seller_kpis_prev = compare_periods("seller_kpis", compute_seller_kpis, filtered_city_state, select_period,
+                                                start_date, end_date, selected_cities, selected_states,
+                                                comparison_mode, st.session_state.data_fingerprint)
 
 # Konversi ke format X D X H X M
-if not np.isnan(avg_seller_delivery_time):
-    days = int(avg_seller_delivery_time)
-    hours = int((avg_seller_delivery_time % 1) * 24)
-    minutes = int(((avg_seller_delivery_time % 1) * 24 % 1) * 60)
-    avg_seller_delivery_str = f"{days}D {hours}H {minutes}M"
-else:
-    avg_seller_delivery_str = "N/A"
-
-# Menghitung Seller Retention Rate
-max_year_month = filtered_city_state["year_month"].max()
-
-# Hitung seller retention rate berdasarkan max_year_month
-active_sellers = filtered_city_state[filtered_city_state["year_month"] >= max_year_month]["seller_id"].nunique()
-initial_sellers = filtered_city_state[filtered_city_state["year_month"] < max_year_month]["seller_id"].nunique()
-seller_retention_rate = (active_sellers / initial_sellers) * 100 if initial_sellers > 0 else 0
+avg_seller_delivery_str = format_duration(seller_kpis["avg_seller_delivery_time"])
 
 # Bar Chart - Top 5 Sellers by Order Count
 # Hitung jumlah order per seller
-top_sellers = filtered_city_state.groupby("seller_id")["order_id"].count().reset_index()
+seller_keys = valid_keys(filtered_city_state["seller_key"])
+top_sellers = filtered_city_state.groupby(seller_keys)["order_id"].count().reset_index()
 top_sellers = top_sellers.sort_values(by="order_id", ascending=False).head(5)
+# Label seller_id hanya diambil untuk 5 seller teratas
+top_sellers["seller_id"] = sellers.gather(top_sellers["seller_key"], "seller_id")
 
 # Buat Bar Chart
-fig_top_sellers = px.bar(top_sellers, x="order_id", y="seller_id",
-                         color="seller_id", orientation="h",
-                         labels={"order_id": "Total Orders", "seller_id": "Seller ID"},
-                         color_discrete_sequence=px.colors.qualitative.Prism)
-fig_top_sellers.update_layout(yaxis=dict(categoryorder="total ascending"),
-                                       yaxis_title=None, showlegend=False)
+def build_top_sellers(top_sellers):
+    fig_top_sellers = px.bar(top_sellers, x="order_id", y="seller_id",
+                             color="seller_id", orientation="h",
+                             labels={"order_id": "Total Orders", "seller_id": "Seller ID"},
+                             color_discrete_sequence=px.colors.qualitative.Prism)
+    fig_top_sellers.update_layout(yaxis=dict(categoryorder="total ascending"),
+                                           yaxis_title=None, showlegend=False)
+    return fig_top_sellers
 
 # Bar Chart - Top 5 Sellers by Product Count
 # Hitung jumlah produk unik per seller
-top_sellers_products = filtered_city_state.groupby("seller_id")["product_id"].nunique().reset_index()
+top_sellers_products = valid_keys(filtered_city_state["product_key"]).groupby(seller_keys).nunique().reset_index()
+top_sellers_products.columns = ["seller_key", "product_id"]
 top_sellers_products = top_sellers_products.sort_values(by="product_id", ascending=False).head(5)
+top_sellers_products["seller_id"] = sellers.gather(top_sellers_products["seller_key"], "seller_id")
 
 # Buat Bar Chart
-fig_top_sellers_products = px.bar(top_sellers_products, x="product_id", y="seller_id",
-                                  color="seller_id", orientation="h",
-                                  labels={"product_id": "Total Products", "seller_id": "Seller ID"},
-                                  color_discrete_sequence=px.colors.qualitative.Prism)
-fig_top_sellers_products.update_layout(yaxis=dict(categoryorder="total ascending"),
-                                       yaxis_title=None, showlegend=False)
+def build_top_sellers_products(top_sellers_products):
+    fig_top_sellers_products = px.bar(top_sellers_products, x="product_id", y="seller_id",
+                                      color="seller_id", orientation="h",
+                                      labels={"product_id": "Total Products", "seller_id": "Seller ID"},
+                                      color_discrete_sequence=px.colors.qualitative.Prism)
+    fig_top_sellers_products.update_layout(yaxis=dict(categoryorder="total ascending"),
+                                           yaxis_title=None, showlegend=False)
+    return fig_top_sellers_products
 
 # Choropleth Map - Sebaran Penjual per Provinsi
-# Mengambil data GeoJSON untuk peta negara bagian Brasil
-br_geojson_url = "https://raw.githubusercontent.com/codeforamerica/click_that_hood/master/public/data/brazil-states.geojson"
-# Hitung jumlah seller per provinsi
-seller_distribution = filtered_date.groupby("seller_state")["seller_id"].nunique().reset_index()
-seller_distribution.columns = ["seller_state", "unique_sellers"]
-fig_seller_map = px.choropleth(seller_distribution, geojson=br_geojson_url, 
-                              locations='seller_state', featureidkey="properties.sigla",
-                              color='unique_sellers', hover_name='seller_state', 
-                              color_continuous_scale=px.colors.sequential.Viridis,
-                              labels={"unique_sellers": "Total Sellers"})
-fig_seller_map.update_geos(fitbounds="locations", visible=False)
-fig_seller_map.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+# Hitung jumlah seller per provinsi (state diambil per seller unik, bukan per baris order)
+active_seller_keys = valid_keys(filtered_date["seller_key"]).dropna().unique()
+seller_distribution = (pd.Series(sellers.gather(active_seller_keys, "seller_state"))
+                       .value_counts().rename_axis("seller_state").reset_index(name="unique_sellers"))
+
+def build_seller_map(seller_distribution):
+    fig_seller_map = px.choropleth(seller_distribution, geojson=BR_STATES_GEOJSON_URL, 
+                                  locations='seller_state', featureidkey="properties.sigla",
+                                  color='unique_sellers', hover_name='seller_state', 
+                                  color_continuous_scale=px.colors.sequential.Viridis,
+                                  labels={"unique_sellers": "Total Sellers"})
+    fig_seller_map.update_geos(fitbounds="locations", visible=False)
+    fig_seller_map.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+    return fig_seller_map
+
+# Hexbin Map - Kepadatan Penjual berdasarkan zip prefix (dibinning di server)
+geo_index = st.session_state.get("geo_index")
+if geo_index is not None:
+    seller_points = sellers.gather(active_seller_keys, "seller_zip_code_prefix")
+    seller_density = density_bins(geo_index, seller_points)
+
+def build_seller_density(seller_density):
+    fig_seller_density = px.scatter_geo(seller_density, lat="lat", lon="lng", size="count", color="count",
+                                        color_continuous_scale=px.colors.sequential.Viridis,
+                                        labels={"count": "Total Sellers"})
+    fig_seller_density.update_geos(fitbounds="locations", scope="south america", showcountries=True)
+    fig_seller_density.update_layout(paper_bgcolor="rgba(0,0,0,0)", geo=dict(bgcolor="rgba(0,0,0,0)"))
+    return fig_seller_density
+
+# Heatmap - Retensi Cohort Penjual (bulan transaksi pertama x bulan sejak transaksi pertama)
+# Bulan pertama dihitung dari riwayat penuh (hanya filter city/state), baru dibatasi ke rentang tanggal
+def compute_seller_cohorts():
+    history = filter_bitmaps.select(cust_df, None, customer_city=selected_cities, customer_state=selected_states)
+    return retention_matrix(valid_keys(history["seller_key"]), history["year_month"], start_date, end_date)
+
+seller_retention = cached_aggregate("seller_cohorts", st.session_state.data_fingerprint, filter_key,
+                                    compute_seller_cohorts)
+
+def build_seller_cohort(seller_retention):
+    fig_seller_cohort = px.imshow(seller_retention, text_auto=".0f", aspect="auto",
+                                  color_continuous_scale=px.colors.sequential.Viridis,
+                                  labels={"x": "Months Since First Purchase", "y": "Cohort", "color": "Retention (%)"})
+    fig_seller_cohort.update_layout(paper_bgcolor="rgba(0,0,0,0)")
+    return fig_seller_cohort
 
 #################### Streamlit UI Code ####################
 # Judul halaman home
@@ -115,20 +173,35 @@ st.subheader("🏬 Sellers Performance")
 # Membuat kolom untuk metrik
 col1a, col2a, col3a = st.columns(3)
 
-col1a.metric("Total Sellers", f"👥 {total_sellers:,}", help="Jumlah total penjual unik di platform", border=True)
-col2a.metric("Average Seller Delivery Time", f"⏳ {avg_seller_delivery_str}", help="Rata-rata waktu pengiriman per penjual", border=True)
-col3a.metric("Seller Retention Rate", f"🔁 {seller_retention_rate:.2f}%", help="Persentase penjual yang tetap aktif dalam periode tertentu", border=True)
+col1a.metric("Total Sellers", f"👥 {seller_kpis['total_sellers']:,}",
+             delta=metric_delta(seller_kpis, seller_kpis_prev, "total_sellers"), help="Jumlah total penjual unik di platform", border=True)
+col2a.metric("Average Seller Delivery Time", f"⏳ {avg_seller_delivery_str}",
+             delta=duration_delta(seller_kpis, seller_kpis_prev, "avg_seller_delivery_time"), delta_color="inverse", help="Rata-rata waktu pengiriman per penjual", border=True)
+col3a.metric("Seller Retention Rate", f"🔁 {seller_kpis['seller_retention_rate']:.2f}%",
+             delta=metric_delta(seller_kpis, seller_kpis_prev, "seller_retention_rate", "{:+.2f}%"), help="Persentase penjual yang tetap aktif dalam periode tertentu", border=True)
 
 # Membuat kolom untuk plot
 col1b, col2b = st.columns(2)
 
 with col1b:
     st.subheader("Top 5 Sellers by Order Count")
-    st.plotly_chart(fig_top_sellers, use_container_width=True)
+    plotly_chart("seller.top_sellers", top_sellers, build_top_sellers, use_container_width=True, data_key=chart_key)
 
 with col2b:
     st.subheader("Top 5 Sellers by Product")
-    st.plotly_chart(fig_top_sellers_products, use_container_width=True)
+    plotly_chart("seller.top_sellers_products", top_sellers_products, build_top_sellers_products, use_container_width=True, data_key=chart_key)
 
 st.subheader("Seller Distribution by State")
-st.plotly_chart(fig_seller_map, use_container_width=True)
\ No newline at end of file
+plotly_chart("seller.seller_map", seller_distribution, build_seller_map, use_container_width=True, data_key=chart_key)
+
+st.subheader("Seller Density Map")
+if geo_index is not None:
+    plotly_chart("seller.seller_density", seller_density, build_seller_density, use_container_width=True, data_key=chart_key)
+else:
+    st.info("Dataset geolocation belum tersedia. Jalankan `PYTHONPATH=dashboard python -m app_utils.geo_index` untuk membuat data/zip_centroids.npz.")
+
+st.subheader("Monthly Seller Cohort Retention")
+if seller_retention.empty:
+    st.info("Tidak ada data untuk filter yang dipilih.")
+else:
+    plotly_chart("seller.seller_cohort", seller_retention, build_seller_cohort, use_container_width=True, data_key=chart_key)
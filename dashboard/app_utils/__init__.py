@@ -0,0 +1 @@
+# Modul bantu (helper) yang dipakai bersama oleh entry script dan semua halaman di app_pages
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from plotly.utils import PlotlyJSONEncoder
+
+# API internal Streamlit (versi di-pin persis di requirements.txt, dicek oleh tests/test_chart_cache.py).
+# Jika import gagal, payload tetap di-cache tetapi dikirim lewat st.plotly_chart
+try:
+    from streamlit.elements.lib.form_utils import current_form_id
+    from streamlit.elements.lib.utils import compute_and_register_element_id
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+except ImportError:
+    PlotlyChartProto = None
+
+# GeoJSON state Brasil dipakai bersama oleh semua choropleth: payload hanya berisi URL ini
+# (browser mengunduhnya sekali lalu di-cache), geometri tidak pernah ikut di setiap chart
+BR_STATES_GEOJSON_URL = ("https://raw.githubusercontent.com/codeforamerica/click_that_hood/"
+                         "master/public/data/brazil-states.geojson")
+
+# Presisi float di payload (digit signifikan); cukup untuk sumbu & hover, jauh lebih ringkas dari 17 digit
+FLOAT_SIGNIFICANT_DIGITS = 6
+
+# Batas memori cache payload (terkompresi) per proses server
+CHART_CACHE_MAX_BYTES = int(float(os.environ.get("DASHBOARD_CHART_CACHE_MB", "64")) * 1024 * 1024)
+
+# Config default st.plotly_chart (lihat streamlit/elements/plotly_chart.py)
+PLOTLY_CONFIG = json.dumps({"showLink": False, "linkText": False})
+SELECTION_MODE = ("points", "box", "lasso")
+
+# Ukuran payload chart (byte JSON) yang dikirim pada rerun terakhir, per key chart
+PAYLOAD_STATS_KEY = "chart_payload_bytes"
+
+
+#################### Serialisasi Payload ####################
+def round_significant(values, digits=FLOAT_SIGNIFICANT_DIGITS):
+    """Bulatkan array float ke `digits` digit signifikan (NaN/inf/0 tidak diubah)."""
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values) & (values != 0)
+    magnitude = np.zeros(values.shape)
+    magnitude[finite] = np.floor(np.log10(np.abs(values[finite])))
+    scale = np.power(10.0, digits - 1 - magnitude)
+    return np.where(finite, np.round(values * scale) / scale, values)
+
+
+def _compact(obj):
+    if isinstance(obj, dict):
+        return {key: _compact(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_compact(value) for value in obj]
+    if isinstance(obj, np.ndarray) and obj.dtype.kind == "f":
+        return round_significant(obj)
+    if isinstance(obj, (float, np.floating)):
+        return float(round_significant(obj))
+    return obj
+
+
+def serialize_figure(fig):
+    """
+    JSON payload figure Plotly yang lebih ringkas: float dibulatkan, separator tanpa spasi, dan
+    template hanya menyimpan default trace untuk tipe trace yang dipakai figure ini (Plotly.js
+    hanya membaca template.data[tipe trace], sedangkan template.layout tetap dipakai tema Streamlit).
+    """
+    figure = fig.to_plotly_json()
+    template = figure.get("layout", {}).get("template")
+    if template and "data" in template:
+        trace_types = {trace.get("type", "scatter") for trace in figure.get("data", [])}
+        template["data"] = {name: value for name, value in template["data"].items() if name in trace_types}
+    return json.dumps(_compact(figure), cls=PlotlyJSONEncoder, separators=(",", ":"))
+
+
+def chart_fingerprint(data):
+    """Hash isi data input chart (DataFrame/Series, tuple, atau nilai skalar)."""
+    digest = hashlib.sha1()
+
+    def update(value):
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            frame = value.to_frame() if isinstance(value, pd.Series) else value
+            digest.update(pd.util.hash_pandas_object(frame, index=True).to_numpy().tobytes())
+            digest.update(repr([(col, str(dtype)) for col, dtype in frame.dtypes.items()]).encode())
+        elif isinstance(value, (list, tuple)):
+            digest.update(b"(")
+            for item in value:
+                update(item)
+            digest.update(b")")
+        else:
+            digest.update(repr(value).encode())
+
+    update(data)
+    return digest.hexdigest()
+
+
+#################### Cache Payload ####################
+class ChartPayloadCache:
+    """LRU payload chart (JSON terkompresi zlib) per (key chart, fingerprint data), dibatasi total ukuran."""
+
+    def __init__(self, max_bytes=CHART_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            compressed = self._entries.get(key)
+            if compressed is None:
+                return None
+            self._entries.move_to_end(key)
+        return zlib.decompress(compressed).decode()
+
+    def set(self, key, spec):
+        compressed = zlib.compress(spec.encode(), 6)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = compressed
+            self._bytes += len(compressed)
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+
+_default_cache = ChartPayloadCache()
+
+
+def chart_payload(key, data, build, data_key=None):
+    """
+    Payload JSON chart `key` untuk data ini; build(data) -> figure hanya dipanggil saat cache miss.
+    `data_key` (mis. fingerprint dataset + key filter) menggantikan hash isi data jika diberikan.
+    """
+    cache_key = (key, chart_fingerprint(data) if data_key is None else data_key)
+    spec = _default_cache.get(cache_key)
+    if spec is None:
+        spec = serialize_figure(build(data))
+        _default_cache.set(cache_key, spec)
+    return spec
+
+
+#################### Render ####################
+def reset_payload_stats():
+    """Mulai hitungan payload chart baru untuk rerun ini (dipanggil entry script sebelum halaman dijalankan)."""
+    st.session_state[PAYLOAD_STATS_KEY] = {}
+
+
+def payload_stats():
+    """Dict key chart -> ukuran payload (byte) yang dikirim pada rerun ini."""
+    return st.session_state.get(PAYLOAD_STATS_KEY, {})
+
+
+def plotly_chart(key, data, build, use_container_width=False, data_key=None):
+    """
+    Pengganti st.plotly_chart untuk chart yang di-cache: payload yang sudah di-render dikirim
+    langsung sebagai elemen plotly_chart tanpa membangun & men-serialize ulang figure.
+    `key` harus unik per chart di seluruh app (mis. "payment.revenue_trend"). `data_key` sebaiknya
+    diisi key filter + fingerprint dataset agar data input tidak perlu di-hash setiap rerun.
+    """
+    spec = chart_payload(key, data, build, data_key)
+    if PAYLOAD_STATS_KEY in st.session_state:
+        st.session_state[PAYLOAD_STATS_KEY][key] = len(spec)
+    if PlotlyChartProto is not None:
+        try:
+            proto = _build_proto(spec, use_container_width)
+        except (AttributeError, TypeError, ValueError):
+            # Signature API internal tidak cocok dengan versi Streamlit yang terpasang (belum ada yang di-register)
+            proto = None
+        if proto is not None:
+            # Id elemen di-register setelah proto lengkap, tepat sebelum dikirim
+            return _enqueue_proto(proto, use_container_width)
+    return st.plotly_chart(json.loads(spec), use_container_width=use_container_width)
+
+
+def _build_proto(spec, use_container_width):
+    # st._main mengikuti container aktif (with col: ...), sama seperti st.plotly_chart
+    proto = PlotlyChartProto()
+    proto.use_container_width = use_container_width
+    proto.theme = "streamlit"
+    proto.form_id = current_form_id(st._main)
+    proto.spec = spec
+    proto.config = PLOTLY_CONFIG
+    return proto
+
+
+def _enqueue_proto(proto, use_container_width):
+    proto.id = compute_and_register_element_id(
+        "plotly_chart",
+        user_key=None,
+        form_id=proto.form_id,
+        plotly_spec=proto.spec,
+        plotly_config=proto.config,
+        selection_mode=SELECTION_MODE,
+        is_selection_activated=False,
+        theme="streamlit",
+        use_container_width=use_container_width,
+    )
+    return st._main._enqueue("plotly_chart", proto)
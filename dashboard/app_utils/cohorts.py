@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+
+def cohort_matrix(entity_ids, months, start_date=None, end_date=None):
+    """
+    Matriks cohort: baris = bulan aktivitas pertama entity (customer/seller),
+    kolom = jumlah bulan sejak bulan pertama, nilai = jumlah entity yang aktif.
+    Dihitung dari pasangan unik (entity, bulan) dalam bentuk integer, tanpa groupby per entity.
+
+    Bulan pertama ditentukan dari seluruh riwayat yang diberikan (data tanpa filter tanggal), lalu
+    matriks dibatasi ke bulan dalam rentang start_date..end_date: entity yang sudah aktif sebelum
+    rentang tidak dihitung sebagai cohort baru.
+    """
+    entity_codes, _ = pd.factorize(np.asarray(entity_ids))
+    month_periods = pd.PeriodIndex(pd.DatetimeIndex(months), freq="M")
+    valid = (entity_codes >= 0) & ~month_periods.isna()
+    if not valid.any():
+        return pd.DataFrame()
+
+    entity_codes = entity_codes[valid].astype(np.int64)
+    month_ordinals = month_periods.asi8[valid]
+    base = month_ordinals.min()
+    month_codes = month_ordinals - base
+    n_months = int(month_codes.max()) + 1
+    n_entities = int(entity_codes.max()) + 1
+
+    # Pasangan unik (entity, bulan) sebagai satu key integer
+    pairs = np.unique(entity_codes * n_months + month_codes)
+    pair_entity = pairs // n_months
+    pair_month = pairs % n_months
+
+    # Bulan pertama per entity = bulan terkecil pada pasangan uniknya (seluruh riwayat)
+    first_month = np.full(n_entities, n_months, dtype=np.int64)
+    np.minimum.at(first_month, pair_entity, pair_month)
+    cohort = first_month[pair_entity]
+
+    # Rentang bulan yang ditampilkan (kode bulan relatif terhadap base)
+    lo = 0 if start_date is None else max(0, pd.Period(start_date, freq="M").ordinal - base)
+    hi = n_months - 1 if end_date is None else min(n_months - 1, pd.Period(end_date, freq="M").ordinal - base)
+    if lo > hi:
+        return pd.DataFrame()
+    in_window = (cohort >= lo) & (pair_month <= hi)
+    cohort = cohort[in_window] - lo
+    offset = pair_month[in_window] - lo - cohort
+    n_window = hi - lo + 1
+    counts = np.bincount(cohort * n_window + offset, minlength=n_window * n_window).reshape(n_window, n_window)
+
+    labels = pd.period_range(pd.Period(ordinal=base + lo, freq="M"), periods=n_window, freq="M").strftime("%Y-%m")
+    matrix = pd.DataFrame(counts, index=labels, columns=np.arange(n_window))
+
+    # Sel setelah bulan terakhir rentang dikosongkan agar tidak terbaca sebagai 0
+    remaining = n_window - 1 - np.arange(n_window)
+    matrix = matrix.where(np.arange(n_window)[None, :] <= remaining[:, None])
+
+    # Hanya cohort yang memiliki anggota
+    return matrix[matrix[0] > 0]
+
+
+def retention_matrix(entity_ids, months, start_date=None, end_date=None):
+    """Persentase entity tiap cohort yang masih aktif N bulan setelah bulan pertamanya."""
+    matrix = cohort_matrix(entity_ids, months, start_date, end_date)
+    if matrix.empty:
+        return matrix
+    return matrix.div(matrix[0], axis=0) * 100
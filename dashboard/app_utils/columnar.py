@@ -0,0 +1,118 @@
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+# Kolom teks bebas yang besar disimpan di file terpisah, hanya dimuat oleh halaman yang membutuhkannya
+TEXT_COLUMNS = ("review_comment_message",)
+
+FACTS_FILE = "facts.feather"
+TEXT_FILE = "text.feather"
+DIMENSIONS_FILE = "dimensions.pkl"
+
+
+#################### Tulis Snapshot ####################
+def write_snapshot(directory, facts, dimensions):
+    """
+    Simpan snapshot kolumnar (Arrow/Feather tanpa kompresi agar bisa di-memory-map) ke `directory`.
+    Ditulis ke folder sementara lalu di-rename, sehingga snapshot yang setengah jadi tidak pernah terbaca.
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, suffix=".tmp")
+    try:
+        text_columns = [col for col in TEXT_COLUMNS if col in facts.columns]
+        feather.write_feather(facts.drop(columns=text_columns), os.path.join(tmp_dir, FACTS_FILE),
+                              compression="uncompressed")
+        feather.write_feather(facts[text_columns], os.path.join(tmp_dir, TEXT_FILE), compression="uncompressed")
+        with open(os.path.join(tmp_dir, DIMENSIONS_FILE), "wb") as f:
+            pickle.dump(dimensions, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_dir, directory)
+    except OSError:
+        # Proses lain sudah lebih dulu menulis snapshot yang sama
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not os.path.isdir(directory):
+            raise
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+#################### Baca Snapshot (Lazy) ####################
+class ColumnarSnapshot:
+    """
+    Snapshot kolumnar yang memuat kolom secara lazy: kolom dibaca dari file (memory-mapped) saat
+    pertama kali diminta, lalu disimpan untuk dipakai bersama oleh semua session di proses ini.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._files = {}
+        for file_name in (FACTS_FILE, TEXT_FILE):
+            path = os.path.join(directory, file_name)
+            with pa.memory_map(path) as source:
+                reader = pa.ipc.open_file(source)
+                self.n_rows = sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+                for name in reader.schema.names:
+                    self._files[name] = path
+        self.columns = list(self._files)
+
+        with open(os.path.join(directory, DIMENSIONS_FILE), "rb") as f:
+            self.dimensions = pickle.load(f)
+
+        self._loaded = {}
+        self._frames = {}
+        self._lock = threading.Lock()
+        # Lock terpisah untuk proyeksi: frame() memanggil column() yang memegang self._lock (tidak re-entrant)
+        self._frames_lock = threading.Lock()
+
+    def column(self, name):
+        with self._lock:
+            if name not in self._loaded:
+                table = feather.read_table(self._files[name], columns=[name], memory_map=True)
+                self._loaded[name] = table.column(0).to_pandas()
+            return self._loaded[name]
+
+    def frame(self, columns):
+        """DataFrame berisi kolom yang diminta saja (proyeksi), dibuat sekali per kombinasi kolom."""
+        columns = tuple(columns)
+        frame = self._frames.get(columns)
+        if frame is None:
+            with self._frames_lock:
+                frame = self._frames.get(columns)
+                if frame is None:
+                    frame = pd.DataFrame({name: self.column(name) for name in columns}, copy=False)
+                    self._frames[columns] = frame
+        return frame
+
+
+class InMemoryColumns:
+    """Antarmuka yang sama dengan ColumnarSnapshot untuk DataFrame yang sudah ada di memori (mis. shared memory)."""
+
+    def __init__(self, df, dimensions):
+        self.df = df
+        self.dimensions = dimensions
+        self.columns = list(df.columns)
+        self.n_rows = len(df)
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def column(self, name):
+        return self.df[name]
+
+    def frame(self, columns):
+        """Proyeksi kolom sebagai view (tanpa menyalin dari shared memory), dibuat sekali per kombinasi kolom."""
+        columns = tuple(columns)
+        frame = self._frames.get(columns)
+        if frame is None:
+            with self._lock:
+                frame = self._frames.get(columns)
+                if frame is None:
+                    frame = pd.DataFrame({name: self.df[name] for name in columns}, copy=False)
+                    self._frames[columns] = frame
+        return frame
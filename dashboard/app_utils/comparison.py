@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+from app_utils.disk_cache import submit_cached_aggregate
+from app_utils.filter_engine import global_filter_key
+from app_utils.time_metrics import format_duration
+
+# Pilihan mode pembanding di sidebar
+COMPARISON_NONE = "None"
+COMPARISON_PREVIOUS = "Previous Period"
+COMPARISON_LAST_YEAR = "Same Period Last Year"
+COMPARISON_MODES = (COMPARISON_NONE, COMPARISON_PREVIOUS, COMPARISON_LAST_YEAR)
+
+
+def comparison_range(start_date, end_date, mode):
+    """Rentang tanggal pembanding untuk (start_date, end_date), None jika mode pembanding tidak aktif."""
+    if mode == COMPARISON_PREVIOUS:
+        # Periode dengan panjang yang sama, tepat sebelum start_date
+        comparison_end = start_date - pd.Timedelta(days=1)
+        return comparison_end - (end_date - start_date), comparison_end
+    if mode == COMPARISON_LAST_YEAR:
+        return start_date - pd.DateOffset(years=1), end_date - pd.DateOffset(years=1)
+    return None
+
+
+def _compute_comparison(select, compute, start_date, end_date):
+    df = select(start_date, end_date)
+    # Periode pembanding bisa di luar rentang data; tidak ada delta untuk periode kosong
+    return compute(df, start_date, end_date) if len(df) else None
+
+
+def compare_periods(metric, compute, current_df, select, start_date, end_date,
+                    selected_cities, selected_states, mode, fingerprint):
+    """
+    Hitung KPI halaman untuk periode aktif dan periode pembanding secara bersamaan di worker pool.
+    `compute(df, start, end)` mengembalikan dict KPI, `select(start, end)` mengembalikan data terfilter untuk periode lain.
+    Hasil disimpan di cache agregat per (metric, filter). Mengembalikan (kpi_sekarang, kpi_pembanding atau None).
+    """
+    current = submit_cached_aggregate(metric, fingerprint,
+                                      global_filter_key(start_date, end_date, selected_cities, selected_states),
+                                      lambda: compute(current_df, start_date, end_date))
+
+    window = comparison_range(start_date, end_date, mode)
+    previous = None
+    if window is not None:
+        previous = submit_cached_aggregate(metric, fingerprint,
+                                           global_filter_key(*window, selected_cities, selected_states),
+                                           lambda: _compute_comparison(select, compute, *window))
+
+    return current.result(), previous.result() if previous is not None else None
+
+
+#################### Format Delta ####################
+def metric_delta(kpis, previous, name, fmt="{:+,.0f}"):
+    """Selisih KPI terhadap periode pembanding untuk parameter `delta` st.metric (None jika tidak ada)."""
+    if previous is None:
+        return None
+    current_value, previous_value = kpis[name], previous[name]
+    if current_value is None or previous_value is None or np.isnan(current_value) or np.isnan(previous_value):
+        return None
+    return fmt.format(current_value - previous_value)
+
+
+def category_delta(kpis, previous, name, category, fmt="{:+,.0f}"):
+    """
+    Seperti metric_delta untuk KPI per kategori (dict kategori -> nilai): selisih nilai `category` yang sama
+    di kedua periode. None jika kategori tidak ada (tidak punya baris) di periode pembanding.
+    """
+    if previous is None or category is None:
+        return None
+    current_value, previous_value = kpis[name].get(category), previous[name].get(category)
+    if current_value is None or previous_value is None or np.isnan(current_value) or np.isnan(previous_value):
+        return None
+    return fmt.format(current_value - previous_value)
+
+
+def duration_delta(kpis, previous, name):
+    """Seperti metric_delta, untuk KPI durasi dalam detik (format +XD XH XM)."""
+    if previous is None:
+        return None
+    current_value, previous_value = kpis[name], previous[name]
+    if np.isnan(current_value) or np.isnan(previous_value):
+        return None
+    change = current_value - previous_value
+    return ("-" if change < 0 else "+") + format_duration(abs(change))
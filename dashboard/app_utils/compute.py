@@ -0,0 +1,46 @@
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Jumlah maksimum komputasi agregat yang berjalan bersamaan di satu proses server
+COMPUTE_WORKERS = int(os.environ.get("DASHBOARD_COMPUTE_WORKERS", os.cpu_count() or 4))
+
+_executor = ThreadPoolExecutor(max_workers=COMPUTE_WORKERS, thread_name_prefix="dashboard-compute")
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def _finish(key, future):
+    with _inflight_lock:
+        if _inflight.get(key) is future:
+            del _inflight[key]
+
+
+def submit_single_flight(key, compute):
+    """
+    Jadwalkan compute() di worker pool, satu kali per key yang sedang berjalan, dan kembalikan Future-nya.
+    Session lain yang meminta key yang sama mendapat Future yang sama (tidak menghitung ulang).
+    Exception diteruskan ke semua yang menunggu.
+    """
+    with _inflight_lock:
+        future = _inflight.get(key)
+        created = future is None
+        if created:
+            future = _executor.submit(compute)
+            _inflight[key] = future
+    # Callback didaftarkan di luar lock: jika compute sudah selesai, callback langsung dipanggil
+    # di thread ini dan akan mengambil _inflight_lock lagi (deadlock jika masih dipegang)
+    if created:
+        future.add_done_callback(lambda f: _finish(key, f))
+    return future
+
+
+def single_flight(key, compute):
+    return submit_single_flight(key, compute).result()
+
+
+def completed(value):
+    """Future yang sudah selesai dengan nilai `value` (mis. hasil cache hit)."""
+    future = Future()
+    future.set_result(value)
+    return future
@@ -0,0 +1,97 @@
+import os
+import shutil
+
+import pandas as pd
+
+from app_utils.columnar import ColumnarSnapshot, write_snapshot
+from app_utils.dimensions import normalize_dimensions
+from app_utils.disk_cache import data_fingerprint, default_cache
+from app_utils.sentiment import LEXICON_VERSION, add_review_sentiment, update_sentiment_scores
+
+# Lokasi dataset hasil ETL (relatif terhadap root repo, sama seperti path assets)
+DATA_PATH = "./dashboard/all_rfm_cust_data.csv"
+
+# Kolom tanggal yang perlu di-parse menjadi datetime
+DATETIME_COLUMNS = [
+    "order_purchase_timestamp",
+    "year_month",
+    "order_approved_at",
+    "order_delivered_customer_date",
+    "order_estimated_delivery_date",
+    "order_delivered_carrier_date",
+]
+
+# Naikkan versi jika bentuk snapshot berubah agar snapshot lama di disk cache tidak dipakai lagi
+SNAPSHOT_VERSION = 3
+SNAPSHOT_PREFIX = "snapshot-"
+
+# Kolom yang dipakai index global saat startup (rentang tanggal, filter sidebar, bitmap, sketch persentil)
+STARTUP_COLUMNS = ("order_id", "order_purchase_timestamp", "year_month", "customer_city", "customer_state",
+                   "order_status", "payment_type", "Customer_segment", "delivery_time", "payment_value",
+                   "payment_installments", "review_score", "product_key")
+
+# Proyeksi kolom per halaman: halaman hanya memuat kolom yang benar-benar dipakai.
+# Kolom teks review_comment_message hanya dimuat oleh halaman review (wordcloud & pencarian).
+PAGE_COLUMNS = {
+    "home": ("order_id", "customer_unique_id", "customer_city", "customer_state", "order_status", "seller_key",
+             "payment_value", "delivery_time", "year_month"),
+    "order": ("order_id", "customer_unique_id", "customer_state", "order_status", "order_purchase_timestamp",
+              "order_approved_at", "order_delivered_customer_date", "order_estimated_delivery_date",
+              "delivery_time", "year_month"),
+    "customer": ("customer_unique_id", "customer_zip_code_prefix", "customer_state", "payment_value",
+                 "Monetary", "RFM_Score", "Customer_segment", "year_month"),
+    "seller": ("order_id", "order_approved_at", "order_delivered_carrier_date", "year_month",
+               "product_key", "seller_key"),
+    "product": ("order_id", "order_item_id", "payment_value", "review_id", "review_score", "year_month",
+                "product_key"),
+    "payment": ("customer_state", "payment_type", "payment_installments", "payment_value", "year_month"),
+    "review": ("review_id", "review_score", "review_sentiment", "review_comment_message", "Customer_segment",
+               "customer_city", "customer_state", "order_purchase_timestamp", "year_month"),
+}
+
+# Jika environment variable ini berisi nama shared memory, load_data() akan attach ke dataset
+# yang sudah dipublish oleh proses loader (lihat app_utils/shared_dataset.py)
+SHARED_DATASET_ENV = "DASHBOARD_SHARED_DATASET"
+
+
+def read_dataset(path=DATA_PATH):
+    """Parse CSV menjadi (tabel fakta, dict tabel dimensi produk & penjual)."""
+    df = pd.read_csv(path)
+    for col in DATETIME_COLUMNS:
+        df[col] = pd.to_datetime(df[col])
+
+    # Tahap sentimen: skor lama diambil dari disk cache, hanya review baru yang diskor
+    cache = default_cache()
+    sentiment_key = ("sentiment_scores", LEXICON_VERSION)
+    previous_scores = cache.get(sentiment_key)
+    scores = update_sentiment_scores(df, previous_scores)
+    if previous_scores is None or len(scores) != len(previous_scores):
+        cache.set(sentiment_key, scores)
+
+    df = add_review_sentiment(df, scores)
+
+    # Atribut produk & penjual dipindah ke tabel dimensi, fakta cukup menyimpan surrogate key
+    return normalize_dimensions(df)
+
+
+def load_snapshot(path=DATA_PATH):
+    """
+    Snapshot kolumnar hasil parsing di folder cache, agar restart server tidak parsing CSV ulang.
+    Kolom dimuat lazy saat pertama kali dipakai halaman (lihat PAGE_COLUMNS).
+    """
+    cache = default_cache()
+    name = f"{SNAPSHOT_PREFIX}v{SNAPSHOT_VERSION}-{data_fingerprint(path)}"
+    directory = os.path.join(cache.directory, name)
+    if not os.path.isdir(directory):
+        write_snapshot(directory, *read_dataset(path))
+        # Hapus snapshot lama (versi/data sebelumnya)
+        for entry in os.scandir(cache.directory):
+            if entry.is_dir() and entry.name.startswith(SNAPSHOT_PREFIX) and entry.name != name:
+                shutil.rmtree(entry.path, ignore_errors=True)
+        # Snapshot ikut dihitung terhadap batas ukuran disk cache
+        cache.refresh_pinned()
+    return ColumnarSnapshot(directory)
+
+
+def shared_dataset_name():
+    return os.environ.get(SHARED_DATASET_ENV) or None
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+# Atribut yang sebelumnya diulang di setiap baris fakta, kini disimpan sekali per produk/penjual
+PRODUCT_ATTRIBUTES = ("product_category_name", "product_category_name_english", "product_weight_g",
+                      "product_length_cm", "product_height_cm", "product_width_cm")
+SELLER_ATTRIBUTES = ("seller_zip_code_prefix", "seller_city", "seller_state")
+
+# Surrogate key untuk baris fakta tanpa produk/penjual
+MISSING_KEY = -1
+
+
+class DimensionTable:
+    """
+    Atribut satu dimensi (produk/penjual) sebagai array kolom yang di-index langsung oleh
+    surrogate key integer (0..n-1). Kolom id disimpan sebagai array object, atribut teks sebagai
+    Categorical, atribut angka sebagai float32.
+    """
+
+    def __init__(self, key_col, id_col, columns):
+        self.key_col = key_col
+        self.id_col = id_col
+        self.columns = columns
+
+    def __len__(self):
+        return len(self.columns[self.id_col])
+
+    def gather(self, keys, col):
+        """Ambil atribut `col` untuk array surrogate key; NaN/None untuk key yang tidak valid."""
+        keys = pd.Series(keys).to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(keys) & (keys >= 0)
+        index = np.where(valid, keys, 0).astype(np.int64)
+
+        values = self.columns[col]
+        if isinstance(values, pd.Categorical):
+            codes = np.where(valid, values.codes[index], -1)
+            return np.asarray(pd.Categorical.from_codes(codes, values.categories), dtype=object)
+        return np.where(valid, values[index], np.nan if values.dtype.kind == "f" else None)
+
+    def attach(self, df, *cols):
+        """Salinan ringan df dengan atribut dimensi yang diminta ditambahkan sebagai kolom."""
+        return df.assign(**{col: self.gather(df[self.key_col], col) for col in cols})
+
+
+def valid_keys(keys):
+    """Surrogate key sebagai Series float dengan NaN untuk MISSING_KEY, agar groupby/nunique mengabaikannya."""
+    return keys.where(keys != MISSING_KEY)
+
+
+def split_dimension(df, id_col, key_col, attributes):
+    """
+    Pisahkan id & atribut dimensi dari tabel fakta. Fakta hanya menyimpan surrogate key int32
+    (posisi id pada urutan id yang sudah di-sort), atribut disimpan sekali per key.
+    """
+    keys, ids = pd.factorize(df[id_col], sort=True)
+    attributes = [col for col in attributes if col in df.columns]
+
+    # Ambil atribut dari baris pertama setiap key (atribut sama untuk semua baris key tersebut)
+    rows = np.flatnonzero(keys >= 0)
+    _, first = np.unique(keys[rows], return_index=True)
+    rows = rows[first]
+
+    columns = {id_col: np.asarray(ids, dtype=object)}
+    for col in attributes:
+        values = df[col].to_numpy()[rows]
+        if df[col].dtype.kind in "biuf":
+            columns[col] = values.astype(np.float32)
+        else:
+            columns[col] = pd.Categorical(values)
+
+    # Key menggantikan posisi kolom id pada tabel fakta
+    facts = df.drop(columns=attributes)
+    position = facts.columns.get_loc(id_col)
+    facts = facts.drop(columns=id_col)
+    facts.insert(position, key_col, keys.astype(np.int32))
+    return facts, DimensionTable(key_col, id_col, columns)
+
+
+def normalize_dimensions(df):
+    """Pecah snapshot denormalisasi menjadi tabel fakta + dimensi produk & penjual."""
+    facts, products = split_dimension(df, "product_id", "product_key", PRODUCT_ATTRIBUTES)
+    facts, sellers = split_dimension(facts, "seller_id", "seller_key", SELLER_ATTRIBUTES)
+    return facts, {"product": products, "seller": sellers}
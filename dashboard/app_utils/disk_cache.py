@@ -0,0 +1,170 @@
+import hashlib
+import os
+import pickle
+import tempfile
+import threading
+from collections import OrderedDict
+
+from app_utils.compute import completed, submit_single_flight
+
+# Lokasi & batas ukuran cache di disk (bisa diatur lewat environment variable).
+# Default di dashboard/.cache relatif terhadap file ini, bukan working directory proses.
+CACHE_DIR = os.environ.get("DASHBOARD_CACHE_DIR",
+                           os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache"))
+CACHE_MAX_BYTES = int(float(os.environ.get("DASHBOARD_CACHE_MAX_MB", "512")) * 1024 * 1024)
+CACHE_SUFFIX = ".pkl"
+
+# Naikkan setiap kali logika agregat halaman berubah, agar hasil lama di disk tidak terpakai lagi
+AGGREGATE_VERSION = 3
+
+# Penanda cache miss (None adalah nilai yang sah untuk di-cache)
+_MISSING = object()
+
+
+def data_fingerprint(path):
+    """Fingerprint murah dari file data (path, ukuran, waktu modifikasi)."""
+    stat = os.stat(path)
+    raw = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def directory_size(path):
+    """Total ukuran file di dalam folder (rekursif)."""
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except FileNotFoundError:
+                pass
+    return total
+
+
+class DiskCache:
+    """
+    Cache pickle di disk yang bertahan setelah server restart.
+    Penulisan atomic (file sementara + os.replace) dan eviction LRU berdasarkan ukuran total.
+
+    Ukuran & urutan LRU dilacak di memori (folder hanya di-scan sekali per proses). Subfolder di
+    dalam cache dir (snapshot kolumnar dari load_snapshot) ikut dihitung terhadap max_bytes, tetapi
+    tidak pernah di-evict karena sedang dipakai (memory-mapped); yang di-evict hanya file pickle.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._entries = None  # path pickle -> ukuran, urut dari yang paling lama tidak dipakai
+        self._total = 0
+        self._pinned = 0
+
+    def _path(self, key):
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(self.directory, digest + CACHE_SUFFIX)
+
+    def _scan(self):
+        # Dipanggil dengan lock dipegang, sekali per proses
+        if self._entries is not None:
+            return
+        files, pinned = [], 0
+        for entry in os.scandir(self.directory):
+            if entry.is_dir():
+                pinned += directory_size(entry.path)
+            elif entry.name.endswith(CACHE_SUFFIX):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.path, stat.st_size))
+        self._entries = OrderedDict((path, size) for _, path, size in sorted(files))
+        self._total = sum(self._entries.values())
+        self._pinned = pinned
+
+    def refresh_pinned(self):
+        """Hitung ulang ukuran subfolder (dipanggil setelah snapshot baru ditulis / snapshot lama dihapus)."""
+        pinned = sum(directory_size(entry.path) for entry in os.scandir(self.directory) if entry.is_dir())
+        with self._lock:
+            self._scan()
+            self._pinned = pinned
+            self._evict()
+
+    def total_bytes(self):
+        with self._lock:
+            self._scan()
+            return self._total + self._pinned
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return default
+        # Tandai sebagai baru dipakai untuk eviction LRU; file yang baru saja di-evict dianggap miss
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return default
+        with self._lock:
+            if self._entries is not None and path in self._entries:
+                self._entries.move_to_end(path)
+        return value
+
+    def set(self, key, value):
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+                size = f.tell()
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        with self._lock:
+            self._scan()
+            self._total += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+            self._evict()
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def _evict(self):
+        # Dipanggil dengan lock dipegang; entry terbaru tidak pernah di-evict
+        while self._total + self._pinned > self.max_bytes and len(self._entries) > 1:
+            path, size = self._entries.popitem(last=False)
+            self._total -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+_default_cache = None
+
+
+def default_cache():
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DiskCache()
+    return _default_cache
+
+
+def submit_cached_aggregate(metric, fingerprint, filter_key, compute):
+    """
+    Ambil agregat halaman dari disk cache sebagai Future. Jika belum ada, request bersamaan
+    dengan (metric, filter) yang sama digabung menjadi satu komputasi di worker pool.
+    """
+    cache = default_cache()
+    key = ("aggregate", AGGREGATE_VERSION, metric, fingerprint, filter_key)
+    value = cache.get(key, _MISSING)
+    if value is not _MISSING:
+        return completed(value)
+    return submit_single_flight(key, lambda: cache.get_or_compute(key, compute))
+
+
+def cached_aggregate(metric, fingerprint, filter_key, compute):
+    return submit_cached_aggregate(metric, fingerprint, filter_key, compute).result()
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+# Dimensi yang bisa difilter (global di sidebar maupun filter lokal halaman)
+FILTER_COLUMNS = ("customer_state", "customer_city", "payment_type", "Customer_segment", "order_status",
+                  "product_category_name_english")
+DATE_COLUMN = "order_purchase_timestamp"
+
+# Dimensi filter yang tidak lagi disimpan di tabel fakta: nilai per baris diambil dari tabel dimensi
+# lewat surrogate key (kolom -> (nama tabel dimensi, kolom key di fakta))
+DIMENSION_FILTER_COLUMNS = {"product_category_name_english": ("product", "product_key")}
+
+# Nilai dengan baris lebih sedikit dari n_rows / SPARSE_RATIO disimpan sebagai daftar posisi baris
+# (lebih hemat dari bitmap penuh), nilai lain sebagai bitmap ter-pack (1 bit per baris).
+SPARSE_RATIO = 32
+
+
+class BitmapFilterIndex:
+    """
+    Bitmap baris per nilai untuk setiap dimensi filter, plus urutan baris per tanggal.
+    Kombinasi multi-select diselesaikan dengan OR di dalam satu dimensi dan AND antar dimensi.
+    """
+
+    def __init__(self, df, columns=FILTER_COLUMNS, date_col=DATE_COLUMN, dimensions=None):
+        self.n_rows = len(df)
+        self.containers = {}
+        for col in columns:
+            values = self._column_values(df, col, dimensions)
+            if values is not None:
+                self.containers[col] = self._build_containers(values)
+
+        # Baris diurutkan per tanggal sekali, rentang tanggal cukup dua kali searchsorted
+        dates = df[date_col].to_numpy(dtype="datetime64[ns]")
+        self.date_order = np.argsort(dates, kind="stable").astype(np.int32)
+        self.sorted_dates = dates[self.date_order]
+
+    @staticmethod
+    def _column_values(df, col, dimensions):
+        if col in df.columns:
+            return df[col]
+        if dimensions and col in DIMENSION_FILTER_COLUMNS:
+            dimension, key_col = DIMENSION_FILTER_COLUMNS[col]
+            if dimension in dimensions and key_col in df.columns:
+                return dimensions[dimension].gather(df[key_col], col)
+        return None
+
+    def _build_containers(self, series):
+        codes, uniques = pd.factorize(series)
+        order = np.argsort(codes, kind="stable").astype(np.int32)
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1])) + (codes < 0).sum()
+
+        containers = {}
+        for code, value in enumerate(uniques):
+            rows = order[starts[code]:starts[code] + counts[code]]
+            if counts[code] * SPARSE_RATIO < self.n_rows:
+                containers[value] = rows
+            else:
+                containers[value] = self._pack(rows)
+        return containers
+
+    #################### Operasi Bitmap ####################
+    def _pack(self, rows):
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def _as_bits(self, container):
+        return container if container.dtype == np.uint8 else self._pack(container)
+
+    def _empty(self):
+        return np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+
+    def values(self, col):
+        return list(self.containers[col].keys())
+
+    def value_bitmap(self, col, values):
+        """OR bitmap semua nilai yang dipilih pada satu dimensi."""
+        containers = self.containers[col]
+        selected = [containers[v] for v in values if v in containers]
+        sparse = [c for c in selected if c.dtype != np.uint8]
+        dense = [c for c in selected if c.dtype == np.uint8]
+
+        bits = self._pack(np.concatenate(sparse)) if sparse else self._empty()
+        for container in dense:
+            bits |= container
+        return bits
+
+    def date_bitmap(self, start_date=None, end_date=None):
+        lo = 0 if start_date is None else np.searchsorted(self.sorted_dates, np.datetime64(pd.Timestamp(start_date)), side="left")
+        hi = self.n_rows if end_date is None else np.searchsorted(self.sorted_dates, np.datetime64(pd.Timestamp(end_date)), side="right")
+        return self._pack(self.date_order[lo:hi])
+
+    def resolve(self, date_range=None, **selections):
+        """
+        Bitmap hasil filter. `selections` berisi kolom -> list nilai; list kosong/None berarti semua nilai.
+        Mengembalikan None jika tidak ada filter sama sekali (semua baris).
+        """
+        bits = None
+        if date_range is not None:
+            bits = self.date_bitmap(*date_range)
+        for col, values in selections.items():
+            if not values:
+                continue
+            col_bits = self.value_bitmap(col, values)
+            bits = col_bits if bits is None else bits & col_bits
+        return bits
+
+    def rows(self, bits):
+        return np.flatnonzero(np.unpackbits(bits, count=self.n_rows))
+
+    def select(self, df, date_range=None, **selections):
+        bits = self.resolve(date_range, **selections)
+        if bits is None:
+            return df
+        return df.take(self.rows(bits))
+
+
+def global_filter_key(start_date, end_date, selected_cities, selected_states):
+    """Key filter global yang stabil (dipakai untuk cache agregat)."""
+    return (str(start_date), str(end_date), tuple(sorted(selected_cities)), tuple(sorted(selected_states)))
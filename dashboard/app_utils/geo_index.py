@@ -0,0 +1,125 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# Dataset geolocation mentah (±1 juta baris) dan hasil ETL berupa array centroid per zip prefix
+GEOLOCATION_PATH = "./data/olist_geolocation_dataset.csv"
+ZIP_CENTROIDS_PATH = "./data/zip_centroids.npz"
+
+# Zip prefix Brasil terdiri dari 5 digit, sehingga index cukup berupa array berukuran 100000
+N_ZIP_PREFIXES = 100_000
+
+# Batas kasar wilayah Brasil untuk membuang koordinat outlier di dataset geolocation
+BRAZIL_LAT_RANGE = (-34.0, 5.5)
+BRAZIL_LNG_RANGE = (-74.0, -34.5)
+
+# Ukuran hexagon default (dalam derajat) untuk peta kepadatan
+HEX_SIZE = 0.5
+
+
+#################### Index Zip Prefix ####################
+class ZipCentroidIndex:
+    """Centroid (lat, lng) per zip prefix, disimpan sebagai array float32 yang di-index langsung oleh prefix."""
+
+    def __init__(self, lat, lng):
+        self.lat = lat
+        self.lng = lng
+
+    def lookup(self, prefixes):
+        """Ambil koordinat untuk array zip prefix; NaN jika prefix tidak dikenal/invalid."""
+        prefixes = pd.to_numeric(pd.Series(prefixes), errors="coerce").to_numpy(dtype=np.float64)
+        valid = ~np.isnan(prefixes) & (prefixes >= 0) & (prefixes < N_ZIP_PREFIXES)
+        index = np.where(valid, prefixes, 0).astype(np.int64)
+        lat = np.where(valid, self.lat[index], np.nan)
+        lng = np.where(valid, self.lng[index], np.nan)
+        return lat, lng
+
+    def save(self, path=ZIP_CENTROIDS_PATH):
+        np.savez_compressed(path, lat=self.lat, lng=self.lng)
+
+    @classmethod
+    def load(cls, path=ZIP_CENTROIDS_PATH):
+        with np.load(path) as data:
+            return cls(data["lat"], data["lng"])
+
+
+def build_zip_centroids(path=GEOLOCATION_PATH):
+    """Ringkas dataset geolocation menjadi satu centroid per zip prefix."""
+    geo = pd.read_csv(path, usecols=["geolocation_zip_code_prefix", "geolocation_lat", "geolocation_lng"],
+                      dtype={"geolocation_zip_code_prefix": np.int32,
+                             "geolocation_lat": np.float64, "geolocation_lng": np.float64})
+    in_brazil = (geo["geolocation_lat"].between(*BRAZIL_LAT_RANGE) &
+                 geo["geolocation_lng"].between(*BRAZIL_LNG_RANGE))
+    geo = geo[in_brazil]
+
+    prefix = geo["geolocation_zip_code_prefix"].to_numpy()
+    counts = np.bincount(prefix, minlength=N_ZIP_PREFIXES)
+    lat_sum = np.bincount(prefix, weights=geo["geolocation_lat"].to_numpy(), minlength=N_ZIP_PREFIXES)
+    lng_sum = np.bincount(prefix, weights=geo["geolocation_lng"].to_numpy(), minlength=N_ZIP_PREFIXES)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        lat = (lat_sum / counts).astype(np.float32)
+        lng = (lng_sum / counts).astype(np.float32)
+    return ZipCentroidIndex(lat, lng)
+
+
+def load_zip_centroids():
+    """Pakai hasil ETL jika ada, bangun dari dataset geolocation jika belum, None jika keduanya tidak ada."""
+    if os.path.exists(ZIP_CENTROIDS_PATH):
+        return ZipCentroidIndex.load()
+    if os.path.exists(GEOLOCATION_PATH):
+        return build_zip_centroids()
+    return None
+
+
+#################### Hexbin ####################
+def hexbin(lat, lng, size=HEX_SIZE):
+    """
+    Kelompokkan titik ke grid hexagon (pointy-top) di server.
+    Mengembalikan DataFrame (lat, lng, count) berisi pusat hexagon yang tidak kosong.
+    """
+    lat = np.asarray(lat, dtype=np.float64)
+    lng = np.asarray(lng, dtype=np.float64)
+    valid = ~np.isnan(lat) & ~np.isnan(lng)
+    x, y = lng[valid], lat[valid]
+
+    # Koordinat axial pecahan, lalu dibulatkan ke hexagon terdekat (cube rounding)
+    q = (np.sqrt(3) / 3 * x - y / 3) / size
+    r = (2 / 3 * y) / size
+    s = -q - r
+    rq, rr, rs = np.round(q), np.round(r), np.round(s)
+    dq, dr, ds = np.abs(rq - q), np.abs(rr - r), np.abs(rs - s)
+    fix_q = (dq > dr) & (dq > ds)
+    fix_r = ~fix_q & (dr > ds)
+    rq = np.where(fix_q, -rr - rs, rq)
+    rr = np.where(fix_r, -rq - rs, rr)
+
+    cells, counts = np.unique(np.column_stack((rq, rr)), axis=0, return_counts=True)
+    return pd.DataFrame({
+        "lat": size * 1.5 * cells[:, 1],
+        "lng": size * np.sqrt(3) * (cells[:, 0] + cells[:, 1] / 2),
+        "count": counts,
+    })
+
+
+def density_bins(zip_index, prefixes, size=HEX_SIZE):
+    lat, lng = zip_index.lookup(prefixes)
+    return hexbin(lat, lng, size)
+
+
+#################### ETL ####################
+def main():
+    parser = argparse.ArgumentParser(description="Ringkas olist_geolocation_dataset.csv menjadi index centroid per zip prefix.")
+    parser.add_argument("--input", default=GEOLOCATION_PATH)
+    parser.add_argument("--output", default=ZIP_CENTROIDS_PATH)
+    args = parser.parse_args()
+
+    index = build_zip_centroids(args.input)
+    index.save(args.output)
+    print(f"{int((~np.isnan(index.lat)).sum()):,} zip prefix disimpan ke {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import ast
+import glob
+import os
+import subprocess
+import sys
+
+# Folder dashboard (berisi entry script, app_pages, dan app_utils)
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_SCRIPT = "dashboard-brazilian-ecommerce.py"
+PAGES_PATTERN = os.path.join("app_pages", "dashboard-*.py")
+
+# Modul berat yang hanya boleh di-import oleh script tertentu (sisanya dianggap regresi)
+RESTRICTED_MODULES = {
+    "matplotlib": ("dashboard-review.py",),
+    "wordcloud": ("dashboard-review.py",),
+}
+
+
+#################### Import per Script ####################
+def script_imports(path):
+    """Statement import level atas sebuah script (yang dijalankan setiap kali halaman dibuka)."""
+    with open(path, encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source)
+    return [ast.get_source_segment(source, node) for node in tree.body
+            if isinstance(node, (ast.Import, ast.ImportFrom))]
+
+
+def import_times(statements):
+    """
+    Jalankan statement import di interpreter baru dengan `-X importtime`.
+    Mengembalikan list (module, self_us, cumulative_us, depth) sesuai urutan output Python.
+    """
+    env = dict(os.environ, PYTHONPATH=DASHBOARD_DIR)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "\n".join(statements)],
+                            cwd=DASHBOARD_DIR, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Output importtime: satu spasi untuk modul level atas, tambah dua spasi per tingkat nested
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def restricted_violations(script_name, rows):
+    imported = {name.split(".")[0] for name, _, _, _ in rows}
+    return sorted(module for module, allowed in RESTRICTED_MODULES.items()
+                  if module in imported and script_name not in allowed)
+
+
+#################### Laporan ####################
+def main():
+    parser = argparse.ArgumentParser(description="Laporan waktu import (cold start) entry script & setiap halaman dashboard.")
+    parser.add_argument("--top", type=int, default=5, help="Jumlah modul terlama yang ditampilkan per script.")
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="Gagal (exit code 1) jika total waktu import sebuah script melebihi batas ini.")
+    args = parser.parse_args()
+
+    scripts = [ENTRY_SCRIPT] + sorted(os.path.relpath(path, DASHBOARD_DIR)
+                                      for path in glob.glob(os.path.join(DASHBOARD_DIR, PAGES_PATTERN)))
+    failed = False
+    for script in scripts:
+        rows = import_times(script_imports(os.path.join(DASHBOARD_DIR, script)))
+        # Modul level atas saja, agar waktu import nested tidak terhitung dua kali
+        top_level = [row for row in rows if row[3] == 0]
+        total_ms = sum(row[2] for row in top_level) / 1000
+
+        violations = restricted_violations(os.path.basename(script), rows)
+        over_budget = args.budget_ms is not None and total_ms > args.budget_ms
+        failed |= bool(violations) or over_budget
+
+        status = "OK"
+        if violations:
+            status = "IMPORTS " + ", ".join(violations)
+        elif over_budget:
+            status = f"OVER BUDGET ({args.budget_ms:,.0f} ms)"
+        print(f"{script:<40} {total_ms:>8,.0f} ms  {status}")
+        for name, _, cumulative_us, _ in sorted(top_level, key=lambda row: -row[2])[:args.top]:
+            print(f"    {name:<36} {cumulative_us / 1000:>8,.0f} ms")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,364 @@
+import argparse
+import asyncio
+import csv
+import datetime
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+
+import numpy as np
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from tornado.httpclient import AsyncHTTPClient
+from tornado.websocket import websocket_connect
+
+# Lokasi entry script; server dijalankan dari root repo (path data/assets relatif terhadap root)
+DASHBOARD_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPO_ROOT = os.path.dirname(DASHBOARD_DIR)
+ENTRY_SCRIPT = os.path.join(DASHBOARD_DIR, "dashboard-brazilian-ecommerce.py")
+
+# Label widget sidebar yang diubah oleh skenario user (lihat entry script)
+DATE_LABEL = "Select Date Range"
+STATE_LABEL = "Select State"
+COMPARE_LABEL = "Compare With"
+WIDGET_TYPES = ("date_input", "multiselect", "selectbox")
+
+# Bobot aksi dalam satu journey: pindah halaman lebih sering daripada mengubah filter
+ACTIONS = {"page": 0.5, "date": 0.2, "state": 0.15, "compare": 0.15}
+PERCENTILES = (50, 90, 99)
+DATE_FORMAT = "%Y/%m/%d"
+TIMELINE_ROWS = 30
+
+
+#################### Protokol WebSocket Streamlit ####################
+class SimulatedSession:
+    """
+    Satu session browser tiruan: kirim BackMsg rerun_script lewat websocket Streamlit
+    dan tunggu sampai script selesai (ForwardMsg script_finished), seperti yang dilakukan frontend.
+    """
+
+    def __init__(self, ws_url, rng, timeout):
+        self.ws_url = ws_url
+        self.rng = rng
+        self.timeout = timeout
+        self.connection = None
+        self.pages = {}
+        self.page_hash = ""
+        self.widgets = {}
+        self.values = {}
+
+    async def connect(self):
+        self.connection = await websocket_connect(self.ws_url, max_message_size=256 * 1024 * 1024)
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+
+    def _back_msg(self, page_hash):
+        msg = BackMsg()
+        msg.rerun_script.query_string = ""
+        msg.rerun_script.page_script_hash = page_hash
+        # Seperti frontend: kirim nilai widget terakhir untuk widget yang ada di run sebelumnya
+        for label, (value_type, value) in self.values.items():
+            widget = self.widgets.get(label)
+            if widget is None:
+                continue
+            state = msg.rerun_script.widget_states.widgets.add()
+            state.id = widget.id
+            if value_type == "int_value":
+                state.int_value = value
+            elif value_type == "int_array_value":
+                state.int_array_value.data[:] = value
+            else:
+                state.string_array_value.data[:] = value
+        return msg
+
+    async def rerun(self, page_hash=None):
+        """
+        Jalankan satu rerun; kembalikan (latency detik, jumlah exception, status, byte payload,
+        byte payload chart Plotly) — byte dihitung dari semua ForwardMsg yang diterima selama rerun.
+        """
+        page_hash = self.page_hash if page_hash is None else page_hash
+        start = time.perf_counter()
+        await self.connection.write_message(self._back_msg(page_hash).SerializeToString(), binary=True)
+
+        widgets, errors = {}, 0
+        payload_bytes, chart_bytes = 0, 0
+        while True:
+            raw = await asyncio.wait_for(self.connection.read_message(), self.timeout)
+            if raw is None:
+                raise ConnectionError("websocket ditutup oleh server")
+            msg = ForwardMsg()
+            msg.ParseFromString(raw)
+            kind = msg.WhichOneof("type")
+            payload_bytes += len(raw)
+
+            if kind == "new_session":
+                self.pages = {page.page_script_hash: page.page_name for page in msg.new_session.app_pages}
+                self.page_hash = msg.new_session.page_script_hash
+            elif kind == "delta" and msg.delta.WhichOneof("type") == "new_element":
+                element_type = msg.delta.new_element.WhichOneof("type")
+                if element_type == "exception":
+                    errors += 1
+                elif element_type == "plotly_chart":
+                    chart_bytes += len(raw)
+                elif element_type in WIDGET_TYPES:
+                    widget = getattr(msg.delta.new_element, element_type)
+                    widgets[widget.label] = widget
+            elif kind == "script_finished":
+                # st.rerun() di entry script menghentikan run lebih awal lalu menjalankan ulang;
+                # latency yang dirasakan user dihitung sampai run terakhir selesai
+                if msg.script_finished == ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                    widgets = {}
+                    continue
+                status = "ok" if msg.script_finished == ForwardMsg.FINISHED_SUCCESSFULLY else "compile_error"
+                break
+
+        if widgets:
+            self.widgets = widgets
+        return time.perf_counter() - start, errors, status, payload_bytes, chart_bytes
+
+    #################### Journey User ####################
+    def choose_action(self):
+        available = [action for action in ACTIONS if action == "page" or self._widget_for(action) is not None]
+        weights = [ACTIONS[action] for action in available]
+        return self.rng.choices(available, weights=weights)[0]
+
+    def _widget_for(self, action):
+        label = {"date": DATE_LABEL, "state": STATE_LABEL, "compare": COMPARE_LABEL}.get(action)
+        return self.widgets.get(label)
+
+    def apply_action(self, action):
+        """Ubah nilai widget sesuai aksi; kembalikan page hash tujuan (None = tetap di halaman ini)."""
+        if action == "page":
+            return self.rng.choice(list(self.pages)) if self.pages else None
+
+        widget = self._widget_for(action)
+        if action == "date":
+            min_date = datetime.datetime.strptime(widget.min, DATE_FORMAT).date()
+            max_date = datetime.datetime.strptime(widget.max, DATE_FORMAT).date()
+            span = (max_date - min_date).days
+            length = self.rng.randint(min(30, span), max(min(180, span), 1))
+            start = min_date + datetime.timedelta(days=self.rng.randint(0, max(span - length, 0)))
+            end = min(start + datetime.timedelta(days=length), max_date)
+            self.values[DATE_LABEL] = ("string_array_value", [start.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT)])
+        elif action == "state":
+            # 0-3 state; list kosong berarti semua state
+            count = self.rng.randint(0, min(3, len(widget.options)))
+            self.values[STATE_LABEL] = ("int_array_value", sorted(self.rng.sample(range(len(widget.options)), count)))
+        elif action == "compare":
+            self.values[COMPARE_LABEL] = ("int_value", self.rng.randrange(len(widget.options)))
+        return None
+
+
+#################### Runner ####################
+class LoadTestStats:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.reruns = []  # (detik sejak mulai, session, aksi, halaman, latency, exception, status, byte, byte chart)
+        self.samples = []  # (detik sejak mulai, session aktif, cpu %, rss MB)
+        self.active_sessions = 0
+        self.failures = 0
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+
+async def run_session(index, ws_url, args, stats):
+    rng = random.Random(args.seed * 100_003 + index)
+    # Ramp-up: session dimulai bertahap selama args.ramp_up detik
+    await asyncio.sleep(args.ramp_up * index / max(args.sessions, 1))
+
+    session = SimulatedSession(ws_url, rng, args.timeout)
+    stats.active_sessions += 1
+    try:
+        await session.connect()
+        actions = ["initial"] + [None] * args.steps
+        for action in actions:
+            page_hash = None
+            if action is None:
+                await asyncio.sleep(args.think_time * rng.uniform(0.5, 1.5))
+                action = session.choose_action()
+                page_hash = session.apply_action(action)
+            latency, errors, status, payload_bytes, chart_bytes = await session.rerun(page_hash)
+            page_name = session.pages.get(session.page_hash, session.page_hash)
+            stats.reruns.append((stats.elapsed(), index, action, page_name, latency, errors, status,
+                                 payload_bytes, chart_bytes))
+    except (ConnectionError, OSError, asyncio.TimeoutError) as ex:
+        stats.failures += 1
+        print(f"session {index} gagal: {type(ex).__name__}: {ex}", file=sys.stderr)
+    finally:
+        session.close()
+        stats.active_sessions -= 1
+
+
+def read_process_usage(pid):
+    """(cpu detik total, rss MB) proses server dari /proc (Linux); None jika tidak tersedia."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/status") as f:
+            rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    except (OSError, StopIteration, IndexError, ValueError):
+        return None
+    # Field utime & stime (ke-14 & ke-15 di /proc/<pid>/stat) dalam clock tick
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    return cpu_seconds, rss_kb / 1024
+
+
+async def sample_resources(pid, interval, stats, done):
+    previous = read_process_usage(pid) if pid else None
+    previous_time = time.perf_counter()
+    while not done.is_set():
+        await asyncio.sleep(interval)
+        usage = read_process_usage(pid) if pid else None
+        now = time.perf_counter()
+        if usage is not None and previous is not None:
+            cpu_percent = (usage[0] - previous[0]) / (now - previous_time) * 100
+            stats.samples.append((stats.elapsed(), stats.active_sessions, cpu_percent, usage[1]))
+        previous, previous_time = usage, now
+
+
+#################### Server Lokal ####################
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def launch_server(port):
+    command = [sys.executable, "-m", "streamlit", "run", ENTRY_SCRIPT,
+               "--server.headless=true", f"--server.port={port}", "--server.address=127.0.0.1",
+               "--browser.gatherUsageStats=false", "--server.fileWatcherType=none"]
+    return subprocess.Popen(command, cwd=REPO_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_for_server(base_url, timeout):
+    client = AsyncHTTPClient()
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            response = await client.fetch(base_url + "/_stcore/health", raise_error=False, request_timeout=2)
+            if response.code == 200:
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.5)
+    raise TimeoutError(f"server {base_url} tidak siap dalam {timeout} detik")
+
+
+#################### Laporan ####################
+def format_percentiles(latencies):
+    values = np.percentile(latencies, PERCENTILES) * 1000
+    return "  ".join(f"p{q}={v:,.0f}ms" for q, v in zip(PERCENTILES, values)) + f"  max={max(latencies) * 1000:,.0f}ms"
+
+
+def print_report(stats, wall_seconds):
+    reruns = stats.reruns
+    print(f"\nSessions gagal : {stats.failures}")
+    print(f"Total rerun    : {len(reruns):,} dalam {wall_seconds:,.1f} s "
+          f"({len(reruns) / wall_seconds:,.2f} rerun/s)")
+    print(f"Exception      : {sum(row[5] for row in reruns):,}  "
+          f"(compile error: {sum(row[6] != 'ok' for row in reruns):,})")
+    if not reruns:
+        return
+
+    print(f"\nLatency rerun (semua): {format_percentiles([row[4] for row in reruns])}")
+    for title, column in (("aksi", 2), ("halaman", 3)):
+        print(f"\nLatency per {title}:")
+        for key in sorted({row[column] for row in reruns}):
+            latencies = [row[4] for row in reruns if row[column] == key]
+            print(f"    {key:<24} n={len(latencies):<6,} {format_percentiles(latencies)}")
+
+    # Ukuran payload websocket per rerun halaman (chart Plotly biasanya bagian terbesar)
+    print("\nPayload per rerun halaman (rata-rata):")
+    for page in sorted({row[3] for row in reruns}):
+        rows = [row for row in reruns if row[3] == page]
+        print(f"    {page:<24} total={np.mean([row[7] for row in rows]) / 1024:>8,.1f} KB  "
+              f"chart={np.mean([row[8] for row in rows]) / 1024:>8,.1f} KB")
+
+    if stats.samples:
+        cpu = [row[2] for row in stats.samples]
+        rss = [row[3] for row in stats.samples]
+        print(f"\nServer CPU     : rata-rata {np.mean(cpu):,.0f}%  maks {max(cpu):,.0f}%")
+        print(f"Server RSS     : awal {rss[0]:,.0f} MB  maks {max(rss):,.0f} MB  akhir {rss[-1]:,.0f} MB")
+        print("\n  detik  session   cpu%    rss MB  rerun/s")
+        # Timeline diringkas menjadi maksimal TIMELINE_ROWS baris; detail lengkap ada di resources.csv
+        step = -(-len(stats.samples) // TIMELINE_ROWS)
+        previous_time = 0.0
+        for elapsed, active, cpu_percent, rss_mb in stats.samples[step - 1::step]:
+            completed = sum(previous_time < row[0] <= elapsed for row in reruns)
+            print(f"  {elapsed:>5,.0f}  {active:>7}  {cpu_percent:>5,.0f}  {rss_mb:>8,.0f}  "
+                  f"{completed / max(elapsed - previous_time, 1e-9):>7,.1f}")
+            previous_time = elapsed
+
+
+def write_csv(directory, stats):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "reruns.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["elapsed_s", "session", "action", "page", "latency_s", "exceptions", "status",
+                         "payload_bytes", "chart_bytes"])
+        writer.writerows(stats.reruns)
+    with open(os.path.join(directory, "resources.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["elapsed_s", "active_sessions", "cpu_percent", "rss_mb"])
+        writer.writerows(stats.samples)
+
+
+async def run(args):
+    server = None
+    pid = args.pid
+    base_url = args.url.rstrip("/") if args.url else None
+    if base_url is None:
+        port = free_port()
+        server = launch_server(port)
+        pid = server.pid
+        base_url = f"http://127.0.0.1:{port}"
+    try:
+        await wait_for_server(base_url, args.startup_timeout)
+        ws_url = base_url.replace("http", "ws", 1) + "/_stcore/stream"
+        print(f"Target {base_url}: {args.sessions} session, {args.steps} aksi/session, "
+              f"ramp-up {args.ramp_up}s, think time {args.think_time}s")
+
+        stats = LoadTestStats()
+        done = asyncio.Event()
+        sampler = asyncio.create_task(sample_resources(pid, args.sample_interval, stats, done))
+        await asyncio.gather(*(run_session(i, ws_url, args, stats) for i in range(args.sessions)))
+        wall_seconds = stats.elapsed()
+        done.set()
+        await sampler
+
+        print_report(stats, wall_seconds)
+        if args.output:
+            write_csv(args.output, stats)
+            print(f"\nDetail disimpan ke {args.output}/reruns.csv & resources.csv")
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test offline: banyak session Streamlit bersamaan lewat protokol websocket.")
+    parser.add_argument("--sessions", type=int, default=50, help="Jumlah session bersamaan.")
+    parser.add_argument("--steps", type=int, default=20, help="Jumlah aksi (pindah halaman/ubah filter) per session.")
+    parser.add_argument("--ramp-up", type=float, default=10.0, help="Detik untuk memulai semua session.")
+    parser.add_argument("--think-time", type=float, default=1.0, help="Rata-rata jeda antar aksi (detik).")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Batas waktu satu rerun (detik).")
+    parser.add_argument("--url", default=None, help="Server yang sudah berjalan (mis. http://127.0.0.1:8501). "
+                                                    "Default: jalankan server lokal baru.")
+    parser.add_argument("--pid", type=int, default=None, help="PID server untuk sampling CPU/RSS jika memakai --url.")
+    parser.add_argument("--sample-interval", type=float, default=1.0, help="Interval sampling CPU/RSS (detik).")
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Folder untuk reruns.csv & resources.csv.")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
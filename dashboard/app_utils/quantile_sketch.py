@@ -0,0 +1,111 @@
+import numpy as np
+import pandas as pd
+
+# Persentil yang ditampilkan di halaman (p50, p90, p99)
+PERCENTILES = (0.5, 0.9, 0.99)
+
+# Sketch berbasis bucket logaritmik (gaya DDSketch): error relatif <= RELATIVE_ACCURACY,
+# dan dua sketch digabung cukup dengan menjumlahkan array count-nya.
+RELATIVE_ACCURACY = 0.01
+MIN_VALUE = 1e-2
+MAX_VALUE = 1e6
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+LOG_GAMMA = np.log(GAMMA)
+OFFSET = int(np.ceil(np.log(MIN_VALUE) / LOG_GAMMA))
+# Bucket 0 menampung nilai <= MIN_VALUE (termasuk 0), sisanya bucket logaritmik
+N_BUCKETS = int(np.ceil(np.log(MAX_VALUE) / LOG_GAMMA)) - OFFSET + 2
+
+
+#################### Bucket & Quantile ####################
+def bucket_index(values):
+    """Nomor bucket untuk setiap nilai (array float, tanpa NaN)."""
+    values = np.asarray(values, dtype=np.float64)
+    index = np.zeros(values.shape, dtype=np.int64)
+    positive = values > MIN_VALUE
+    index[positive] = np.ceil(np.log(values[positive]) / LOG_GAMMA).astype(np.int64) - OFFSET + 1
+    return np.clip(index, 0, N_BUCKETS - 1)
+
+
+def bucket_value(index):
+    """Nilai representatif bucket (titik tengah relatif batas bawah & atas)."""
+    index = np.asarray(index)
+    upper = np.power(GAMMA, index + OFFSET - 1)
+    return np.where(index == 0, 0.0, 2 * upper / (GAMMA + 1))
+
+
+def quantiles_from_counts(counts, qs=PERCENTILES):
+    """Hitung quantile dari array count bucket, NaN jika sketch kosong."""
+    total = counts.sum()
+    if total == 0:
+        return [np.nan] * len(qs)
+    cumulative = np.cumsum(counts)
+    ranks = np.asarray(qs) * (total - 1)
+    return list(bucket_value(np.searchsorted(cumulative, ranks, side="right")))
+
+
+#################### Sketch per (Bulan, State) ####################
+class PartitionedSketch:
+    """Kumpulan sketch per partisi (year_month, customer_state) untuk satu kolom metrik."""
+
+    def __init__(self, months, states, counts):
+        self.months = months
+        self.states = states
+        self.counts = counts  # shape: (bulan, state, bucket)
+
+    def merged(self, start_date=None, end_date=None, states=None):
+        # Pilih bulan yang beririsan dengan rentang tanggal
+        month_mask = np.ones(len(self.months), dtype=bool)
+        if start_date is not None:
+            month_mask &= self.months >= pd.Timestamp(start_date).to_period("M").to_timestamp()
+        if end_date is not None:
+            month_mask &= self.months <= pd.Timestamp(end_date)
+        counts = self.counts[month_mask]
+
+        # List state kosong/None berarti semua state
+        if states:
+            positions = self.states.get_indexer(list(states))
+            counts = counts[:, positions[positions >= 0]]
+        return counts.sum(axis=(0, 1), dtype=np.int64)
+
+    def quantiles(self, qs=PERCENTILES, start_date=None, end_date=None, states=None):
+        return quantiles_from_counts(self.merged(start_date, end_date, states), qs)
+
+
+def build_partitioned_sketch(df, value_col, month_col="year_month", state_col="customer_state"):
+    values = df[value_col].to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+
+    month_codes, months = pd.factorize(df[month_col], sort=True)
+    state_codes, states = pd.factorize(df[state_col], sort=True)
+    valid &= (month_codes >= 0) & (state_codes >= 0)
+
+    # Satu bincount untuk semua partisi: index datar (bulan, state, bucket)
+    flat_index = ((month_codes[valid] * len(states) + state_codes[valid]) * N_BUCKETS
+                  + bucket_index(values[valid]))
+    counts = np.bincount(flat_index, minlength=len(months) * len(states) * N_BUCKETS)
+    counts = counts.astype(np.int32).reshape(len(months), len(states), N_BUCKETS)
+
+    return PartitionedSketch(pd.DatetimeIndex(months), pd.Index(states), counts)
+
+
+def build_metric_sketches(df, columns=("delivery_time", "payment_value", "payment_installments", "review_score")):
+    return {col: build_partitioned_sketch(df, col) for col in columns}
+
+
+def filtered_quantiles(sketch, filtered_values, start_date, end_date, selected_cities, selected_states, qs=PERCENTILES):
+    """
+    Persentil untuk filter global. Sketch hanya dipartisi per state, sehingga filter city
+    dihitung langsung (exact) dari data yang sudah terfilter.
+    """
+    if selected_cities:
+        values = filtered_values.to_numpy(dtype=np.float64)
+        values = values[~np.isnan(values)]
+        return list(np.quantile(values, qs)) if len(values) else [np.nan] * len(qs)
+    return sketch.quantiles(qs, start_date, end_date, selected_states)
+
+
+def format_quantile(value, fmt="{:,.1f}"):
+    """Format persentil untuk st.metric; "-" jika tidak ada data pada filter (NaN dari sketch/exact kosong)."""
+    if value is None or np.isnan(value):
+        return "-"
+    return fmt.format(value)
@@ -0,0 +1,138 @@
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from app_utils.text_utils import TOKEN_PATTERN, fold_accents
+
+# Naikkan versi jika lexicon/aturan berubah agar skor lama di cache tidak dipakai lagi
+LEXICON_VERSION = 2
+
+SENTIMENT_COLUMN = "review_sentiment"
+BATCH_SIZE = 5000
+SENTIMENT_WORKERS = int(os.environ.get("DASHBOARD_SENTIMENT_WORKERS", min(4, os.cpu_count() or 1)))
+
+# Lexicon sederhana Bahasa Portugis (sudah di-fold tanpa aksen), bobot -2..2
+POSITIVE_WORDS = {
+    "bom": 1, "boa": 1, "bons": 1, "boas": 1, "otimo": 2, "otima": 2, "excelente": 2, "perfeito": 2,
+    "perfeita": 2, "maravilhoso": 2, "maravilhosa": 2, "adorei": 2, "amei": 2, "gostei": 1, "recomendo": 2,
+    "satisfeito": 1, "satisfeita": 1, "rapido": 1, "rapida": 1, "rapidez": 1, "antes": 1, "lindo": 1,
+    "linda": 1, "top": 1, "qualidade": 1, "certinho": 1, "correto": 1, "conforme": 1, "parabens": 2,
+    "obrigado": 1, "obrigada": 1, "super": 1, "eficiente": 1, "confiavel": 1, "show": 1, "legal": 1,
+    "bem": 1, "feliz": 1, "agradavel": 1, "incrivel": 2, "funciona": 1, "ok": 1, "tranquilo": 1,
+}
+NEGATIVE_WORDS = {
+    "ruim": -1, "pessimo": -2, "pessima": -2, "horrivel": -2, "terrivel": -2, "quebrado": -2,
+    "quebrada": -2, "defeito": -2, "defeituoso": -2, "atraso": -1, "atrasou": -1, "atrasado": -1,
+    "atrasada": -1, "demora": -1, "demorou": -1, "errado": -1, "errada": -1, "falta": -1, "faltando": -1,
+    "problema": -1, "problemas": -1, "reclamacao": -1, "insatisfeito": -2, "insatisfeita": -2,
+    "decepcionado": -2, "decepcionada": -2, "decepcao": -2, "lixo": -2, "fraude": -2, "enganado": -2,
+    "devolver": -1, "devolucao": -1, "cancelar": -1, "cancelado": -1, "nunca": -1, "pior": -2,
+    "mal": -1, "danificado": -2, "danificada": -2, "absurdo": -2, "descaso": -2, "vergonha": -2,
+}
+LEXICON = {**POSITIVE_WORDS, **NEGATIVE_WORDS}
+
+# Kata negasi meredam & membalik kata positif dalam NEGATION_WINDOW token berikutnya (gaya VADER);
+# kata negatif tetap negatif ("nao gostei, pessimo" tetap negatif)
+NEGATORS = {"nao", "nem", "sem", "jamais", "nenhum", "nenhuma"}
+NEGATION_WINDOW = 3
+NEGATION_SCALAR = -0.74
+
+# Jendela negasi berhenti di batas klausa: tanda baca atau konjungsi pertentangan
+CLAUSE_PUNCTUATION = ",.;!?"
+CLAUSE_CONJUNCTIONS = {"mas", "porem", "contudo", "entretanto", "todavia"}
+CLAUSE_BREAK = "|"
+CLAUSE_TOKEN_PATTERN = re.compile(rf"{TOKEN_PATTERN}|[{re.escape(CLAUSE_PUNCTUATION)}]")
+# Konstanta normalisasi (gaya VADER): skor = x / sqrt(x^2 + alpha), hasil di rentang -1..1
+NORMALIZATION_ALPHA = 4
+
+
+#################### Skoring Batch ####################
+def clause_tokens(text):
+    """Token ter-fold (tanpa stopword dibuang) dengan CLAUSE_BREAK di posisi tanda baca batas klausa."""
+    return [CLAUSE_BREAK if tok in CLAUSE_PUNCTUATION else tok
+            for tok in CLAUSE_TOKEN_PATTERN.findall(fold_accents(text))]
+
+
+def score_batch(texts):
+    """Skor sentimen (-1..1) untuk sekumpulan teks, dihitung vektorial per token."""
+    tokens = pd.Series(list(texts), dtype=object).map(clause_tokens)
+    exploded = tokens.explode().dropna()
+    if exploded.empty:
+        return np.zeros(len(tokens))
+
+    doc = exploded.index.to_numpy()
+    words = pd.Series(exploded.to_numpy())
+    polarity = words.map(LEXICON).fillna(0).to_numpy(dtype=np.float64)
+
+    # Nomor klausa per dokumen: bertambah di setiap tanda baca / konjungsi pertentangan
+    is_break = (words.eq(CLAUSE_BREAK) | words.isin(CLAUSE_CONJUNCTIONS)).to_numpy()
+    clause = pd.Series(is_break.astype(np.int64)).groupby(doc).cumsum().to_numpy()
+
+    # Posisi negator terakhir dalam klausa yang sama, lalu cek apakah masih dalam jendela negasi
+    position = np.arange(len(words))
+    is_negator = words.isin(NEGATORS).to_numpy()
+    last_negator = (pd.Series(np.where(is_negator, position, np.nan))
+                    .groupby([doc, clause]).ffill().to_numpy())
+    negated = ~np.isnan(last_negator) & (position - last_negator <= NEGATION_WINDOW) & ~is_negator
+    polarity = np.where(negated & (polarity > 0), polarity * NEGATION_SCALAR, polarity)
+
+    raw = np.bincount(doc, weights=polarity, minlength=len(tokens))
+    return raw / np.sqrt(raw ** 2 + NORMALIZATION_ALPHA)
+
+
+def _spawn_safe():
+    """
+    Worker "spawn" meng-import ulang modul __main__. Aman jika __main__ adalah modul biasa
+    (mis. python -m app_utils.shared_dataset), tetapi tidak di dalam server Streamlit: di sana
+    __main__ adalah script halaman yang akan ikut dijalankan ulang oleh setiap worker.
+    """
+    main = sys.modules.get("__main__")
+    return getattr(main, "__spec__", None) is not None or not hasattr(main, "__file__")
+
+
+def score_texts(texts, batch_size=BATCH_SIZE, workers=SENTIMENT_WORKERS):
+    """
+    Skor banyak teks sekaligus, dibagi per batch ke process pool jika datanya besar.
+    Pool dibuat per pemanggilan dengan konteks "spawn" (fork dari proses multi-thread tidak aman)
+    dan ditutup setelah selesai, agar worker tidak tertinggal selama server hidup.
+    """
+    texts = list(texts)
+    if not texts:
+        return np.empty(0)
+    batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+    if workers <= 1 or len(batches) == 1 or not _spawn_safe():
+        return np.concatenate([score_batch(batch) for batch in batches])
+    with ProcessPoolExecutor(max_workers=min(workers, len(batches)),
+                             mp_context=multiprocessing.get_context("spawn")) as executor:
+        return np.concatenate(list(executor.map(score_batch, batches)))
+
+
+#################### Tahap Pipeline ####################
+def update_sentiment_scores(df, previous=None):
+    """
+    Kembalikan Series review_id -> skor sentimen. Ulasan yang sudah ada di `previous`
+    tidak diskor ulang; hanya review baru yang diproses.
+    """
+    messages = df["review_comment_message"]
+    has_comment = messages.notna() & (messages != "NoComment")
+    reviews = df.loc[has_comment, ["review_id", "review_comment_message"]].drop_duplicates("review_id")
+
+    if previous is not None:
+        reviews = reviews[~reviews["review_id"].isin(previous.index)]
+
+    new_scores = pd.Series(score_texts(reviews["review_comment_message"]),
+                           index=reviews["review_id"].to_numpy(), name=SENTIMENT_COLUMN)
+    if previous is None or previous.empty:
+        return new_scores
+    return pd.concat([previous, new_scores]) if len(new_scores) else previous
+
+
+def add_review_sentiment(df, scores):
+    """Tambahkan kolom review_sentiment (NaN untuk ulasan tanpa komentar) ke snapshot."""
+    df[SENTIMENT_COLUMN] = df["review_id"].map(scores).astype(np.float64)
+    return df
@@ -0,0 +1,150 @@
+import argparse
+import os
+import pickle
+import signal
+import struct
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from app_utils.data_loader import DATA_PATH, read_dataset
+
+# Setiap buffer diletakkan pada offset kelipatan 64 byte agar view numpy/arrow tetap aligned
+ALIGNMENT = 64
+MANIFEST_SUFFIX = "_manifest"
+HEADER = struct.Struct("<Q")
+
+# Handle shared memory yang sedang di-attach, disimpan agar buffer tidak ditutup GC
+_attached_segments = {}
+
+
+def _aligned(size):
+    return (size + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+#################### Serialisasi Kolom ####################
+def _column_buffers(series):
+    """
+    Pecah satu kolom menjadi (spec, list buffer bytes).
+    Kolom numerik, bool, dan datetime disimpan sebagai array numpy mentah,
+    kolom teks disimpan sebagai buffer Arrow large_string (validity, offsets, data).
+    """
+    if series.dtype.kind in "biufcM":
+        array = np.ascontiguousarray(series.to_numpy())
+        return {"kind": "numpy", "dtype": array.dtype.str}, [array.view(np.uint8)]
+
+    array = pa.array(series.astype(object), type=pa.large_string(), from_pandas=True)
+    buffers = [None if buf is None else np.frombuffer(buf, dtype=np.uint8) for buf in array.buffers()]
+    return {"kind": "arrow_string", "null_count": array.null_count, "offset": array.offset}, buffers
+
+
+def publish_dataset(df, name, dimensions=None):
+    """
+    Salin semua kolom df ke satu blok shared memory `name` dan kembalikan handle-nya.
+    Tabel dimensi (kecil) ikut di-pickle ke dalam manifest.
+    """
+    specs, payloads, size = [], [], 0
+    for col in df.columns:
+        spec, buffers = _column_buffers(df[col])
+        spec["name"] = col
+        spec["buffers"] = []
+        for buf in buffers:
+            if buf is None:
+                spec["buffers"].append(None)
+                continue
+            spec["buffers"].append((size, buf.nbytes))
+            payloads.append((size, buf))
+            size += _aligned(buf.nbytes)
+        specs.append(spec)
+
+    data = shared_memory.SharedMemory(name=name, create=True, size=max(size, 1))
+    for offset, buf in payloads:
+        data.buf[offset:offset + buf.nbytes] = buf
+
+    manifest_bytes = pickle.dumps({"n_rows": len(df), "columns": specs, "dimensions": dimensions})
+    manifest = shared_memory.SharedMemory(name=name + MANIFEST_SUFFIX, create=True,
+                                          size=HEADER.size + len(manifest_bytes))
+    manifest.buf[:HEADER.size] = HEADER.pack(len(manifest_bytes))
+    manifest.buf[HEADER.size:HEADER.size + len(manifest_bytes)] = manifest_bytes
+
+    return data, manifest
+
+
+#################### Attach (Worker) ####################
+class _BorrowedSegment(shared_memory.SharedMemory):
+    # Buffer dipakai DataFrame sampai proses selesai; mapping dibersihkan OS saat worker exit
+    def __del__(self):
+        pass
+
+
+def _open_segment(name):
+    segment = _BorrowedSegment(name=name)
+    # Worker hanya meminjam segment; jangan biarkan resource_tracker meng-unlink saat worker exit
+    if os.name == "posix":
+        resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def attach_dataset(name):
+    """
+    Bangun DataFrame read-only di atas shared memory tanpa menyalin data kolom.
+    Kolom teks menjadi dtype Arrow string (zero-copy), kolom lain array numpy biasa.
+    Mengembalikan (DataFrame fakta, dict tabel dimensi).
+    """
+    if name in _attached_segments:
+        return _attached_segments[name][2:]
+
+    manifest = _open_segment(name + MANIFEST_SUFFIX)
+    (length,) = HEADER.unpack(manifest.buf[:HEADER.size])
+    meta = pickle.loads(manifest.buf[HEADER.size:HEADER.size + length])
+
+    data = _open_segment(name)
+    n_rows = meta["n_rows"]
+    columns = {}
+    for spec in meta["columns"]:
+        views = [None if buf is None else data.buf[buf[0]:buf[0] + buf[1]] for buf in spec["buffers"]]
+        if spec["kind"] == "numpy":
+            array = np.frombuffer(views[0], dtype=np.dtype(spec["dtype"]))
+            array.flags.writeable = False
+            columns[spec["name"]] = array
+        else:
+            array = pa.Array.from_buffers(pa.large_string(), n_rows,
+                                          [None if v is None else pa.py_buffer(v) for v in views],
+                                          null_count=spec["null_count"], offset=spec["offset"])
+            columns[spec["name"]] = pd.arrays.ArrowExtensionArray(array)
+
+    df = pd.DataFrame(columns, copy=False)
+    _attached_segments[name] = (data, manifest, df, meta["dimensions"])
+    return df, meta["dimensions"]
+
+
+#################### Proses Loader ####################
+def main():
+    parser = argparse.ArgumentParser(description="Publish dataset dashboard ke shared memory untuk semua worker Streamlit.")
+    parser.add_argument("--name", default="olist_dashboard", help="Nama blok shared memory.")
+    parser.add_argument("--path", default=DATA_PATH, help="Lokasi CSV dataset.")
+    args = parser.parse_args()
+
+    facts, dimensions = read_dataset(args.path)
+    data, manifest = publish_dataset(facts, args.name, dimensions)
+    print(f"Dataset dipublish ke shared memory '{args.name}' ({data.size / 1e6:,.1f} MB). "
+          f"Jalankan worker dengan DASHBOARD_SHARED_DATASET={args.name}. Tekan Ctrl+C untuk berhenti.")
+
+    def stop(*_):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        signal.pause()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for segment in (data, manifest):
+            segment.close()
+            segment.unlink()
+
+
+if __name__ == "__main__":
+    main()
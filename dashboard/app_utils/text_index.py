@@ -0,0 +1,128 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+from app_utils.text_utils import fold_accents, tokenize
+
+# Kolom per ulasan yang disimpan di index untuk filter & tampilan hasil
+REVIEW_COLUMNS = ["review_id", "review_score", "Customer_segment", "customer_city", "customer_state",
+                  "order_purchase_timestamp", "review_comment_message"]
+
+# Parameter ranking BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _has_comment(messages):
+    return messages.notna() & (messages != "NoComment")
+
+
+class ReviewTextIndex:
+    """
+    Inverted index untuk review_comment_message (satu dokumen per review_id).
+    Posting list disimpan dalam format CSR: term_ptr[t]:term_ptr[t+1] menunjuk ke
+    doc_ids & term_freqs yang sudah ter-sort per dokumen.
+    """
+
+    def __init__(self, docs, terms, term_ptr, doc_ids, term_freqs, doc_lengths):
+        self.docs = docs
+        self.term_lookup = {term: i for i, term in enumerate(terms)}
+        self.term_ptr = term_ptr
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.avg_length = doc_lengths.mean() if len(doc_lengths) else 0.0
+        self.folded_text = docs["review_comment_message"].map(fold_accents).to_numpy()
+
+    def __len__(self):
+        return len(self.docs)
+
+    def _postings(self, term):
+        t = self.term_lookup.get(term)
+        if t is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        lo, hi = self.term_ptr[t], self.term_ptr[t + 1]
+        return self.doc_ids[lo:hi], self.term_freqs[lo:hi]
+
+    def filter_mask(self, start_date=None, end_date=None, cities=None, states=None,
+                    scores=None, segments=None):
+        # List kosong/None berarti tidak ada filter pada dimensi tersebut
+        docs = self.docs
+        mask = np.ones(len(docs), dtype=bool)
+        if start_date is not None:
+            mask &= (docs["order_purchase_timestamp"] >= start_date).to_numpy()
+        if end_date is not None:
+            mask &= (docs["order_purchase_timestamp"] <= end_date).to_numpy()
+        if cities:
+            mask &= docs["customer_city"].isin(cities).to_numpy()
+        if states:
+            mask &= docs["customer_state"].isin(states).to_numpy()
+        if scores:
+            mask &= docs["review_score"].isin(scores).to_numpy()
+        if segments:
+            mask &= docs["Customer_segment"].isin(segments).to_numpy()
+        return mask
+
+    def search(self, query, mask=None, page=1, page_size=10):
+        """
+        Cari ulasan yang mengandung semua kata di query (AND). Frasa dalam tanda kutip
+        harus muncul berurutan. Mengembalikan (jumlah hit, DataFrame halaman hasil + score).
+        """
+        phrases = [fold_accents(p) for p in re.findall(r'"([^"]+)"', query)]
+        terms = list(dict.fromkeys(tokenize(query.replace('"', " "))))
+        if not terms:
+            return 0, self.docs.iloc[0:0].assign(score=pd.Series(dtype=float))
+
+        n_docs = len(self.docs)
+        scores = np.zeros(n_docs)
+        matched = np.ones(n_docs, dtype=bool)
+        for term in terms:
+            doc_ids, tfs = self._postings(term)
+            hit = np.zeros(n_docs, dtype=bool)
+            hit[doc_ids] = True
+            matched &= hit
+
+            idf = np.log(1 + (n_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc_ids] / self.avg_length)
+            scores[doc_ids] += idf * tfs * (BM25_K1 + 1) / (tfs + norm)
+
+        if mask is not None:
+            matched &= mask
+        candidates = np.flatnonzero(matched)
+
+        # Verifikasi frasa hanya pada kandidat hasil AND, bukan seluruh ulasan
+        if phrases and len(candidates):
+            keep = [all(p in self.folded_text[i] for p in phrases) for i in candidates]
+            candidates = candidates[np.asarray(keep, dtype=bool)]
+
+        order = candidates[np.argsort(-scores[candidates], kind="stable")]
+        start = (page - 1) * page_size
+        page_ids = order[start:start + page_size]
+        return len(order), self.docs.iloc[page_ids].assign(score=scores[page_ids])
+
+
+def build_review_index(df):
+    # Satu dokumen per review_id, hanya ulasan yang memiliki komentar
+    reviews = df.loc[_has_comment(df["review_comment_message"]), REVIEW_COLUMNS]
+    docs = reviews.drop_duplicates("review_id").reset_index(drop=True)
+
+    # Tokenisasi seluruh komentar, lalu ubah menjadi pasangan (term, doc)
+    tokens = docs["review_comment_message"].map(tokenize)
+    doc_lengths = tokens.map(len).to_numpy(dtype=np.float64)
+    exploded = tokens.explode().dropna()
+    pairs = pd.DataFrame({"term": exploded.to_numpy(), "doc": exploded.index.to_numpy(dtype=np.int32)})
+
+    # Hitung term frequency per (term, doc) dan susun posting list CSR
+    counts = pairs.groupby(["term", "doc"], sort=True).size()
+    term_codes, terms = pd.factorize(counts.index.get_level_values("term"), sort=True)
+    term_ptr = np.concatenate(([0], np.cumsum(np.bincount(term_codes, minlength=len(terms)))))
+
+    return ReviewTextIndex(
+        docs=docs,
+        terms=list(terms),
+        term_ptr=term_ptr,
+        doc_ids=counts.index.get_level_values("doc").to_numpy(dtype=np.int32),
+        term_freqs=counts.to_numpy(dtype=np.int32),
+        doc_lengths=doc_lengths,
+    )
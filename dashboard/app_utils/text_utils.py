@@ -0,0 +1,25 @@
+import re
+import unicodedata
+
+
+def fold_accents(text):
+    """Lowercase dan hapus diakritik (mis. 'São José' -> 'sao jose') untuk pencarian."""
+    decomposed = unicodedata.normalize("NFKD", str(text).lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+# Stopword Bahasa Portugis (sudah di-fold tanpa aksen), cukup untuk pencarian & analisis ulasan
+PORTUGUESE_STOPWORDS = frozenset("""
+a ao aos as ate com como da das de dela dele deles depois do dos e ela elas ele eles em entre
+era essa esse esta estao estava este eu foi for fosse ha isso isto ja la lhe mais mas me mesmo
+meu minha muito na nas nem no nos nossa nosso num numa o os ou para pela pelas pelo pelos por
+qual quando que quem se sem ser seu seus sua suas so tambem te tem tinha to tu um uma umas uns
+vai voce voces pra pro
+""".split())
+
+TOKEN_PATTERN = r"[a-z0-9]+"
+
+
+def tokenize(text, stopwords=PORTUGUESE_STOPWORDS):
+    """Pecah teks menjadi token ter-fold (tanpa aksen, lowercase), stopword dibuang."""
+    return [tok for tok in re.findall(TOKEN_PATTERN, fold_accents(text)) if tok not in stopwords]
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+# Nilai int64 yang dipakai pandas/numpy untuk merepresentasikan NaT
+NAT_INT64 = np.iinfo(np.int64).min
+NS_PER_SECOND = 1_000_000_000
+
+
+#################### Konversi Timestamp ####################
+def to_int64_ns(values):
+    """Ambil array int64 (nanodetik) dari kolom datetime tanpa membuat Series baru."""
+    if isinstance(values, (pd.Series, pd.Index)):
+        values = values.to_numpy(dtype="datetime64[ns]")
+    return np.asarray(values, dtype="datetime64[ns]").view(np.int64)
+
+
+def duration_seconds(df, end_col, start_col):
+    """Durasi (end - start) dalam detik sebagai array float64, NaN jika salah satu NaT."""
+    end = to_int64_ns(df[end_col])
+    start = to_int64_ns(df[start_col])
+    valid = (end != NAT_INT64) & (start != NAT_INT64)
+    seconds = np.full(end.shape, np.nan)
+    np.divide(end - start, NS_PER_SECOND, out=seconds, where=valid)
+    return seconds
+
+
+#################### Agregasi NaN-aware ####################
+def nan_mean(values):
+    """Rata-rata yang mengabaikan NaN/NaT, NaN jika tidak ada nilai valid."""
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    count = valid.sum()
+    return values[valid].sum() / count if count else np.nan
+
+
+def group_stats(keys, values, median=True):
+    """
+    Hitung count, mean, dan median per grup dalam satu kali sort.
+    Baris dengan nilai NaN tidak dihitung, tetapi grupnya tetap muncul (mean = NaN).
+    Mengembalikan DataFrame dengan index = nilai unik keys.
+    """
+    codes, uniques = pd.factorize(np.asarray(keys), sort=True)
+    values = np.asarray(values, dtype=np.float64)
+    n_groups = len(uniques)
+
+    valid = (codes >= 0) & ~np.isnan(values)
+    codes_valid = codes[valid]
+    values_valid = values[valid]
+
+    count = np.bincount(codes_valid, minlength=n_groups)
+    total = np.bincount(codes_valid, weights=values_valid, minlength=n_groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = total / count
+
+    result = {"count": count, "mean": mean}
+
+    if median:
+        # Urutkan berdasarkan (grup, nilai) lalu ambil elemen tengah tiap grup
+        order = np.lexsort((values_valid, codes_valid))
+        sorted_values = values_valid[order]
+        starts = np.concatenate(([0], np.cumsum(count)[:-1]))
+        lower = starts + (count - 1) // 2
+        upper = starts + count // 2
+        has_data = count > 0
+        med = np.full(n_groups, np.nan)
+        med[has_data] = (sorted_values[lower[has_data]] + sorted_values[upper[has_data]]) / 2
+        result["median"] = med
+
+    return pd.DataFrame(result, index=pd.Index(uniques, name=getattr(keys, "name", None)))
+
+
+#################### Format Tampilan ####################
+def format_duration(seconds):
+    """Konversi detik ke format 'X D X H X M', 'N/A' jika kosong."""
+    if seconds is None or np.isnan(seconds):
+        return "N/A"
+    days = int(seconds // 86400)  # 1 Hari = 86400 Detik
+    hours = int((seconds % 86400) // 3600)  # Sisa detik dikonversi ke jam
+    minutes = int((seconds % 3600) // 60)  # Sisa detik dikonversi ke menit
+    return f"{days}D {hours}H {minutes}M"
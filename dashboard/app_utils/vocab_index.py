@@ -0,0 +1,88 @@
+import difflib
+
+import numpy as np
+
+from app_utils.text_utils import fold_accents
+
+# Jumlah maksimum pilihan yang dikirim ke selectbox pencarian kota
+SEARCH_LIMIT = 20
+
+# Query lebih pendek dari ini hanya dicari lewat index prefix (substring & fuzzy memindai semua nilai,
+# dan untuk 1-2 huruf hasilnya hampir tidak berguna)
+MIN_SCAN_QUERY_LENGTH = 3
+
+
+class VocabularyIndex:
+    """
+    Kosakata satu kolom filter (mis. customer_city) beserta jumlah order per nilai,
+    dengan index prefix (array ter-sort hasil accent folding) dan fallback fuzzy match.
+    """
+
+    def __init__(self, values, order_counts):
+        self.values = np.asarray(values, dtype=object)
+        self.order_counts = np.asarray(order_counts, dtype=np.int64)
+        self.folded = np.array([fold_accents(v) for v in self.values], dtype=object)
+        self.folded_str = self.folded.astype(str)
+
+        # Urutan global berdasarkan jumlah order (terbanyak dulu), dipakai untuk ranking hasil
+        self.rank = np.empty(len(self.values), dtype=np.int64)
+        self.rank[np.lexsort((self.values, -self.order_counts))] = np.arange(len(self.values))
+        self.by_popularity = self.values[np.argsort(self.rank)]
+
+        # Index prefix: posisi nilai jika diurutkan berdasarkan teks yang sudah di-fold
+        self.prefix_order = np.argsort(self.folded, kind="stable")
+        self.prefix_keys = self.folded[self.prefix_order]
+
+    def __len__(self):
+        return len(self.values)
+
+    def sorted_values(self):
+        return sorted(self.values)
+
+    def _prefix_matches(self, query):
+        lo = np.searchsorted(self.prefix_keys, query, side="left")
+        hi = np.searchsorted(self.prefix_keys, query + "\uffff", side="left")
+        return self.prefix_order[lo:hi]
+
+    def search(self, query, limit=SEARCH_LIMIT):
+        """
+        Cari nilai yang cocok dengan query: prefix, lalu substring, lalu fuzzy; diurutkan per jumlah order.
+        Substring & fuzzy hanya dipakai untuk query minimal MIN_SCAN_QUERY_LENGTH karakter.
+        """
+        query = fold_accents(query).strip()
+        if not query:
+            return list(self.by_popularity[:limit])
+
+        results = []
+        seen = set()
+
+        def add(positions):
+            for pos in positions[np.argsort(self.rank[positions], kind="stable")]:
+                if len(results) >= limit:
+                    return
+                if pos not in seen:
+                    seen.add(pos)
+                    results.append(self.values[pos])
+
+        add(self._prefix_matches(query))
+        if len(query) < MIN_SCAN_QUERY_LENGTH:
+            return results
+        if len(results) < limit:
+            contains = np.flatnonzero(np.char.find(self.folded_str, query) >= 0)
+            add(contains)
+        if len(results) < limit:
+            close = difflib.get_close_matches(query, self.prefix_keys.tolist(), n=limit, cutoff=0.75)
+            if close:
+                positions = self.prefix_order[np.isin(self.prefix_keys, close)]
+                add(positions)
+
+        return results
+
+
+def build_vocabulary_index(df, column, order_col="order_id"):
+    order_counts = df.groupby(column)[order_col].nunique()
+    return VocabularyIndex(order_counts.index.to_numpy(), order_counts.to_numpy())
+
+
+def build_filter_indexes(df, columns=("customer_city", "customer_state")):
+    return {col: build_vocabulary_index(df, col) for col in columns}
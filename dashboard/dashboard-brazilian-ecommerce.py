@@ -1,47 +1,108 @@
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
 import streamlit as st
-from wordcloud import WordCloud, STOPWORDS
+
+from app_utils.chart_cache import payload_stats, reset_payload_stats
+from app_utils.columnar import InMemoryColumns
+from app_utils.comparison import COMPARISON_MODES, COMPARISON_NONE
+from app_utils.data_loader import DATA_PATH, STARTUP_COLUMNS, load_snapshot, shared_dataset_name
+from app_utils.disk_cache import data_fingerprint, default_cache
+from app_utils.filter_engine import BitmapFilterIndex
+from app_utils.geo_index import load_zip_centroids
+from app_utils.quantile_sketch import build_metric_sketches
+from app_utils.shared_dataset import attach_dataset
+from app_utils.vocab_index import build_filter_indexes
 
 # Konfigurasi awal Streamlit
 st.set_page_config(page_title="Brazilian E-commerce Dashboard", page_icon="📊", layout="wide")
 
 #################### Data Processing Code ####################
-# Load Data 
-@st.cache_data
+# Load Data (snapshot kolumnar, kolom dimuat lazy dan dipakai bersama oleh semua session)
+@st.cache_resource
+def load_csv_data():
+    return load_snapshot()
+
+# Mode multi-worker: attach ke dataset yang dipublish di shared memory (zero-copy).
+# Pakai cache_resource agar DataFrame tidak di-pickle/disalin per pemanggilan.
+@st.cache_resource
+def load_shared_data(name):
+    return InMemoryColumns(*attach_dataset(name))
+
+# Mengembalikan dataset dengan proyeksi kolom per halaman (frame/column) dan tabel dimensi produk & penjual
 def load_data():
-    df = pd.read_csv("./dashboard/all_rfm_cust_data.csv")
-    df["order_purchase_timestamp"] = pd.to_datetime(df["order_purchase_timestamp"])
-    df["year_month"] = pd.to_datetime(df["year_month"])
-    df["order_approved_at"] = pd.to_datetime(df["order_approved_at"])
-    df["order_delivered_customer_date"] = pd.to_datetime(df["order_delivered_customer_date"])
-    df["order_estimated_delivery_date"] = pd.to_datetime(df["order_estimated_delivery_date"])
-    df["order_delivered_carrier_date"] = pd.to_datetime(df["order_delivered_carrier_date"])
-    
-    return df
+    shared_name = shared_dataset_name()
+    if shared_name:
+        return load_shared_data(shared_name)
+    return load_csv_data()
+
+# Sketch persentil per (year_month, customer_state) untuk delivery time, payment, dan review
+@st.cache_data
+def load_sketches():
+    return default_cache().get_or_compute(("sketches", data_fingerprint(DATA_PATH)),
+                                          lambda: build_metric_sketches(load_data().frame(STARTUP_COLUMNS)))
+
+# Kosakata city/state + jumlah order, dihitung sekali saat load untuk filter sidebar
+@st.cache_data
+def load_filter_indexes():
+    return build_filter_indexes(load_data().frame(STARTUP_COLUMNS))
+
+# Hasil pencarian kota per query, dipakai bersama oleh semua session (dipanggil di setiap ketikan).
+# Index tidak ikut di-hash (prefix _), key cache cukup query-nya.
+@st.cache_data(max_entries=4096)
+def search_cities(_city_index, query):
+    return _city_index.search(query)
+
+# Bitmap baris per nilai dimensi filter (kategori produk lewat tabel dimensi produk), dipakai bersama (read-only) oleh semua session
+@st.cache_resource
+def load_filter_bitmaps():
+    dataset = load_data()
+    return BitmapFilterIndex(dataset.frame(STARTUP_COLUMNS), dimensions=dataset.dimensions)
+
+# Index centroid per zip prefix dari dataset geolocation (None jika dataset tidak tersedia)
+@st.cache_data
+def load_geo_index():
+    return load_zip_centroids()
 
 # Inisialisasi session_state untuk data jika belum ada
-if "cust_df" not in st.session_state:
-    st.session_state.cust_df = load_data()
+# Tabel dimensi dipakai halaman product & seller untuk mengambil atribut berdasarkan surrogate key
+if "dataset" not in st.session_state or "dimensions" not in st.session_state:
+    st.session_state.dataset = load_data()
+    st.session_state.dimensions = st.session_state.dataset.dimensions
+
+# Fingerprint data dipakai sebagai bagian key disk cache agregat halaman
+if "data_fingerprint" not in st.session_state:
+    st.session_state.data_fingerprint = data_fingerprint(DATA_PATH)
+
+if "metric_sketches" not in st.session_state:
+    st.session_state.metric_sketches = load_sketches()
+
+if "filter_indexes" not in st.session_state:
+    st.session_state.filter_indexes = load_filter_indexes()
+
+if "filter_bitmaps" not in st.session_state:
+    st.session_state.filter_bitmaps = load_filter_bitmaps()
+
+if "geo_index" not in st.session_state:
+    st.session_state.geo_index = load_geo_index()
 
 # Gunakan data dari session state, tanpa memuat ulang
-cust_df = st.session_state.cust_df  
+purchase_dates = st.session_state.dataset.column("order_purchase_timestamp")
 
 # Ambil min & max tanggal dari dataset
-min_date = cust_df['order_purchase_timestamp'].min()
-max_date = cust_df['order_purchase_timestamp'].max()
+min_date = purchase_dates.min()
+max_date = purchase_dates.max()
 
 # Inisialisasi session_state untuk filter jika belum ada
 if "selected_date_range" not in st.session_state:
     st.session_state.selected_date_range = (min_date, max_date)
 
-if "selected_city" not in st.session_state:
-    st.session_state.selected_city = "All"
+# List kosong berarti semua city/state
+if "selected_cities" not in st.session_state:
+    st.session_state.selected_cities = []
+
+if "selected_states" not in st.session_state:
+    st.session_state.selected_states = []
 
-if "selected_state" not in st.session_state:
-    st.session_state.selected_state = "All"
+if "comparison_mode" not in st.session_state:
+    st.session_state.comparison_mode = COMPARISON_NONE
 
 
 #################### Streamlit UI Code ####################
@@ -72,30 +133,41 @@ selected_date_range = st.sidebar.date_input(
     max_value=max_date)
 
 # Sidebar: Filter Customer City
-cities = ["All"] + sorted(cust_df["customer_city"].unique())
-selected_city = st.sidebar.selectbox("Select City", cities)
+# Hanya kota teratas yang cocok dengan pencarian yang dikirim ke multiselect
+city_query = st.sidebar.text_input("Search City", placeholder="Ketik nama kota...")
+cities = search_cities(st.session_state.filter_indexes["customer_city"], city_query)
+# Pastikan kota yang sedang dipilih tetap ada di pilihan
+cities += [city for city in st.session_state.selected_cities if city not in cities]
+selected_cities = st.sidebar.multiselect("Select City", cities, default=st.session_state.selected_cities,
+                                         placeholder="All")
 
 # Sidebar: Filter Customer State
-states = ["All"] + sorted(cust_df["customer_state"].unique())
-selected_state = st.sidebar.selectbox("Select State", states)
+states = st.session_state.filter_indexes["customer_state"].sorted_values()
+selected_states = st.sidebar.multiselect("Select State", states, default=st.session_state.selected_states,
+                                         placeholder="All")
 
-# **Validasi: Hanya boleh memilih salah satu filter**
-if selected_city != "All" and selected_state != "All":
-    st.sidebar.warning("⚠️ Hanya boleh memilih satu filter: City atau State. Pilih 'All' pada salah satu filter untuk melanjutkan.")
+# Sidebar: Mode pembanding untuk delta setiap metrik
+comparison_mode = st.sidebar.selectbox("Compare With", COMPARISON_MODES,
+                                       index=COMPARISON_MODES.index(st.session_state.comparison_mode))
 
 
 # Update session_state jika ada perubahan & refresh halaman
 if (
     selected_date_range != st.session_state.selected_date_range or
-    selected_city != st.session_state.selected_city or
-    selected_state != st.session_state.selected_state
+    selected_cities != st.session_state.selected_cities or
+    selected_states != st.session_state.selected_states or
+    comparison_mode != st.session_state.comparison_mode
 ):
     st.session_state.selected_date_range = selected_date_range
-    st.session_state.selected_city = selected_city
-    st.session_state.selected_state = selected_state
+    st.session_state.selected_cities = selected_cities
+    st.session_state.selected_states = selected_states
+    st.session_state.comparison_mode = comparison_mode
     st.rerun()  # Refresh agar filter berlaku
 
 
+# Ukuran payload chart halaman aktif, diisi setelah halaman selesai di-render
+payload_caption = st.sidebar.empty()
+
 # Logo and text
 st.logo("./dashboard/assets/Logo-Olist.png")
 
@@ -119,5 +191,10 @@ st.sidebar.markdown(
     unsafe_allow_html=True
 )
 
+reset_payload_stats()
 pg.run()
 
+chart_bytes = payload_stats()
+if chart_bytes:
+    payload_caption.caption(f"📦 Chart payload: {sum(chart_bytes.values()) / 1024:,.1f} KB ({len(chart_bytes)} charts)",
+                            help="Ukuran JSON Plotly yang dikirim ke browser pada rerun ini.")
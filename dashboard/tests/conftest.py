@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Modul app_utils di-import relatif terhadap folder dashboard (sama seperti saat app dijalankan)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,76 @@
+import pandas as pd
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from app_utils import chart_cache
+
+
+def test_data_key_skips_hashing_the_input(monkeypatch):
+    monkeypatch.setattr(chart_cache, "_default_cache", chart_cache.ChartPayloadCache())
+    monkeypatch.setattr(chart_cache, "chart_fingerprint", lambda data: pytest.fail("data was hashed"))
+    builds = []
+
+    def build(data):
+        builds.append(data)
+        return {"data": [], "layout": {}}
+
+    monkeypatch.setattr(chart_cache, "serialize_figure", lambda fig: "{}")
+    frame = pd.DataFrame({"x": range(1000)})
+    assert chart_cache.chart_payload("test.chart", frame, build, data_key=("fp", "filter")) == "{}"
+    assert chart_cache.chart_payload("test.chart", frame, build, data_key=("fp", "filter")) == "{}"
+    assert len(builds) == 1
+
+
+def _fallback_app():
+    import plotly.graph_objects as go
+    import streamlit as st
+
+    from app_utils import chart_cache
+
+    chart_cache.reset_payload_stats()
+    chart_cache.plotly_chart("test.fallback", (1, 2), lambda data: go.Figure(go.Bar(y=list(data))))
+    st.markdown(str(sum(chart_cache.payload_stats().values())))
+
+
+def test_falls_back_to_st_plotly_chart_when_internal_api_changed(monkeypatch):
+    # AppTest menjalankan script di proses yang sama, sehingga patch modul berlaku di dalam app
+    def broken(spec, use_container_width):
+        raise TypeError("internal API changed")
+
+    monkeypatch.setattr(chart_cache, "_build_proto", broken)
+    app = AppTest.from_function(_fallback_app)
+    app.run()
+    assert not app.exception
+    assert len(app.get("plotly_chart")) == 1
+    assert int(app.markdown[0].value) > 0
+
+
+def _direct_app():
+    import plotly.graph_objects as go
+    import streamlit as st
+
+    from app_utils import chart_cache
+
+    left, right = st.columns(2)
+    with left:
+        chart_cache.plotly_chart("test.direct", (1, 2), lambda data: go.Figure(go.Bar(y=list(data))))
+    with right:
+        chart_cache.plotly_chart("test.direct_wide", (3, 4), lambda data: go.Figure(go.Bar(y=list(data))),
+                                 use_container_width=True)
+
+
+def test_internal_streamlit_api_renders_cached_payload(monkeypatch):
+    def no_fallback(*args, **kwargs):
+        raise AssertionError("fallback to st.plotly_chart")
+
+    monkeypatch.setattr(chart_cache.st, "plotly_chart", no_fallback)
+    # Gagal di sini berarti API internal Streamlit yang dipakai chart_cache berubah (cek pin di requirements.txt)
+    assert chart_cache.PlotlyChartProto is not None
+    app = AppTest.from_function(_direct_app)
+    app.run()
+    assert not app.exception
+    charts = app.get("plotly_chart")
+    assert len(charts) == 2
+    assert charts[0].proto.spec == chart_cache.chart_payload("test.direct", (1, 2), None)
+    assert charts[1].proto.use_container_width
+    assert len({chart.proto.id for chart in charts}) == 2
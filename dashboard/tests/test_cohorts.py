@@ -0,0 +1,24 @@
+import pandas as pd
+
+from app_utils.cohorts import cohort_matrix, retention_matrix
+
+IDS = ["a", "a", "b", "b", "c"]
+MONTHS = pd.to_datetime(["2017-01-01", "2017-03-01", "2017-02-01", "2017-03-01", "2017-03-01"])
+
+
+def test_first_month_comes_from_full_history():
+    # "a" sudah aktif sejak Januari: di rentang Feb-Mar bukan cohort baru
+    matrix = cohort_matrix(IDS, MONTHS, "2017-02-15", "2017-03-31")
+    assert list(matrix.index) == ["2017-02", "2017-03"]
+    assert matrix.loc["2017-02", 0] == 1 and matrix.loc["2017-02", 1] == 1
+    assert matrix.loc["2017-03", 0] == 1
+
+
+def test_window_without_new_entities_is_empty():
+    assert retention_matrix(IDS, MONTHS, "2018-01-01", "2018-02-01").empty
+
+
+def test_no_window_uses_all_months():
+    matrix = retention_matrix(IDS, MONTHS)
+    assert list(matrix.index) == ["2017-01", "2017-02", "2017-03"]
+    assert matrix.loc["2017-01", 2] == 100
@@ -0,0 +1,47 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app_utils.columnar import ColumnarSnapshot, InMemoryColumns, write_snapshot
+
+
+def test_in_memory_frame_is_zero_copy_view():
+    values = np.arange(10, dtype=np.float64)
+    values.flags.writeable = False
+    df = pd.DataFrame({"a": values, "b": np.arange(10)}, copy=False)
+    dataset = InMemoryColumns(df, {})
+
+    frame = dataset.frame(("a",))
+    assert list(frame.columns) == ["a"]
+    assert np.shares_memory(frame["a"].to_numpy(), values)
+
+
+def test_in_memory_frame_is_memoized_per_column_tuple():
+    dataset = InMemoryColumns(pd.DataFrame({"a": [1, 2], "b": [3, 4]}), {})
+    assert dataset.frame(["a", "b"]) is dataset.frame(("a", "b"))
+    assert dataset.frame(("b", "a")) is not dataset.frame(("a", "b"))
+
+
+def test_snapshot_frame_is_built_once_across_threads(tmp_path):
+    facts = pd.DataFrame({"a": np.arange(1000), "b": np.arange(1000) * 2.0, "review_comment_message": ["x"] * 1000})
+    directory = str(tmp_path / "snapshot")
+    write_snapshot(directory, facts, {})
+    dataset = ColumnarSnapshot(directory)
+
+    barrier = threading.Barrier(8)
+    frames = []
+
+    def project():
+        barrier.wait()
+        frames.append(dataset.frame(("a", "b")))
+
+    threads = [threading.Thread(target=project) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(frames) == 8
+    assert all(frame is frames[0] for frame in frames)
+    assert frames[0]["b"].tolist() == (np.arange(1000) * 2.0).tolist()
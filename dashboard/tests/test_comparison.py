@@ -0,0 +1,15 @@
+from app_utils.comparison import category_delta
+
+
+def test_category_delta_compares_the_same_category():
+    current = {"category_sales": {"toys": 30, "books": 10}}
+    previous = {"category_sales": {"toys": 25, "books": 50}}
+    # Kategori teratas periode ini "toys": dibandingkan dengan "toys", bukan "books" (teratas sebelumnya)
+    assert category_delta(current, previous, "category_sales", "toys") == "+5"
+
+
+def test_category_delta_is_none_without_rows_in_comparison_period():
+    current = {"category_sales": {"toys": 30}}
+    assert category_delta(current, {"category_sales": {"books": 50}}, "category_sales", "toys") is None
+    assert category_delta(current, None, "category_sales", "toys") is None
+    assert category_delta(current, {"category_sales": {}}, "category_sales", None) is None
@@ -0,0 +1,39 @@
+import threading
+
+from app_utils.compute import single_flight, submit_single_flight
+
+
+def test_single_flight_does_not_deadlock_on_finished_future():
+    # Compute yang selesai sebelum add_done_callback dipanggil menjalankan callback secara inline;
+    # callback tidak boleh dipanggil selagi lock in-flight masih dipegang
+    results = []
+
+    def run():
+        for i in range(200):
+            results.append(single_flight(("instant", i % 3), lambda: i))
+
+    worker = threading.Thread(target=run, daemon=True)
+    worker.start()
+    worker.join(timeout=10)
+    assert not worker.is_alive(), "single_flight deadlock"
+    assert len(results) == 200
+
+
+def test_concurrent_requests_share_one_computation():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    first = submit_single_flight("shared", compute)
+    started.wait(5)
+    second = submit_single_flight("shared", compute)
+    release.set()
+    assert first is second
+    assert first.result(5) == second.result(5) == "value"
+    assert len(calls) == 1
@@ -0,0 +1,76 @@
+import os
+
+from app_utils import disk_cache
+from app_utils.disk_cache import DiskCache
+
+
+def test_cached_none_is_a_hit(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return None
+
+    assert cache.get_or_compute(("none",), compute) is None
+    assert cache.get_or_compute(("none",), compute) is None
+    assert len(calls) == 1
+
+
+def test_entry_removed_before_utime_is_a_miss(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path))
+    cache.set(("key",), 42)
+
+    def evicted(path):
+        os.remove(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(disk_cache.os, "utime", evicted)
+    assert cache.get(("key",), "miss") == "miss"
+
+
+def test_aggregate_key_includes_version(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path))
+    monkeypatch.setattr(disk_cache, "_default_cache", cache)
+
+    assert disk_cache.cached_aggregate("metric", "fp", ("filter",), lambda: "v1") == "v1"
+    assert disk_cache.cached_aggregate("metric", "fp", ("filter",), lambda: "stale") == "v1"
+    monkeypatch.setattr(disk_cache, "AGGREGATE_VERSION", disk_cache.AGGREGATE_VERSION + 1)
+    assert disk_cache.cached_aggregate("metric", "fp", ("filter",), lambda: "v2") == "v2"
+
+
+def test_eviction_is_lru_and_does_not_rescan_the_directory(tmp_path, monkeypatch):
+    payload = b"x" * 1000
+    cache = DiskCache(str(tmp_path), max_bytes=3500)
+    cache.set(("a",), payload)
+
+    def no_scan(path):
+        raise AssertionError("cache dir rescanned")
+
+    monkeypatch.setattr(disk_cache.os, "scandir", no_scan)
+    cache.set(("b",), payload)
+    cache.set(("c",), payload)
+    assert cache.get(("a",)) == payload  # "a" baru dipakai, "b" jadi yang paling lama
+    cache.set(("d",), payload)
+
+    assert cache.get(("b",), "miss") == "miss"
+    assert all(cache.get((key,)) == payload for key in ("a", "c", "d"))
+    assert cache.total_bytes() <= 3500
+
+
+def test_snapshot_directories_count_against_the_bound(tmp_path):
+    snapshot = tmp_path / "snapshot-v3-test"
+    snapshot.mkdir()
+    (snapshot / "facts.feather").write_bytes(b"x" * 3000)
+
+    cache = DiskCache(str(tmp_path), max_bytes=3800)
+    cache.set(("a",), b"y" * 500)
+    cache.set(("b",), b"y" * 500)
+    # 3000 (snapshot) + 2 x ~520 melebihi batas: pickle terlama di-evict, snapshot tidak
+    assert cache.get(("a",), "miss") == "miss"
+    assert cache.get(("b",)) == b"y" * 500
+    assert (snapshot / "facts.feather").exists()
+
+    (snapshot / "text.feather").write_bytes(b"x" * 1000)
+    cache.refresh_pinned()
+    assert cache.total_bytes() == 4000 + os.path.getsize(cache._path(("b",)))
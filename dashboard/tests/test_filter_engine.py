@@ -0,0 +1,102 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app_utils.dimensions import DimensionTable
+from app_utils.filter_engine import SPARSE_RATIO, BitmapFilterIndex
+
+
+def make_frame(n_rows=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    # "SP" cukup sering untuk disimpan sebagai bitmap ter-pack, state lain jarang (daftar posisi baris)
+    states = rng.choice(["SP", "RJ", "MG", "AC"], size=n_rows, p=[0.9, 0.06, 0.035, 0.005])
+    return pd.DataFrame({
+        "customer_state": states,
+        "customer_city": rng.choice(["sao paulo", "rio de janeiro", "campinas", None], size=n_rows),
+        "payment_type": rng.choice(["credit_card", "boleto", "voucher"], size=n_rows),
+        "order_status": rng.choice(["delivered", "canceled"], size=n_rows),
+        "order_purchase_timestamp": pd.Timestamp("2017-01-01") + pd.to_timedelta(
+            rng.integers(0, 365 * 24, size=n_rows), unit="h"),
+        "product_key": rng.integers(-1, 3, size=n_rows),
+    })
+
+
+def expected(df, date_range=None, **selections):
+    mask = pd.Series(True, index=df.index)
+    if date_range is not None:
+        start, end = date_range
+        mask &= (df["order_purchase_timestamp"] >= start) & (df["order_purchase_timestamp"] <= end)
+    for col, values in selections.items():
+        if values:
+            mask &= df[col].isin(values)
+    return df[mask]
+
+
+def test_containers_are_sparse_or_packed_by_frequency():
+    df = make_frame()
+    index = BitmapFilterIndex(df)
+    containers = index.containers["customer_state"]
+    assert containers["SP"].dtype == np.uint8
+    assert containers["AC"].dtype != np.uint8
+    assert len(containers["AC"]) * SPARSE_RATIO < len(df)
+
+
+@pytest.mark.parametrize("selections", [
+    {"customer_state": ["AC"]},
+    {"customer_state": ["SP", "AC"]},
+    {"customer_state": ["SP", "RJ"], "payment_type": ["boleto"]},
+    {"customer_city": ["campinas", "rio de janeiro"], "customer_state": ["MG", "AC"], "order_status": ["canceled"]},
+    {"customer_state": [], "payment_type": ["voucher", "credit_card"]},
+    {"customer_state": ["XX"]},
+])
+def test_select_matches_pandas_mask(selections):
+    df = make_frame()
+    index = BitmapFilterIndex(df)
+    result = index.select(df, ("2017-03-01", "2017-08-15"), **selections)
+    pd.testing.assert_frame_equal(result, expected(df, (pd.Timestamp("2017-03-01"), pd.Timestamp("2017-08-15")),
+                                                   **selections))
+
+
+def test_no_filter_returns_frame_and_empty_lists_mean_all():
+    df = make_frame()
+    index = BitmapFilterIndex(df)
+    assert index.select(df) is df
+    assert index.resolve(customer_state=[], payment_type=None) is None
+
+
+def test_date_range_end_is_inclusive():
+    df = pd.DataFrame({"customer_state": ["SP", "SP", "RJ", "RJ"],
+                       "order_purchase_timestamp": pd.to_datetime(["2017-01-01 00:00", "2017-01-31 00:00",
+                                                                   "2017-01-31 10:00", "2017-02-01 00:00"])})
+    index = BitmapFilterIndex(df)
+    result = index.select(df, (pd.Timestamp("2017-01-01"), pd.Timestamp("2017-01-31")))
+    # Sama seperti filter pandas (>= start & <= end): baris tepat di end_date ikut, jam setelahnya tidak
+    assert list(result.index) == [0, 1]
+    pd.testing.assert_frame_equal(result, expected(df, (pd.Timestamp("2017-01-01"), pd.Timestamp("2017-01-31"))))
+
+
+def test_values_lists_non_null_values():
+    df = make_frame()
+    index = BitmapFilterIndex(df)
+    assert sorted(index.values("customer_state")) == ["AC", "MG", "RJ", "SP"]
+    assert sorted(index.values("customer_city")) == ["campinas", "rio de janeiro", "sao paulo"]
+
+
+def test_category_column_resolved_through_product_dimension():
+    df = make_frame()
+    products = DimensionTable("product_key", "product_id", {
+        "product_id": np.array(["p0", "p1", "p2"], dtype=object),
+        "product_category_name_english": pd.Categorical(["toys", "books", "toys"]),
+    })
+    index = BitmapFilterIndex(df, dimensions={"product": products})
+    assert sorted(index.values("product_category_name_english")) == ["books", "toys"]
+
+    with_category = products.attach(df, "product_category_name_english")
+    result = index.select(df, None, product_category_name_english=["toys"], customer_state=["SP"])
+    pd.testing.assert_frame_equal(result, expected(with_category, product_category_name_english=["toys"],
+                                                   customer_state=["SP"])[df.columns])
+
+
+def test_category_column_skipped_without_dimensions():
+    index = BitmapFilterIndex(make_frame())
+    assert "product_category_name_english" not in index.containers
@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from app_utils.quantile_sketch import build_partitioned_sketch, filtered_quantiles, format_quantile
+
+
+def make_sketch():
+    df = pd.DataFrame({"delivery_time": [5.0, 10.0, np.nan],
+                       "year_month": pd.to_datetime(["2017-01-01", "2017-01-01", "2017-02-01"]),
+                       "customer_state": ["SP", "RJ", "SP"]})
+    return df, build_partitioned_sketch(df, "delivery_time")
+
+
+def test_empty_partition_formats_as_dash():
+    df, sketch = make_sketch()
+    # Februari hanya berisi NaN: sketch kosong, sama seperti jalur exact (filter city)
+    sketch_values = filtered_quantiles(sketch, df["delivery_time"][2:], "2017-02-01", "2017-02-28", [], [])
+    exact_values = filtered_quantiles(sketch, df["delivery_time"][2:], "2017-02-01", "2017-02-28", ["sao paulo"], [])
+    assert [format_quantile(v, "{:,.1f} Days") for v in sketch_values] == ["-"] * 3
+    assert [format_quantile(v, "{:,.1f} Days") for v in exact_values] == ["-"] * 3
+
+
+def test_non_empty_partition_is_formatted():
+    df, sketch = make_sketch()
+    p50, _, _ = filtered_quantiles(sketch, df["delivery_time"], "2017-01-01", "2017-01-31", [], ["SP"])
+    assert format_quantile(p50, "{:,.0f} Days") == "5 Days"
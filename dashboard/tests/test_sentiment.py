@@ -0,0 +1,55 @@
+import multiprocessing
+import sys
+import types
+
+import numpy as np
+import pytest
+
+from app_utils import sentiment
+from app_utils.sentiment import score_batch, score_texts
+
+
+@pytest.mark.parametrize("text", [
+    "não chegou, horrível",
+    "não gostei, péssimo",
+    "produto não veio, ruim",
+    "nao recomendo, pessimo",
+])
+def test_negated_clause_followed_by_negative_word_is_negative(text):
+    assert score_batch([text])[0] < 0
+
+
+def test_negation_never_turns_negative_word_positive():
+    assert score_batch(["não é ruim"])[0] <= 0
+
+
+def test_negation_flips_positive_word():
+    assert score_batch(["não gostei"])[0] < 0
+    assert score_batch(["gostei"])[0] > 0
+
+
+def test_negation_stops_at_clause_boundary():
+    # "recomendo" setelah tanda baca / "mas" tidak lagi berada dalam jendela negasi
+    assert score_batch(["não demorou, recomendo"])[0] > 0
+    assert score_batch(["não veio no prazo mas recomendo"])[0] > 0
+
+
+def test_process_pool_is_shut_down_after_scoring(monkeypatch):
+    # __main__ tanpa file: worker spawn tidak menjalankan ulang script apa pun (AppTest di test lain
+    # mengganti __main__ dengan script Streamlit)
+    monkeypatch.setitem(sys.modules, "__main__", types.ModuleType("__main__"))
+    texts = ["não gostei, péssimo", "produto excelente", "chegou rápido"] * 4
+    expected = score_texts(texts, batch_size=3, workers=1)
+    scores = score_texts(texts, batch_size=3, workers=2)
+    np.testing.assert_allclose(scores, expected)
+    assert not multiprocessing.active_children()
+
+
+def test_streamlit_script_main_scores_in_process(monkeypatch):
+    # Di server Streamlit, __main__ adalah script halaman (punya __file__, tanpa __spec__)
+    script = types.ModuleType("__main__")
+    script.__file__ = "dashboard/dashboard-brazilian-ecommerce.py"
+    monkeypatch.setitem(sys.modules, "__main__", script)
+    monkeypatch.setattr(sentiment, "ProcessPoolExecutor", None)
+    texts = ["produto excelente", "não gostei"] * 3
+    np.testing.assert_allclose(score_texts(texts, batch_size=2, workers=2), score_texts(texts, workers=1))
@@ -0,0 +1,94 @@
+import pandas as pd
+
+from app_utils.text_index import build_review_index
+
+
+def make_reviews():
+    return pd.DataFrame({
+        "review_id": ["r1", "r2", "r3", "r4", "r5", "r5", "r6"],
+        "review_score": [5, 1, 4, 2, 5, 5, 3],
+        "Customer_segment": ["Loyal", "Lost", "Loyal", "New", "New", "New", "Loyal"],
+        "customer_city": ["sao paulo", "rio de janeiro", "campinas", "sao paulo", "curitiba", "curitiba", "santos"],
+        "customer_state": ["SP", "RJ", "SP", "SP", "PR", "PR", "SP"],
+        "order_purchase_timestamp": pd.to_datetime(["2017-01-05", "2017-02-10", "2017-03-15", "2017-04-20",
+                                                    "2017-05-25", "2017-05-25", "2017-06-30"]),
+        "review_comment_message": [
+            "Produto de ótima qualidade, entrega rápida",
+            "Entrega atrasada e produto quebrado",
+            "Qualidade boa. Entrega no prazo, produto de qualidade",
+            "Não recebi o produto",
+            "Entrega rapida, recomendo",
+            "Entrega rapida, recomendo",
+            "NoComment",
+        ],
+    })
+
+
+def ids(hits):
+    return list(hits["review_id"])
+
+
+def test_index_skips_duplicates_and_empty_comments():
+    index = build_review_index(make_reviews())
+    assert len(index) == 5
+    assert "r6" not in set(index.docs["review_id"])
+
+
+def test_all_terms_must_match_and_bm25_ranks_by_term_frequency():
+    index = build_review_index(make_reviews())
+    total, hits = index.search("qualidade produto")
+    # r3 menyebut "qualidade" dua kali pada dokumen yang panjangnya mirip r1
+    assert total == 2
+    assert ids(hits) == ["r3", "r1"]
+    assert hits["score"].is_monotonic_decreasing
+
+
+def test_accents_are_folded_in_query_and_text():
+    index = build_review_index(make_reviews())
+    total, hits = index.search("RÁPIDA")
+    assert total == 2
+    assert set(ids(hits)) == {"r1", "r5"}
+    assert index.search("otima")[0] == index.search("ótima")[0] == 1
+
+
+def test_stopwords_in_query_are_ignored():
+    index = build_review_index(make_reviews())
+    assert index.search("o produto de")[0] == index.search("produto")[0] == 4
+    total, hits = index.search("de o e")
+    assert total == 0 and hits.empty
+
+
+def test_quoted_phrase_must_appear_in_order():
+    index = build_review_index(make_reviews())
+    total, hits = index.search('"produto de qualidade"')
+    assert (total, ids(hits)) == (1, ["r3"])
+    assert index.search('"qualidade de produto"')[0] == 0
+    # Frasa ber-aksen di query cocok dengan teks tanpa aksen
+    total, hits = index.search('"entrega rápida"')
+    assert (total, set(ids(hits))) == (2, {"r1", "r5"})
+
+
+def test_filter_mask_by_scores_segments_state_and_dates():
+    index = build_review_index(make_reviews())
+    mask = index.filter_mask(states=["SP"], scores=[4, 5])
+    assert set(ids(index.search("entrega", mask)[1])) == {"r1", "r3"}
+
+    mask = index.filter_mask(segments=["New"])
+    assert ids(index.search("entrega", mask)[1]) == ["r5"]
+
+    mask = index.filter_mask(pd.Timestamp("2017-02-01"), pd.Timestamp("2017-03-15"))
+    assert set(ids(index.search("entrega", mask)[1])) == {"r2", "r3"}
+
+    mask = index.filter_mask(cities=["campinas"], scores=[])
+    assert ids(index.search("produto", mask)[1]) == ["r3"]
+
+
+def test_pagination_and_page_past_the_end():
+    index = build_review_index(make_reviews())
+    total, first = index.search("entrega", page=1, page_size=2)
+    _, second = index.search("entrega", page=2, page_size=2)
+    total_after, past_end = index.search("entrega", page=5, page_size=2)
+    assert total == total_after == 4
+    assert len(first) == 2 and len(second) == 2
+    assert not set(ids(first)) & set(ids(second))
+    assert past_end.empty and "score" in past_end.columns
@@ -0,0 +1,21 @@
+from app_utils import vocab_index
+from app_utils.vocab_index import VocabularyIndex
+
+
+def make_index():
+    return VocabularyIndex(["sao paulo", "rio de janeiro", "campinas", "santo andre", "paulinia"],
+                           [100, 80, 30, 20, 5])
+
+
+def test_short_query_uses_prefix_index_only(monkeypatch):
+    monkeypatch.setattr(vocab_index.difflib, "get_close_matches",
+                        lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("fuzzy scan")))
+    index = make_index()
+    assert index.search("sa") == ["sao paulo", "santo andre"]
+    assert index.search("au") == []
+
+
+def test_long_query_falls_back_to_substring_and_fuzzy():
+    index = make_index()
+    assert index.search("paul") == ["paulinia", "sao paulo"]
+    assert index.search("campinsa") == ["campinas"]